@@ -12,6 +12,10 @@ import asyncio
 
 from config import config
 from database import db
+from utils.translator import translator
+from utils import permissions
+from utils.interaction_router import InteractionRouter
+from utils.metrics import metrics, MetricsCommandTree, http_trace_config, observe_command, record_db_time
 from utils.advanced_logging import setup_advanced_logging
 
 # إعداد نظام السجلات المتقدم
@@ -31,10 +35,14 @@ class BookingBot(commands.Bot):
         super().__init__(
             command_prefix=commands.when_mentioned,
             intents=intents,
-            help_command=None
+            help_command=None,
+            tree_cls=MetricsCommandTree,
+            http_trace=http_trace_config()
         )
         
         self.start_time = datetime.now()
+        self.router = InteractionRouter(db, defer_budget=config.INTERACTION_DEFER_BUDGET_MS / 1000)
+        db.pool.timing_hook = record_db_time
     
     async def setup_hook(self):
         """إعداد البوت"""
@@ -52,6 +60,8 @@ class BookingBot(commands.Bot):
         try:
             await db.initialize()
             logger.info("✅ تم تهيئة قاعدة البيانات")
+            await translator.warm_language_cache(db)
+            await permissions.load_permission_index()
         except Exception as e:
             logger.error(f"❌ فشل تهيئة قاعدة البيانات: {e}")
             raise
@@ -108,6 +118,14 @@ class BookingBot(commands.Bot):
         except Exception as e:
             logger.error(f"⚠️ تحذير: فشل تحميل المهام المجدولة: {e}")
     
+    async def on_interaction(self, interaction: discord.Interaction):
+        """توجيه أزرار المكونات عبر الموجّه المركزي"""
+        await self.router.dispatch(interaction)
+    
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        """تسجيل توقيت أمر سلاش منتهٍ"""
+        observe_command(interaction)
+    
     async def on_guild_join(self, guild):
         """عند انضمام البوت لسيرفر جديد"""
         logger.info(f"✅ انضم البوت إلى سيرفر جديد: {guild.name} (ID: {guild.id})")
@@ -123,6 +141,18 @@ class BookingBot(commands.Bot):
     async def on_error(self, event, *args, **kwargs):
         """معالجة الأخطاء العامة"""
         logger.error(f"خطأ في الحدث {event}", exc_info=sys.exc_info())
+    
+    async def close(self):
+        """إغلاق البوت وقاعدة البيانات"""
+        try:
+            await super().close()
+        finally:
+            try:
+                metrics.dump(config.METRICS_DUMP_PATH)
+            except OSError as e:
+                logger.warning(f"⚠️ تعذر حفظ المقاييس: {e}")
+            await db.close()
+            logger.info("✅ تم إغلاق اتصالات قاعدة البيانات")
 
 async def main():
     """الدالة الرئيسية"""
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from utils.translator import translator, get_text
 from utils.ui_components import create_colored_embed
+from utils.interaction_router import safe_send, safe_edit
 from utils import permissions
 from database import db
 
@@ -112,14 +113,10 @@ class AllianceSystemCog(commands.Cog):
         self.bot = bot
 
     async def _safe_send(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.followup.send(**kwargs)
-        return await interaction.response.send_message(**kwargs)
+        return await safe_send(interaction, **kwargs)
 
     async def _safe_edit(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.edit_original_response(**kwargs)
-        return await interaction.response.edit_message(**kwargs)
+        return await safe_edit(interaction, **kwargs)
 
     @app_commands.command(name='alliance', description='🤝 Alliance actions')
     @app_commands.describe(action='Action: menu/info/create/join/leave', name='Alliance name', tag='Alliance tag (3 chars)')
@@ -194,11 +191,9 @@ class AllianceSystemCog(commands.Cog):
             user = await db.get_user_by_discord_id(user_id)
             in_alliance = bool(user and user.alliance_id)
             # Check if user has alliance permissions
-            has_permissions = (
-                permissions.is_owner(interaction.user) or
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'alliance_management')
-            )
+            has_permissions = (await permissions.check_permissions(
+                interaction.user, ('alliance_management',)
+            ))['alliance_management']
             view = AllianceMenuView(user_id, in_alliance, has_permissions)
             if not in_alliance:
                 embed = create_colored_embed(
@@ -316,9 +311,8 @@ class AllianceSystemCog(commands.Cog):
         user_id = str(interaction.user.id)
         
         # Check permissions
-        if not (permissions.is_owner(interaction.user) or 
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'alliance_management')):
+        granted = await permissions.check_permissions(interaction.user, ('alliance_management',))
+        if not granted['alliance_management']:
             await self._safe_send(interaction, content=get_text(user_id, 'alliance.no_permission'), ephemeral=True)
             return
         
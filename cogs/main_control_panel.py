@@ -9,6 +9,7 @@ import logging
 
 from utils.translator import translator, get_text
 from utils.ui_components import create_colored_embed
+from utils.interaction_router import safe_send, safe_edit
 from utils import permissions
 
 logger = logging.getLogger('main_control_panel')
@@ -215,14 +216,10 @@ class MainControlPanelCog(commands.Cog):
         self.bot = bot
 
     async def _safe_send(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.followup.send(**kwargs)
-        return await interaction.response.send_message(**kwargs)
+        return await safe_send(interaction, **kwargs)
 
     async def _safe_edit(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.edit_original_response(**kwargs)
-        return await interaction.response.edit_message(**kwargs)
+        return await safe_edit(interaction, **kwargs)
     
     @app_commands.command(name='start', description='📖 Open Main Control Panel | فتح لوحة التحكم الرئيسية')
     async def start(self, interaction: discord.Interaction):
@@ -299,39 +296,17 @@ class MainControlPanelCog(commands.Cog):
         
         await self._safe_send(interaction, embed=embed, view=view, ephemeral=True)
     
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        """Handle button interactions"""
-        if interaction.type != discord.InteractionType.component:
-            return
-        
-        custom_id = (interaction.data or {}).get('custom_id', '')
-        
-        # Only handle main control panel buttons
-        if not custom_id.startswith('main_btn_'):
-            return
-        
-        user_id = str(interaction.user.id)
-        
-        # Load user language
-        from database import db
-        await translator.load_user_language_from_db(db, user_id)
-        
-        # Route to appropriate handler
-        if custom_id == 'main_btn_alliance':
-            await self._handle_alliance(interaction)
-        
-        elif custom_id == 'main_btn_reservations':
-            await self._handle_reservations(interaction)
-        
-        elif custom_id == 'main_btn_management':
-            await self._handle_management(interaction)
-        
-        elif custom_id == 'main_btn_language':
-            await self._handle_language(interaction)
-        
-        elif custom_id == 'main_btn_my_info':
-            await self._handle_my_info(interaction)
+    async def cog_load(self):
+        """Register main panel buttons with the central router"""
+        router = self.bot.router
+        router.add_route('main_btn_alliance', self._handle_alliance, owner=self)
+        router.add_route('main_btn_reservations', self._handle_reservations, owner=self)
+        router.add_route('main_btn_management', self._handle_management, owner=self)
+        router.add_route('main_btn_language', self._handle_language, owner=self)
+        router.add_route('main_btn_my_info', self._handle_my_info, owner=self)
+    
+    async def cog_unload(self):
+        self.bot.router.remove_routes(self)
     
     async def _handle_alliance(self, interaction: discord.Interaction):
         """Handle alliance button"""
@@ -412,8 +387,9 @@ class MainControlPanelCog(commands.Cog):
             lang = translator.get_user_language(user_id)
             lang_name = "العربية" if lang == 'ar' else "English"
             
-            # Get reservations count
+            # Get reservations count and leaderboard rank
             active_reservations = await db.get_active_bookings_count(user.user_id)
+            rank = await db.get_user_rank(user.user_id)
             
             # Build info embed
             embed = discord.Embed(
@@ -452,6 +428,12 @@ class MainControlPanelCog(commands.Cog):
                 inline=True
             )
             
+            embed.add_field(
+                name=get_text(user_id, 'my_info.rank'),
+                value=f"#{rank} / {len(db.leaderboard)} · ⭐ {user.points}" if rank else "-",
+                inline=True
+            )
+            
             embed.set_footer(text=f"User ID: {user_id}")
             
             view = MyInfoView(user_id)
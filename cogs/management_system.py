@@ -9,10 +9,13 @@ from discord import ui
 import logging
 from datetime import datetime
 
-from utils.translator import translator, get_text
+from utils.translator import get_text
 from utils.ui_components import create_colored_embed
+from utils.interaction_router import safe_send, safe_edit
 from utils import permissions
+from utils.metrics import metrics
 from database import db
+from config import config
 
 logger = logging.getLogger('management_system')
 
@@ -100,14 +103,10 @@ class ManagementSystemCog(commands.Cog):
         self.bot = bot
 
     async def _safe_send(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.followup.send(**kwargs)
-        return await interaction.response.send_message(**kwargs)
+        return await safe_send(interaction, **kwargs)
 
     async def _safe_edit(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.edit_original_response(**kwargs)
-        return await interaction.response.edit_message(**kwargs)
+        return await safe_edit(interaction, **kwargs)
     
     async def show_management_panel(self, interaction: discord.Interaction):
         """Show management panel"""
@@ -133,62 +132,37 @@ class ManagementSystemCog(commands.Cog):
         
         await self._safe_edit(interaction, embed=embed, view=view)
     
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        """Handle management interactions"""
-        if interaction.type != discord.InteractionType.component:
-            return
-        
-        custom_id = (interaction.data or {}).get('custom_id', '')
-        
-        # Only handle management buttons
-        if not custom_id.startswith('mgmt_'):
-            return
-        
-        user_id = str(interaction.user.id)
-        
-        # Load user language
-        await translator.load_user_language_from_db(db, user_id)
-        
-        # Check permissions for all management actions
-        if not permissions.is_admin(interaction.user) and not permissions.is_owner(interaction.user):
-            await self._safe_send(
-                interaction,
-                content=get_text(user_id, 'admin.no_permission'),
-                ephemeral=True
-            )
-            return
-        
-        # Route to handlers
-        if custom_id == 'mgmt_alliance':
-            await self._show_alliance_management(interaction)
-        
-        elif custom_id == 'mgmt_reservations':
-            await self._show_reservations_management(interaction)
-        
-        elif custom_id == 'mgmt_users':
-            await self._show_users_management(interaction)
-        
-        elif custom_id == 'mgmt_system':
-            await self._show_system_management(interaction)
-        
-        elif custom_id == 'mgmt_permissions':
-            await self._show_permissions_management(interaction)
-        
-        elif custom_id == 'mgmt_back':
-            await self._back_to_main(interaction)
-        
-        elif custom_id == 'mgmt_back_to_panel':
-            await self.show_management_panel(interaction)
+    async def cog_load(self):
+        """Register management buttons with the central router"""
+        router = self.bot.router
+        routes = {
+            'mgmt_alliance': self._show_alliance_management,
+            'mgmt_reservations': self._show_reservations_management,
+            'mgmt_users': self._show_users_management,
+            'mgmt_system': self._show_system_management,
+            'mgmt_metrics_dump': self._dump_metrics,
+            'mgmt_permissions': self._show_permissions_management,
+            'mgmt_back': self._back_to_main,
+            'mgmt_back_to_panel': self.show_management_panel,
+        }
+        # All management actions require admin or owner
+        for custom_id, handler in routes.items():
+            router.add_route(custom_id, handler, owner=self, check=self._is_staff)
+    
+    async def cog_unload(self):
+        self.bot.router.remove_routes(self)
+    
+    @staticmethod
+    def _is_staff(interaction: discord.Interaction) -> bool:
+        return permissions.is_admin(interaction.user) or permissions.is_owner(interaction.user)
     
     async def _show_alliance_management(self, interaction: discord.Interaction):
         """Show alliance management"""
         user_id = str(interaction.user.id)
         
         # Check specific permission
-        if not (permissions.is_owner(interaction.user) or
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'alliance_management')):
+        granted = await permissions.check_permissions(interaction.user, ('alliance_management',))
+        if not granted['alliance_management']:
             await self._safe_send(
                 interaction,
                 content=get_text(user_id, 'admin.no_permission'),
@@ -245,9 +219,8 @@ class ManagementSystemCog(commands.Cog):
         user_id = str(interaction.user.id)
         
         # Check specific permission
-        if not (permissions.is_owner(interaction.user) or
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'reservations_management')):
+        granted = await permissions.check_permissions(interaction.user, ('reservations_management',))
+        if not granted['reservations_management']:
             await self._safe_send(
                 interaction,
                 content=get_text(user_id, 'admin.no_permission'),
@@ -306,9 +279,8 @@ class ManagementSystemCog(commands.Cog):
         user_id = str(interaction.user.id)
         
         # Check specific permission
-        if not (permissions.is_owner(interaction.user) or
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'user_management')):
+        granted = await permissions.check_permissions(interaction.user, ('user_management',))
+        if not granted['user_management']:
             await self._safe_send(
                 interaction,
                 content=get_text(user_id, 'admin.no_permission'),
@@ -365,9 +337,8 @@ class ManagementSystemCog(commands.Cog):
         user_id = str(interaction.user.id)
         
         # Check specific permission
-        if not (permissions.is_owner(interaction.user) or
-                permissions.is_admin(interaction.user) or
-                await permissions.has_permission(interaction.user, 'system_management')):
+        granted = await permissions.check_permissions(interaction.user, ('system_management',))
+        if not granted['system_management']:
             await self._safe_send(
                 interaction,
                 content=get_text(user_id, 'admin.no_permission'),
@@ -405,8 +376,19 @@ class ManagementSystemCog(commands.Cog):
             inline=True
         )
         
-        # Back button
+        embed.add_field(
+            name=get_text(user_id, 'admin.slowest_routes'),
+            value=self._format_route_metrics(user_id),
+            inline=False
+        )
+        
+        # Metrics dump + back buttons
         view = discord.ui.View(timeout=180)
+        view.add_item(discord.ui.Button(
+            label=get_text(user_id, 'admin.metrics_dump'),
+            style=discord.ButtonStyle.primary,
+            custom_id='mgmt_metrics_dump'
+        ))
         view.add_item(discord.ui.Button(
             label=get_text(user_id, 'common.back'),
             style=discord.ButtonStyle.secondary,
@@ -415,6 +397,51 @@ class ManagementSystemCog(commands.Cog):
         
         await self._safe_edit(interaction, embed=embed, view=view)
     
+    @staticmethod
+    def _format_route_metrics(user_id: str, limit: int = 6) -> str:
+        """أبطأ المسارات: زمن المعالج، أول رد، قاعدة البيانات وHTTP"""
+        lines = []
+        for name, route in metrics.top(limit):
+            lat = route.latency
+            lines.append(
+                f"`{name[:28]}` {lat.percentile(50):.0f} / {lat.percentile(95):.0f} / {lat.percentile(99):.0f}"
+                f" · 1st {route.first_response.percentile(95):.0f} · db {route.db.percentile(95):.0f}"
+                f" · http {route.http.percentile(95):.0f} · n={route.calls}"
+                + (f" · ❌{route.errors}" if route.errors else "")
+            )
+        if not lines:
+            return get_text(user_id, 'admin.metrics_empty')
+        return "\n".join(lines)[:1024]
+    
+    async def _dump_metrics(self, interaction: discord.Interaction):
+        """Dump interaction metrics to a JSON file"""
+        user_id = str(interaction.user.id)
+        
+        granted = await permissions.check_permissions(interaction.user, ('system_management',))
+        if not granted['system_management']:
+            await self._safe_send(
+                interaction,
+                content=get_text(user_id, 'admin.no_permission'),
+                ephemeral=True
+            )
+            return
+        
+        try:
+            path = metrics.dump(config.METRICS_DUMP_PATH)
+            await self._safe_send(
+                interaction,
+                content=get_text(user_id, 'admin.metrics_saved', count=len(metrics.routes), path=path),
+                file=discord.File(path),
+                ephemeral=True
+            )
+        except Exception as e:
+            logger.error(f"Error dumping metrics: {e}")
+            await self._safe_send(
+                interaction,
+                content=f"❌ Error: {str(e)}",
+                ephemeral=True
+            )
+    
     async def _show_permissions_management(self, interaction: discord.Interaction):
         """Show permissions management (owner only)"""
         user_id = str(interaction.user.id)
@@ -8,16 +8,26 @@ from discord.ext import commands
 from discord import ui
 import logging
 from datetime import datetime, timedelta
+from functools import partial
 import pytz
 
 from utils.translator import translator, get_text
 from utils.ui_components import create_colored_embed
+from utils.interaction_router import safe_send, safe_edit
+from utils.pagination import PaginationView, KeysetPageSource
 from utils import permissions
-from database import db
+from database import db, SlotConflictError
 
 logger = logging.getLogger('reservations_system')
 
 
+def format_free_windows(windows) -> str:
+    """سطر لكل نافذة حرة بطوابع Discord الزمنية (تظهر بتوقيت المستخدم)"""
+    return "\n".join(
+        f"• <t:{int(start.timestamp())}:f> → <t:{int(end.timestamp())}:f>" for start, end in windows
+    )
+
+
 class ReservationsMenuView(discord.ui.View):
     """Reservations main menu"""
     
@@ -114,6 +124,15 @@ class ReservationSectionView(discord.ui.View):
             row=0
         ))
         
+        # Suggest free times button
+        self.add_item(discord.ui.Button(
+            label=get_text(user_id, 'reservations.suggest_times'),
+            style=discord.ButtonStyle.secondary,
+            custom_id=f'res_suggest_{self.section_type}',
+            emoji='🕒',
+            row=0
+        ))
+        
         # Back button
         self.add_item(discord.ui.Button(
             label=get_text(user_id, 'common.back'),
@@ -220,7 +239,9 @@ class ReservationModal(ui.Modal):
                 )
             
             # Check for conflicts
-            conflict = await db.check_booking_conflict(user.user_id, scheduled_time)
+            conflict = await db.check_booking_conflict(
+                user.user_id, scheduled_time, duration_days, self.section_type
+            )
             if conflict:
                 await interaction.response.send_message(
                     get_text(self.user_id, 'reservations.conflict_msg'),
@@ -273,6 +294,18 @@ class ReservationModal(ui.Modal):
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
+        except SlotConflictError as e:
+            content = get_text(
+                self.user_id, 'reservations.slot_full',
+                type=get_text(self.user_id, f'reservations.{e.booking_type}'),
+                peak=e.peak,
+                capacity=e.capacity
+            )
+            # Offer the nearest free windows instead of another guess
+            windows = db.find_free_slots(e.booking_type, duration_days, after=scheduled_time, limit=3)
+            if windows:
+                content += f"\n\n{get_text(self.user_id, 'reservations.suggest_alternatives')}\n{format_free_windows(windows)}"
+            await interaction.response.send_message(content, ephemeral=True)
         except ValueError as e:
             await interaction.response.send_message(
                 f"❌ Invalid format. Please use YYYY-MM-DD for date and HH:MM for time.",
@@ -293,14 +326,10 @@ class ReservationsSystemCog(commands.Cog):
         self.bot = bot
 
     async def _safe_send(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.followup.send(**kwargs)
-        return await interaction.response.send_message(**kwargs)
+        return await safe_send(interaction, **kwargs)
 
     async def _safe_edit(self, interaction: discord.Interaction, **kwargs):
-        if interaction.response.is_done():
-            return await interaction.edit_original_response(**kwargs)
-        return await interaction.response.edit_message(**kwargs)
+        return await safe_edit(interaction, **kwargs)
 
     @app_commands.command(name='booking', description='📅 Open reservations menu')
     async def booking(self, interaction: discord.Interaction):
@@ -329,49 +358,31 @@ class ReservationsSystemCog(commands.Cog):
         
         await self._safe_edit(interaction, embed=embed, view=view)
     
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        """Handle reservation interactions"""
-        if interaction.type != discord.InteractionType.component:
-            return
-        
-        custom_id = (interaction.data or {}).get('custom_id', '')
+    async def cog_load(self):
+        """Register reservation buttons with the central router"""
+        router = self.bot.router
         
-        # Only handle reservation buttons
-        if not custom_id.startswith('res_'):
-            return
-        
-        user_id = str(interaction.user.id)
-        
-        # Load user language
-        await translator.load_user_language_from_db(db, user_id)
-        
-        # Handle section selection
-        if custom_id in ['res_building', 'res_training', 'res_research']:
+        # Section selection
+        for custom_id in ('res_building', 'res_training', 'res_research'):
             section_type = custom_id.replace('res_', '')
-            await self._show_section(interaction, section_type)
+            router.add_route(custom_id, partial(self._show_section, section_type=section_type), owner=self)
         
-        # Handle create reservation
-        elif custom_id.startswith('res_create_'):
-            section_type = custom_id.replace('res_create_', '')
-            modal = ReservationModal(user_id, section_type)
-            await interaction.response.send_modal(modal)
+        # Per-section actions: the remainder of the custom_id is the section type
+        router.add_route('res_create_', self._open_reservation_modal, prefix=True, owner=self, auto_defer=False)
+        router.add_route('res_schedule_', self._show_schedule, prefix=True, owner=self)
+        router.add_route('res_suggest_', self._show_free_slots, prefix=True, owner=self)
         
-        # Handle view schedule
-        elif custom_id.startswith('res_schedule_'):
-            section_type = custom_id.replace('res_schedule_', '')
-            await self._show_schedule(interaction, section_type)
-        
-        # Handle my reservations
-        elif custom_id == 'res_my_reservations':
-            await self._show_my_reservations(interaction)
-        
-        # Handle back buttons
-        elif custom_id == 'res_back_to_menu':
-            await self.show_reservations_menu(interaction)
-        
-        elif custom_id == 'res_back':
-            await self._back_to_main(interaction)
+        router.add_route('res_my_reservations', self._show_my_reservations, owner=self)
+        router.add_route('res_back_to_menu', self.show_reservations_menu, owner=self)
+        router.add_route('res_back', self._back_to_main, owner=self)
+    
+    async def cog_unload(self):
+        self.bot.router.remove_routes(self)
+    
+    async def _open_reservation_modal(self, interaction: discord.Interaction, section_type: str):
+        """Open the create reservation modal"""
+        modal = ReservationModal(str(interaction.user.id), section_type)
+        await interaction.response.send_modal(modal)
     
     async def _show_section(self, interaction: discord.Interaction, section_type: str):
         """Show a specific section"""
@@ -393,38 +404,69 @@ class ReservationsSystemCog(commands.Cog):
         
         await self._safe_edit(interaction, embed=embed, view=view)
     
+    async def _show_free_slots(self, interaction: discord.Interaction, section_type: str):
+        """Show the next free windows for a section"""
+        user_id = str(interaction.user.id)
+        horizon_days = 90
+        
+        windows = db.find_free_slots(section_type, 1, limit=5, horizon_days=horizon_days)
+        type_name = get_text(user_id, f'reservations.{section_type}')
+        
+        embed = create_colored_embed(
+            get_text(user_id, 'reservations.suggest_title'),
+            get_text(user_id, 'reservations.suggest_desc', days=1, type=type_name),
+            'info'
+        )
+        embed.add_field(
+            name=type_name,
+            value=format_free_windows(windows) if windows else get_text(user_id, 'reservations.suggest_none', days=horizon_days),
+            inline=False
+        )
+        
+        await self._safe_send(interaction, embed=embed, ephemeral=True)
+    
     async def _show_schedule(self, interaction: discord.Interaction, section_type: str):
         """Show schedule for a section"""
         user_id = str(interaction.user.id)
         
         try:
-            # Get all active bookings for this type
-            bookings = await db.get_bookings_by_type(section_type, 'active')
-            
-            embed = discord.Embed(
-                title=f"📊 {get_text(user_id, 'reservations.view_schedule')}",
-                description=f"Active reservations for {section_type}",
-                color=discord.Color.blue()
+            # Active bookings for this type, one keyset page at a time
+            source = KeysetPageSource(
+                fetch=lambda anchor, limit, reverse: db.get_bookings_page(
+                    booking_type=section_type, anchor=anchor, limit=limit, reverse=reverse
+                ),
+                count=lambda: db.count_bookings(booking_type=section_type),
+                key=lambda booking: (booking.scheduled_ts, booking.booking_id),
+                per_page=10
             )
             
-            if not bookings:
-                embed.description = get_text(user_id, 'reservations.no_data_msg')
-            else:
-                for booking in bookings[:10]:  # Show first 10
+            def render(bookings, page, max_page):
+                embed = discord.Embed(
+                    title=f"📊 {get_text(user_id, 'reservations.view_schedule')}",
+                    description=f"Active reservations for {section_type}",
+                    color=discord.Color.blue()
+                )
+                if not bookings:
+                    embed.description = get_text(user_id, 'reservations.no_data_msg')
+                for booking in bookings:
                     time_str = booking.scheduled_time.strftime('%Y-%m-%d %H:%M UTC') if booking.scheduled_time else 'N/A'
                     embed.add_field(
                         name=f"{booking.player_name} ({booking.alliance_name})",
                         value=f"**Time:** {time_str}\n**Duration:** {booking.duration_days} days",
                         inline=False
                     )
+                embed.set_footer(text=f"📄 {page + 1}/{max_page + 1} · {source.total}")
+                return embed
             
             # Back button
-            view = discord.ui.View(timeout=180)
-            view.add_item(discord.ui.Button(
+            back = discord.ui.Button(
                 label=get_text(user_id, 'common.back'),
                 style=discord.ButtonStyle.secondary,
                 custom_id=f'res_{section_type}'
-            ))
+            )
+            view, embed = await PaginationView.create(
+                source=source, user_id=user_id, embed_generator=render, extra_items=[back]
+            )
             
             await self._safe_edit(interaction, embed=embed, view=view)
             
@@ -446,32 +488,42 @@ class ReservationsSystemCog(commands.Cog):
                 await self._safe_send(interaction, content=get_text(user_id, 'reservations.no_data_msg'), ephemeral=True)
                 return
             
-            bookings = await db.get_user_bookings(user.user_id, 'active')
-            
-            embed = discord.Embed(
-                title=get_text(user_id, 'reservations.my_reservations'),
-                color=discord.Color.green()
+            source = KeysetPageSource(
+                fetch=lambda anchor, limit, reverse: db.get_bookings_page(
+                    user_id=user.user_id, anchor=anchor, limit=limit, reverse=reverse
+                ),
+                count=lambda: db.count_bookings(user_id=user.user_id),
+                key=lambda booking: (booking.scheduled_ts, booking.booking_id),
+                per_page=10
             )
+            type_emoji = {'building': '🏗️', 'training': '⚔️', 'research': '🔬'}
             
-            if not bookings:
-                embed.description = get_text(user_id, 'reservations.no_reservations')
-            else:
+            def render(bookings, page, max_page):
+                embed = discord.Embed(
+                    title=get_text(user_id, 'reservations.my_reservations'),
+                    color=discord.Color.green()
+                )
+                if not bookings:
+                    embed.description = get_text(user_id, 'reservations.no_reservations')
                 for booking in bookings:
                     time_str = booking.scheduled_time.strftime('%Y-%m-%d %H:%M UTC') if booking.scheduled_time else 'N/A'
-                    type_emoji = {'building': '🏗️', 'training': '⚔️', 'research': '🔬'}
                     embed.add_field(
                         name=f"{type_emoji.get(booking.booking_type, '📅')} {booking.booking_type.title()}",
                         value=f"**Member:** {booking.player_name}\n**Alliance:** {booking.alliance_name}\n**Time:** {time_str}\n**Duration:** {booking.duration_days} days",
                         inline=False
                     )
+                embed.set_footer(text=f"📄 {page + 1}/{max_page + 1} · {source.total}")
+                return embed
             
             # Back button
-            view = discord.ui.View(timeout=180)
-            view.add_item(discord.ui.Button(
+            back = discord.ui.Button(
                 label=get_text(user_id, 'common.back'),
                 style=discord.ButtonStyle.secondary,
                 custom_id='res_back_to_menu'
-            ))
+            )
+            view, embed = await PaginationView.create(
+                source=source, user_id=user_id, embed_generator=render, extra_items=[back]
+            )
             
             await self._safe_edit(interaction, embed=embed, view=view)
             
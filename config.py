@@ -28,6 +28,12 @@ class Config:
     
     # Bot Settings
     MAX_ACTIVE_BOOKINGS: int = int(os.getenv('MAX_ACTIVE_BOOKINGS', 5))
+    # Concurrent active bookings allowed per booking type (0 = unlimited, the default).
+    # A booking holds its slot for duration_days whole days from its start time.
+    SLOT_CAPACITY = {
+        booking_type: int(os.getenv(f'SLOT_CAPACITY_{booking_type.upper()}', 0))
+        for booking_type in ('building', 'research', 'training')
+    }
     LANGUAGE: str = os.getenv('LANGUAGE', 'EN').strip().lower()
     TIMEZONE: str = os.getenv('TIMEZONE', 'Asia/Riyadh')
     
@@ -35,14 +41,47 @@ class Config:
     REMINDER_24H: bool = os.getenv('REMINDER_24H', 'true').lower() == 'true'
     REMINDER_1H: bool = os.getenv('REMINDER_1H', 'true').lower() == 'true'
     REMINDER_NOW: bool = os.getenv('REMINDER_NOW', 'true').lower() == 'true'
+    REMINDER_WORKERS: int = int(os.getenv('REMINDER_WORKERS', 8))
+    REMINDER_MAX_ATTEMPTS: int = int(os.getenv('REMINDER_MAX_ATTEMPTS', 5))
+    REMINDER_RETRY_SECONDS: int = int(os.getenv('REMINDER_RETRY_SECONDS', 30))
+    REMINDER_CATCH_UP_MINUTES: int = int(os.getenv('REMINDER_CATCH_UP_MINUTES', 30))
+    
+    # Reminder offsets in hours before the booking (0 = at booking time)
+    REMINDER_OFFSETS_HOURS = [
+        hours for hours, enabled in ((24, REMINDER_24H), (6, True), (3, True), (1, REMINDER_1H), (0, REMINDER_NOW))
+        if enabled
+    ]
     
     # Backup Settings
     AUTO_BACKUP_HOURS: int = int(os.getenv('AUTO_BACKUP_HOURS', 6))
+    BACKUP_FULL_EVERY: int = int(os.getenv('BACKUP_FULL_EVERY', 24))  # full backup every N backups
+    BACKUP_KEEP_HOURLY: int = int(os.getenv('BACKUP_KEEP_HOURLY', 24))
+    BACKUP_KEEP_DAILY: int = int(os.getenv('BACKUP_KEEP_DAILY', 7))
+    BACKUP_KEEP_WEEKLY: int = int(os.getenv('BACKUP_KEEP_WEEKLY', 4))
+    BACKUP_PAGES_PER_STEP: int = int(os.getenv('BACKUP_PAGES_PER_STEP', 1024))
+    BACKUP_COMPRESS_LEVEL: int = int(os.getenv('BACKUP_COMPRESS_LEVEL', 6))
+    
+    # Database Settings
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', 4))
+    AUDIT_BATCH_SIZE: int = int(os.getenv('AUDIT_BATCH_SIZE', 100))
+    AUDIT_FLUSH_MS: int = int(os.getenv('AUDIT_FLUSH_MS', 500))
+    AUDIT_QUEUE_SIZE: int = int(os.getenv('AUDIT_QUEUE_SIZE', 5000))
+    MIGRATION_CHUNK_SIZE: int = int(os.getenv('MIGRATION_CHUNK_SIZE', 5000))
+    COUNTER_RECONCILE_HOURS: int = int(os.getenv('COUNTER_RECONCILE_HOURS', 6))
+    BOOKING_ARCHIVE_DAYS: int = int(os.getenv('BOOKING_ARCHIVE_DAYS', 30))  # finished bookings older than this move to history
+    BOOKING_ARCHIVE_BATCH: int = int(os.getenv('BOOKING_ARCHIVE_BATCH', 1000))
+    USER_CACHE_SIZE: int = int(os.getenv('USER_CACHE_SIZE', 2048))
+    USER_CACHE_TTL: int = int(os.getenv('USER_CACHE_TTL', 300))  # seconds
+    LANGUAGE_CACHE_SIZE: int = int(os.getenv('LANGUAGE_CACHE_SIZE', 50000))
+    
+    # Interaction Settings
+    INTERACTION_DEFER_BUDGET_MS: int = int(os.getenv('INTERACTION_DEFER_BUDGET_MS', 1500))
     
     # Paths
     DATABASE_PATH: str = 'data/bookings.db'
     BACKUP_DIR: str = 'data/backups'
     LOGS_DIR: str = 'logs'
+    METRICS_DUMP_PATH: str = 'logs/metrics.json'
     
     # Booking Types
     BOOKING_TYPES = {
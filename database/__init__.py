@@ -3,5 +3,6 @@ Database Package
 """
 from .db_manager import db, DatabaseManager
 from .models import User, Booking, Alliance, Achievement, Log
+from .slots import SlotConflictError
 
-__all__ = ['db', 'DatabaseManager', 'User', 'Booking', 'Alliance', 'Achievement', 'Log']
+__all__ = ['db', 'DatabaseManager', 'User', 'Booking', 'Alliance', 'Achievement', 'Log', 'SlotConflictError']
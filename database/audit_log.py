@@ -0,0 +1,163 @@
+"""
+سجل التدقيق المؤجل - Write-behind Audit Log
+Buffers log rows and flushes them in batched transactions
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger('database')
+
+LogRow = Tuple[str, Optional[str], Optional[int], str, Optional[str], str, int]
+
+
+class AuditLogWriter:
+    """كاتب سجلات مؤجل مع تجميع الدفعات"""
+
+    def __init__(self, pool, batch_size: int = 100, flush_interval_ms: int = 500,
+                 max_queue: int = 5000, enqueue_timeout: float = 1.0):
+        self.pool = pool
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None  # set whenever a row is queued
+        self._batch: List[LogRow] = []  # rows collected by _run but not yet written
+
+        # Counters
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """بدء مهمة التفريغ في الخلفية"""
+        if self.running:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name='audit-log-writer')
+        logger.info(f"✅ Audit log writer started (batch={self.batch_size}, interval={self.flush_interval * 1000:.0f}ms)")
+
+    async def stop(self):
+        """إيقاف المهمة مع تفريغ كل ما تبقى"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()  # don't wait out the flush interval
+        try:
+            await self._task
+        except Exception as e:
+            logger.error(f"❌ Audit log writer crashed: {e}")
+        self._task = None
+        await self.flush()
+        logger.info(f"✅ Audit log writer stopped ({self.flushed} flushed, {self.dropped} dropped)")
+
+    async def enqueue(self, action_type: str, description: str, user_id: str = None,
+                      booking_id: int = None, details: str = None) -> bool:
+        """إضافة سجل إلى الطابور، مع الانتظار عند امتلائه"""
+        now = datetime.now(timezone.utc)
+        row: LogRow = (action_type, user_id, booking_id, description, details,
+                       now.strftime('%Y-%m-%d %H:%M:%S'), int(now.timestamp()))
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            logger.warning(f"⚠️ Audit log queue full, dropped '{action_type}' entry")
+            return False
+        self.queued += 1
+        self._wakeup.set()
+        return True
+
+    def _drain(self, limit: int) -> List[LogRow]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    async def _write(self, rows: List[LogRow]):
+        if not rows:
+            return
+        try:
+            async with self.pool.writer() as db:
+                try:
+                    await db.executemany(
+                        """INSERT INTO logs (action_type, user_id, booking_id, description, details, created_at, created_ts)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        rows
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            self.flushed += len(rows)
+            self.batches += 1
+        except Exception as e:
+            self.dropped += len(rows)
+            logger.error(f"❌ Failed to flush {len(rows)} audit log rows: {e}")
+
+    async def flush(self):
+        """تفريغ الطابور فوراً"""
+        if self._queue is None:
+            return
+        async with self._flush_lock:
+            # _run only takes rows with _drain, so every queued row is either
+            # in self._batch (older) or still in the queue
+            rows, self._batch = self._batch, []
+            rows += self._drain(self.batch_size - len(rows))
+            while rows:
+                await self._write(rows)
+                rows = self._drain(self.batch_size)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            if self._queue.empty():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    continue
+            deadline = loop.time() + self.flush_interval
+
+            while True:
+                # rows are only taken synchronously, so none is ever held
+                # outside self._batch where flush() cannot see it
+                self._wakeup.clear()
+                self._batch += self._drain(self.batch_size - len(self._batch))
+                remaining = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or remaining <= 0 or self._stopping:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            async with self._flush_lock:
+                rows, self._batch = self._batch, []
+                await self._write(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """عدادات السجل المؤجل"""
+        return {
+            'running': self.running,
+            'pending': (self._queue.qsize() if self._queue is not None else 0) + len(self._batch),
+            'queued': self.queued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'batches': self.batches,
+        }
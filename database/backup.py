@@ -0,0 +1,448 @@
+"""
+النسخ الاحتياطي المباشر - Online Backup
+SQLite online backup API, gzip compression and SHA-256 manifests,
+incremental page chains and tiered retention
+(blocking functions, meant to run in a worker thread)
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+PAGE_DIGEST_SIZE = 8
+INCREMENTAL_MAGIC = b'BKINC1\n'
+PAGE_HEADER = struct.Struct('>I')
+
+FULL_SUFFIX = '.db.gz'
+INCREMENTAL_SUFFIX = '.inc.gz'
+LEGACY_SUFFIX = '.db'
+
+
+@dataclass
+class BackupResult:
+    """نتيجة النسخ الاحتياطي"""
+    path: str
+    manifest_path: str
+    kind: str
+    parent: Optional[str]
+    sequence: int
+    size_bytes: int
+    db_bytes: int
+    pages: int
+    changed_pages: int
+    page_size: int
+    duration: float
+    sha256: str
+    db_sha256: str
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.duration if self.duration > 0 else float(self.pages)
+
+
+class ChangeMonitor:
+    """مراقبة تغيّر قاعدة البيانات عبر PRAGMA data_version"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._seen: Optional[int] = None
+
+    def poll(self) -> int:
+        # data_version changes whenever another connection commits,
+        # so this connection must stay open and never write
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def has_changed(self, version: int) -> bool:
+        return self._seen is None or version != self._seen
+
+    def mark(self, version: int):
+        self._seen = version
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ====== Naming ======
+
+def backup_stem(path: str) -> str:
+    """اسم النسخة دون الامتداد"""
+    name = os.path.basename(path)
+    for suffix in (FULL_SUFFIX, INCREMENTAL_SUFFIX, LEGACY_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def manifest_path_for(backup_path: str) -> str:
+    return os.path.join(os.path.dirname(backup_path), backup_stem(backup_path) + '.manifest.json')
+
+
+def page_hashes_path_for(backup_path: str) -> str:
+    return os.path.join(os.path.dirname(backup_path), backup_stem(backup_path) + '.pages')
+
+
+def write_manifest(path: str, data: dict):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def read_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ====== Snapshot ======
+
+def snapshot_database(db_path: str, dest_path: str, pages_per_step: int = 1024,
+                      sleep: float = 0.005) -> Tuple[int, int]:
+    """نسخة متسقة من قاعدة بيانات حية عبر Backup API، وإرجاع (عدد الصفحات, حجم الصفحة)"""
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(dest_path)
+    try:
+        # الخطوات الصغيرة تترك مجالاً للكتّاب بين كل دفعة وأخرى
+        src.backup(dst, pages=pages_per_step, sleep=sleep)
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        page_size = dst.execute("PRAGMA page_size").fetchone()[0]
+        return page_count, page_size
+    finally:
+        dst.close()
+        src.close()
+
+
+def _iter_pages(path: str, page_size: int) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            yield page
+
+
+def _page_digest(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=PAGE_DIGEST_SIZE).digest()
+
+
+def _load_page_hashes(path: str) -> Optional[List[bytes]]:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    return [data[i:i + PAGE_DIGEST_SIZE] for i in range(0, len(data), PAGE_DIGEST_SIZE)]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _HashingWriter:
+    """كاتب يحسب SHA-256 لما يُكتب على القرص"""
+
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+# ====== Catalog ======
+
+def list_backups(backup_dir: str) -> List[dict]:
+    """قائمة النسخ الموجودة (من ملفات البيان)، من الأقدم إلى الأحدث"""
+    entries = []
+    if not os.path.isdir(backup_dir):
+        return entries
+
+    for file in os.listdir(backup_dir):
+        if not file.startswith('auto_backup_') or not file.endswith((FULL_SUFFIX, INCREMENTAL_SUFFIX, LEGACY_SUFFIX)):
+            continue
+        path = os.path.join(backup_dir, file)
+        manifest = read_manifest(manifest_path_for(path))
+        if manifest is None:
+            # نسخة قديمة بلا بيان: تُعامل كنسخة كاملة مستقلة
+            manifest = {
+                'file': file,
+                'kind': 'full',
+                'parent': None,
+                'sequence': 0,
+                'created_at': datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat(),
+            }
+        manifest.setdefault('kind', 'full')
+        manifest.setdefault('parent', None)
+        manifest.setdefault('sequence', 0)
+        manifest['stem'] = backup_stem(path)
+        manifest['path'] = path
+        entries.append(manifest)
+
+    entries.sort(key=lambda m: (m['created_at'], m['sequence']))
+    return entries
+
+
+def _chain(entries_by_stem: Dict[str, dict], stem: str) -> List[dict]:
+    """سلسلة النسخ من النسخة الكاملة حتى النسخة المطلوبة"""
+    chain = []
+    seen = set()
+    while stem:
+        if stem in seen or stem not in entries_by_stem:
+            raise ValueError(f'Broken backup chain at {stem}')
+        seen.add(stem)
+        entry = entries_by_stem[stem]
+        chain.append(entry)
+        stem = entry['parent'] if entry['kind'] == 'incremental' else None
+    chain.reverse()
+    return chain
+
+
+# ====== Create ======
+
+def _write_full(snapshot: str, backup_path: str, page_size: int, compresslevel: int):
+    page_digests = []
+    raw_hash = hashlib.sha256()
+    with open(backup_path + '.tmp', 'wb') as raw_out:
+        writer = _HashingWriter(raw_out)
+        with gzip.GzipFile(filename='', mode='wb', fileobj=writer, compresslevel=compresslevel, mtime=0) as gz:
+            for page in _iter_pages(snapshot, page_size):
+                raw_hash.update(page)
+                page_digests.append(_page_digest(page))
+                gz.write(page)
+    os.replace(backup_path + '.tmp', backup_path)
+    return writer.hash.hexdigest(), raw_hash.hexdigest(), page_digests, len(page_digests)
+
+
+def _write_incremental(snapshot: str, backup_path: str, page_size: int, compresslevel: int,
+                       base_digests: List[bytes]):
+    page_digests = []
+    raw_hash = hashlib.sha256()
+    changed = 0
+    with open(backup_path + '.tmp', 'wb') as raw_out:
+        writer = _HashingWriter(raw_out)
+        with gzip.GzipFile(filename='', mode='wb', fileobj=writer, compresslevel=compresslevel, mtime=0) as gz:
+            gz.write(INCREMENTAL_MAGIC)
+            for page_no, page in enumerate(_iter_pages(snapshot, page_size)):
+                raw_hash.update(page)
+                digest = _page_digest(page)
+                page_digests.append(digest)
+                if page_no >= len(base_digests) or base_digests[page_no] != digest:
+                    gz.write(PAGE_HEADER.pack(page_no))
+                    gz.write(page)
+                    changed += 1
+    os.replace(backup_path + '.tmp', backup_path)
+    return writer.hash.hexdigest(), raw_hash.hexdigest(), page_digests, changed
+
+
+def create_backup(db_path: str, backup_dir: str, name: str, full_every: int = 24,
+                  pages_per_step: int = 1024, sleep: float = 0.005,
+                  compresslevel: int = 6) -> Optional[BackupResult]:
+    """
+    إنشاء نسخة احتياطية: كاملة، أو تزايدية تحوي الصفحات المتغيرة منذ آخر نسخة في السلسلة.
+    تُرجع None إذا لم تتغير أي صفحة.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    # رأس السلسلة الحالية (أحدث نسخة لها بصمات صفحات)
+    head = None
+    base_digests = None
+    for entry in reversed(list_backups(backup_dir)):
+        base_digests = _load_page_hashes(page_hashes_path_for(entry['path']))
+        if base_digests is not None:
+            head = entry
+            break
+
+    snapshot = os.path.join(backup_dir, f'.{name}.snapshot')
+    try:
+        pages, page_size = snapshot_database(db_path, snapshot, pages_per_step, sleep)
+        db_bytes = os.path.getsize(snapshot)
+
+        incremental = (
+            head is not None
+            and head.get('page_size') == page_size
+            and head['sequence'] + 1 < full_every
+        )
+
+        if incremental:
+            backup_path = os.path.join(backup_dir, name + INCREMENTAL_SUFFIX)
+            sha256, db_sha256, page_digests, changed = _write_incremental(
+                snapshot, backup_path, page_size, compresslevel, base_digests
+            )
+            if changed == 0 and len(page_digests) == len(base_digests):
+                os.remove(backup_path)
+                return None
+            kind, parent, sequence = 'incremental', head['stem'], head['sequence'] + 1
+        else:
+            backup_path = os.path.join(backup_dir, name + FULL_SUFFIX)
+            sha256, db_sha256, page_digests, changed = _write_full(
+                snapshot, backup_path, page_size, compresslevel
+            )
+            kind, parent, sequence = 'full', None, 0
+    finally:
+        for leftover in (snapshot, os.path.join(backup_dir, name + FULL_SUFFIX + '.tmp'),
+                         os.path.join(backup_dir, name + INCREMENTAL_SUFFIX + '.tmp')):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    with open(page_hashes_path_for(backup_path), 'wb') as f:
+        f.write(b''.join(page_digests))
+
+    result = BackupResult(
+        path=backup_path,
+        manifest_path=manifest_path_for(backup_path),
+        kind=kind,
+        parent=parent,
+        sequence=sequence,
+        size_bytes=os.path.getsize(backup_path),
+        db_bytes=db_bytes,
+        pages=pages,
+        changed_pages=changed,
+        page_size=page_size,
+        duration=time.perf_counter() - started,
+        sha256=sha256,
+        db_sha256=db_sha256,
+    )
+
+    manifest = asdict(result)
+    manifest.update({
+        'file': os.path.basename(backup_path),
+        'compression': 'gzip',
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    })
+    manifest.pop('path')
+    manifest.pop('manifest_path')
+    write_manifest(result.manifest_path, manifest)
+    return result
+
+
+# ====== Verify / Restore ======
+
+def verify_backup(backup_path: str) -> bool:
+    """التحقق من تطابق النسخة مع ملف البيان"""
+    manifest = read_manifest(manifest_path_for(backup_path))
+    if not manifest:
+        return False
+    return _file_sha256(backup_path) == manifest.get('sha256')
+
+
+def _apply_incremental(path: str, target, page_size: int, pages: int):
+    with gzip.open(path, 'rb') as src:
+        if src.read(len(INCREMENTAL_MAGIC)) != INCREMENTAL_MAGIC:
+            raise ValueError(f'Not an incremental backup: {path}')
+        while True:
+            header = src.read(PAGE_HEADER.size)
+            if not header:
+                break
+            (page_no,) = PAGE_HEADER.unpack(header)
+            page = src.read(page_size)
+            if len(page) != page_size:
+                raise ValueError(f'Truncated incremental backup: {path}')
+            target.seek(page_no * page_size)
+            target.write(page)
+    target.truncate(pages * page_size)
+
+
+def restore_backup(backup_path: str, dest_path: str):
+    """استعادة نسخة احتياطية: فك النسخة الكاملة ثم إعادة تطبيق النسخ التزايدية بالترتيب"""
+    backup_dir = os.path.dirname(backup_path)
+    target_stem = backup_stem(backup_path)
+    entries = {entry['stem']: entry for entry in list_backups(backup_dir)}
+    chain = _chain(entries, target_stem)
+
+    for entry in chain:
+        if entry.get('sha256') and not verify_backup(entry['path']):
+            raise ValueError(f"Checksum mismatch for {entry['path']}")
+
+    tmp = dest_path + '.restore'
+    try:
+        full = chain[0]
+        if full['path'].endswith(FULL_SUFFIX):
+            with gzip.open(full['path'], 'rb') as src, open(tmp, 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        else:
+            shutil.copyfile(full['path'], tmp)
+
+        with open(tmp, 'r+b') as target:
+            for entry in chain[1:]:
+                _apply_incremental(entry['path'], target, entry['page_size'], entry['pages'])
+
+        expected = chain[-1].get('db_sha256')
+        if expected and _file_sha256(tmp) != expected:
+            raise ValueError(f'Restored database does not match manifest for {backup_path}')
+        os.replace(tmp, dest_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# ====== Retention ======
+
+def select_retained(entries: List[dict], hourly: int, daily: int, weekly: int) -> Set[str]:
+    """اختيار النسخ المحتفظ بها: أحدث نسخة لكل ساعة/يوم/أسبوع، مع كامل سلاسلها"""
+    if not entries:
+        return set()
+
+    keep = {entries[-1]['stem']}
+    tiers = (
+        (hourly, lambda dt: dt.strftime('%Y%m%d%H')),
+        (daily, lambda dt: dt.strftime('%Y%m%d')),
+        (weekly, lambda dt: '%d-%02d' % dt.isocalendar()[:2]),
+    )
+    for count, bucket_of in tiers:
+        buckets = set()
+        for entry in reversed(entries):
+            if len(buckets) >= count:
+                break
+            bucket = bucket_of(datetime.fromisoformat(entry['created_at']))
+            if bucket not in buckets:
+                buckets.add(bucket)
+                keep.add(entry['stem'])
+
+    # لا يمكن حذف أي نسخة تعتمد عليها نسخة محتفظ بها
+    by_stem = {entry['stem']: entry for entry in entries}
+    for stem in list(keep):
+        try:
+            keep.update(entry['stem'] for entry in _chain(by_stem, stem))
+        except ValueError:
+            pass
+    return keep
+
+
+def apply_retention(backup_dir: str, hourly: int = 24, daily: int = 7, weekly: int = 4) -> List[str]:
+    """حذف النسخ خارج سياسة الاحتفاظ، وإرجاع أسماء الملفات المحذوفة"""
+    entries = list_backups(backup_dir)
+    keep = select_retained(entries, hourly, daily, weekly)
+
+    removed = []
+    for entry in entries:
+        if entry['stem'] in keep:
+            continue
+        for path in (entry['path'], manifest_path_for(entry['path']), page_hashes_path_for(entry['path'])):
+            if os.path.exists(path):
+                os.remove(path)
+        removed.append(os.path.basename(entry['path']))
+    return removed
@@ -3,76 +3,369 @@
 """
 import aiosqlite
 import os
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import time
+import json
+import pytz
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import List, Optional, Dict, Any, Tuple, Callable
 
 from .models import User, Booking, Alliance, Achievement, Log
+from .pool import ConnectionPool
+from .audit_log import AuditLogWriter
+from .user_cache import UserCache
+from .leaderboard import Leaderboard
+from .migrator import Migration, MigrationRunner
+from .slots import SlotEngine
 from config import config
 
+logger = logging.getLogger('database')
+
+# أعلام التذكيرات المرسلة حسب عدد الساعات قبل الموعد (0 = وقت الموعد)
+REMINDER_FLAGS = {24: 'reminder_24h_sent', 1: 'reminder_1h_sent', 0: 'reminder_now_sent'}
+
+# أعمدة الحجز المشتركة بين bookings و bookings_history
+BOOKING_COLUMNS = (
+    'booking_id', 'user_id', 'booking_type', 'player_name', 'player_id', 'alliance_name',
+    'scheduled_time', 'duration_days', 'details', 'status',
+    'reminder_24h_sent', 'reminder_1h_sent', 'reminder_now_sent',
+    'completed_at', 'cancelled_at', 'cancellation_reason', 'created_at', 'updated_at', 'created_by',
+    'scheduled_ts', 'scheduled_end_ts',
+)
+
+# الحالات النهائية التي تُؤرشف
+FINISHED_STATUSES = ('completed', 'cancelled', 'expired')
+
+
 
 class DatabaseManager:
     """مدير قاعدة البيانات"""
 
     def __init__(self, db_path: str = None):
         self.db_path = db_path or config.DATABASE_PATH
+        self.pool = ConnectionPool(self.db_path, readers=config.DB_POOL_SIZE)
+        self.audit_log = AuditLogWriter(
+            self.pool,
+            batch_size=config.AUDIT_BATCH_SIZE,
+            flush_interval_ms=config.AUDIT_FLUSH_MS,
+            max_queue=config.AUDIT_QUEUE_SIZE
+        )
+        self.user_cache = UserCache(
+            self._load_user,
+            max_size=config.USER_CACHE_SIZE,
+            ttl=config.USER_CACHE_TTL
+        )
+        self.leaderboard = Leaderboard()
+        self.slots = SlotEngine(config.SLOT_CAPACITY)
+        self._booking_listeners: List[Callable[[str, int, Optional[Booking]], None]] = []
+        # Set by close(): late calls during shutdown must not reopen the pool
+        self._closed = False
 
     async def initialize(self):
-        """تهيئة قاعدة البيانات وتطبيق توافق المخطط"""
+        """تهيئة قاعدة البيانات وتطبيق الترقيات المعلّقة"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            with open('database/schema.sql', 'r', encoding='utf-8') as f:
-                schema = f.read()
-
-            await db.executescript(schema)
-            await self._ensure_compatibility(db)
-            await db.commit()
+        self._closed = False
+        await self.pool.open()
+        runner = MigrationRunner(self.pool, self._migrations(), chunk_size=config.MIGRATION_CHUNK_SIZE)
+        applied = await runner.run()
+        if applied:
+            logger.info(f"✅ Database migrated to version {runner.latest} ({len(applied)} migrations)")
+
+        await self.load_leaderboard()
+        await self.load_slots()
+        await self.audit_log.start()
+
+    async def close(self):
+        """إغلاق مجمع الاتصالات عند إيقاف البوت"""
+        self._closed = True
+        await self.audit_log.stop()
+        await self.pool.close()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """إحصائيات مجمع الاتصالات"""
+        return self.pool.stats()
+
+    def get_user_cache_stats(self) -> Dict[str, Any]:
+        """إحصائيات ذاكرة المستخدمين المؤقتة"""
+        return self.user_cache.stats()
+
+    def add_booking_listener(self, listener: Callable[[str, int, Optional[Booking]], None]):
+        """تسجيل مستمع لتغييرات الحجوزات: listener(event, booking_id, booking)"""
+        if listener not in self._booking_listeners:
+            self._booking_listeners.append(listener)
+
+    def remove_booking_listener(self, listener: Callable[[str, int, Optional[Booking]], None]):
+        if listener in self._booking_listeners:
+            self._booking_listeners.remove(listener)
+
+    def _notify_booking_change(self, event: str, booking_id: int, booking: Optional[Booking] = None):
+        if event not in ('created', 'active'):
+            self.slots.release(booking_id)
+        for listener in list(self._booking_listeners):
+            try:
+                listener(event, booking_id, booking)
+            except Exception as e:
+                logger.error(f"Booking listener failed on {event} #{booking_id}: {e}")
+
+    async def _ensure_pool(self):
+        """فتح المجمع عند أول استخدام، ورفض الاستخدام بعد close()"""
+        if self._closed:
+            raise RuntimeError('Database is closed')
+        if not self.pool.is_open:
+            await self.pool.open()
+
+    # ====== Migrations ======
+
+    def _migrations(self) -> List[Migration]:
+        """الترقيات مرتبة؛ تُضاف الجديدة في النهاية ولا يُعاد ترقيم السابقة"""
+        return [
+            Migration(1, 'baseline_schema', apply=self._migrate_baseline_schema, transactional=False),
+            Migration(2, 'normalize_user_languages', backfill=self._backfill_user_languages,
+                      total=self._count_after('users', 'user_id')),
+            Migration(3, 'alliance_tags', backfill=self._backfill_alliance_tags,
+                      total=self._count_after('alliances', 'alliance_id')),
+            Migration(4, 'reminder_outbox', backfill=self._backfill_reminder_outbox,
+                      total=self._count_after('bookings', 'booking_id')),
+            Migration(5, 'seed_counters', apply=self._migrate_seed_counters),
+            Migration(6, 'epoch_time_columns', apply=self._migrate_epoch_time_columns),
+            Migration(7, 'booking_epoch_times', backfill=self._backfill_booking_epochs,
+                      total=self._count_after('bookings', 'booking_id')),
+            Migration(8, 'log_epoch_times', backfill=self._backfill_log_epochs,
+                      total=self._count_after('logs', 'log_id')),
+            Migration(9, 'bookings_history', apply=self._migrate_bookings_history),
+            Migration(10, 'drop_status_time_index', apply=self._migrate_drop_status_time_index),
+        ]
+
+    @staticmethod
+    def _count_after(table: str, pk: str):
+        async def total(db: aiosqlite.Connection, after_id: int) -> int:
+            rows = await db.execute_fetchall(f"SELECT COUNT(*) FROM {table} WHERE {pk} > ?", (after_id,))
+            return rows[0][0]
+        return total
+
+    @staticmethod
+    async def _chunk_bounds(db: aiosqlite.Connection, table: str, pk: str,
+                            after_id: int, chunk_size: int) -> Optional[Tuple[int, int]]:
+        """(آخر معرف، عدد الصفوف) للدفعة التالية بعد after_id"""
+        rows = await db.execute_fetchall(
+            f"SELECT MAX({pk}), COUNT(*) FROM (SELECT {pk} FROM {table} WHERE {pk} > ? ORDER BY {pk} LIMIT ?)",
+            (after_id, chunk_size)
+        )
+        if not rows or rows[0][0] is None:
+            return None
+        return rows[0][0], rows[0][1]
 
-    async def _ensure_compatibility(self, db: aiosqlite.Connection):
-        """توافق الإصدارات القديمة بدون كسر البيانات"""
+    async def _migrate_baseline_schema(self, db: aiosqlite.Connection):
+        """المخطط الأساسي، مع أعمدة الإصدارات القديمة التي تعتمد عليها فهارسه"""
         users_cols = await self._get_columns(db, 'users')
         alliances_cols = await self._get_columns(db, 'alliances')
 
-        if 'language' not in users_cols:
+        if users_cols and 'language' not in users_cols:
             await db.execute("ALTER TABLE users ADD COLUMN language TEXT DEFAULT 'en'")
 
-        if 'tag' not in alliances_cols:
+        if alliances_cols and 'tag' not in alliances_cols:
             await db.execute("ALTER TABLE alliances ADD COLUMN tag TEXT")
 
-        await db.execute("UPDATE users SET language = 'en' WHERE language IS NULL OR TRIM(language) = ''")
-        await db.execute("UPDATE users SET language = lower(language)")
-        await db.execute("UPDATE users SET language = 'en' WHERE language NOT IN ('ar', 'en')")
+        with open('database/schema.sql', 'r', encoding='utf-8') as f:
+            await db.executescript(f.read())
 
-        rows = await db.execute_fetchall("SELECT alliance_id, name, tag FROM alliances")
-        for alliance_id, name, tag in rows:
-            if tag and len(tag.strip()) == 3:
-                continue
+    async def _backfill_user_languages(self, db: aiosqlite.Connection, after_id: int, chunk_size: int):
+        bounds = await self._chunk_bounds(db, 'users', 'user_id', after_id, chunk_size)
+        if bounds is None:
+            return None
+        await db.execute(
+            """UPDATE users SET language = CASE WHEN lower(trim(language)) IN ('ar', 'en')
+                                                THEN lower(trim(language)) ELSE 'en' END
+               WHERE user_id > ? AND user_id <= ? AND (language IS NULL OR language NOT IN ('ar', 'en'))""",
+            (after_id, bounds[0])
+        )
+        return bounds
 
+    async def _backfill_alliance_tags(self, db: aiosqlite.Connection, after_id: int, chunk_size: int):
+        bounds = await self._chunk_bounds(db, 'alliances', 'alliance_id', after_id, chunk_size)
+        if bounds is None:
+            return None
+
+        rows = await db.execute_fetchall(
+            """SELECT alliance_id, name FROM alliances
+               WHERE alliance_id > ? AND alliance_id <= ? AND (tag IS NULL OR length(trim(tag)) != 3)""",
+            (after_id, bounds[0])
+        )
+        for alliance_id, name in rows:
             seed = ''.join(ch for ch in (name or '').upper() if ch.isalnum())[:3]
             if len(seed) < 3:
                 seed = (seed + f"{alliance_id:03d}")[:3]
 
             candidate = seed
             suffix = 0
-            while True:
-                exists = await db.execute_fetchone(
-                    "SELECT 1 FROM alliances WHERE tag = ? AND alliance_id != ?",
-                    (candidate, alliance_id)
-                )
-                if not exists:
-                    break
+            while await db.execute_fetchall(
+                "SELECT 1 FROM alliances WHERE tag = ? AND alliance_id != ?",
+                (candidate, alliance_id)
+            ):
                 suffix += 1
                 candidate = f"{seed[:2]}{suffix % 10}"
 
             await db.execute("UPDATE alliances SET tag = ? WHERE alliance_id = ?", (candidate, alliance_id))
+        return bounds
+
+    async def _backfill_reminder_outbox(self, db: aiosqlite.Connection, after_id: int, chunk_size: int):
+        """صفوف صندوق التذكيرات للحجوزات النشطة التي سبقت إنشاء الصندوق"""
+        flags = ', '.join(f"b.{field}" for field in REMINDER_FLAGS.values())
+        bookings = await db.execute_fetchall(
+            f"""SELECT b.booking_id, b.scheduled_time,
+                       b.status = 'active' AND NOT EXISTS (SELECT 1 FROM reminder_outbox r WHERE r.booking_id = b.booking_id),
+                       {flags}
+                FROM bookings b WHERE b.booking_id > ? ORDER BY b.booking_id LIMIT ?""",
+            (after_id, chunk_size)
+        )
+        if not bookings:
+            return None
+
+        rows = []
+        for booking_id, scheduled_time, needs_outbox, *sent in bookings:
+            # In Python so naive times are read in config.TIMEZONE, like _to_epoch everywhere else
+            event_ts = self._to_epoch(scheduled_time) if needs_outbox else None
+            if event_ts is None:
+                continue
+            sent_by_offset = dict(zip(REMINDER_FLAGS, sent))
+            for hours in config.REMINDER_OFFSETS_HOURS:
+                due_at = event_ts - int(hours) * 3600
+                rows.append((booking_id, int(hours), due_at, due_at,
+                             'sent' if sent_by_offset.get(int(hours)) else 'pending'))
+        if rows:
+            await db.executemany(
+                """INSERT OR IGNORE INTO reminder_outbox (booking_id, offset_hours, due_at, next_attempt_at, status)
+                   VALUES (?, ?, ?, ?, ?)""",
+                rows
+            )
+        return bookings[-1][0], len(bookings)
+
+    async def _migrate_seed_counters(self, db: aiosqlite.Connection):
+        """تهيئة العدادات للقواعد التي سبقت جدول العدادات؛ المشغلات تتولاها بعدها"""
+        await self._rebuild_counters(db, await self._count_actual(db))
+
+    async def _migrate_epoch_time_columns(self, db: aiosqlite.Connection):
+        """أعمدة الوقت كثوانٍ UTC صحيحة وفهارسها، بدلاً من مقارنة نصوص بصيغ مختلطة"""
+        bookings_cols = await self._get_columns(db, 'bookings')
+        for column in ('scheduled_ts', 'scheduled_end_ts'):
+            if column not in bookings_cols:
+                await db.execute(f"ALTER TABLE bookings ADD COLUMN {column} INTEGER")
+        if 'created_ts' not in await self._get_columns(db, 'logs'):
+            await db.execute("ALTER TABLE logs ADD COLUMN created_ts INTEGER")
+
+        for statement in (
+            "CREATE INDEX IF NOT EXISTS idx_bookings_type_status_ts ON bookings(booking_type, status, scheduled_ts)",
+            "CREATE INDEX IF NOT EXISTS idx_bookings_user_status_ts ON bookings(user_id, status, scheduled_ts)",
+            "CREATE INDEX IF NOT EXISTS idx_bookings_status_end_ts ON bookings(status, scheduled_end_ts)",
+            "CREATE INDEX IF NOT EXISTS idx_logs_created_ts ON logs(created_ts)",
+        ):
+            await db.execute(statement)
+
+    async def _backfill_booking_epochs(self, db: aiosqlite.Connection, after_id: int, chunk_size: int):
+        """تعبئة scheduled_ts و scheduled_end_ts؛ في Python لأن الوقت بدون منطقة بتوقيت الإعدادات"""
+        rows = await db.execute_fetchall(
+            """SELECT booking_id, scheduled_time, duration_days FROM bookings
+               WHERE booking_id > ? ORDER BY booking_id LIMIT ?""",
+            (after_id, chunk_size)
+        )
+        if not rows:
+            return None
+        await db.executemany(
+            "UPDATE bookings SET scheduled_ts = ?, scheduled_end_ts = ? WHERE booking_id = ?",
+            [(*self._booking_epochs(scheduled_time, duration_days), booking_id)
+             for booking_id, scheduled_time, duration_days in rows]
+        )
+        return rows[-1][0], len(rows)
 
-        await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_alliances_tag ON alliances(tag)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_language ON users(language)")
+    async def _backfill_log_epochs(self, db: aiosqlite.Connection, after_id: int, chunk_size: int):
+        """تعبئة created_ts؛ created_at في السجلات دائماً بتوقيت UTC (CURRENT_TIMESTAMP أو كاتب السجل)"""
+        bounds = await self._chunk_bounds(db, 'logs', 'log_id', after_id, chunk_size)
+        if bounds is None:
+            return None
+        await db.execute(
+            """UPDATE logs SET created_ts = CAST(strftime('%s', created_at) AS INTEGER)
+               WHERE log_id > ? AND log_id <= ? AND created_ts IS NULL""",
+            (after_id, bounds[0])
+        )
+        return bounds
+
+    async def _migrate_bookings_history(self, db: aiosqlite.Connection):
+        """جدول أرشيف الحجوزات المنتهية؛ العدادات تشمله فتبقى الإحصائيات كما هي بعد النقل"""
+        await db.execute(
+            """CREATE TABLE IF NOT EXISTS bookings_history (
+                   booking_id INTEGER PRIMARY KEY,
+                   user_id INTEGER NOT NULL,
+                   booking_type TEXT NOT NULL,
+                   player_name TEXT NOT NULL,
+                   player_id TEXT NOT NULL,
+                   alliance_name TEXT NOT NULL,
+                   scheduled_time TIMESTAMP NOT NULL,
+                   duration_days INTEGER DEFAULT 1,
+                   details TEXT,
+                   status TEXT NOT NULL,
+                   reminder_24h_sent BOOLEAN DEFAULT 0,
+                   reminder_1h_sent BOOLEAN DEFAULT 0,
+                   reminder_now_sent BOOLEAN DEFAULT 0,
+                   completed_at TIMESTAMP,
+                   cancelled_at TIMESTAMP,
+                   cancellation_reason TEXT,
+                   created_at TIMESTAMP,
+                   updated_at TIMESTAMP,
+                   created_by TEXT NOT NULL,
+                   scheduled_ts INTEGER,
+                   scheduled_end_ts INTEGER,
+                   archived_ts INTEGER NOT NULL
+               )"""
+        )
+        for statement in (
+            "CREATE INDEX IF NOT EXISTS idx_history_user_ts ON bookings_history(user_id, scheduled_ts)",
+            "CREATE INDEX IF NOT EXISTS idx_history_type_ts ON bookings_history(booking_type, scheduled_ts)",
+            """CREATE TRIGGER IF NOT EXISTS trg_counters_history_insert AFTER INSERT ON bookings_history
+               BEGIN
+                   INSERT INTO counters (counter_key, value) VALUES ('bookings', 1)
+                       ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+                   INSERT INTO counters (counter_key, value) VALUES ('bookings.status.' || COALESCE(NEW.status, ''), 1)
+                       ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+                   INSERT INTO counters (counter_key, value) VALUES ('bookings.type.' || COALESCE(NEW.booking_type, ''), 1)
+                       ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+                   INSERT INTO counters (counter_key, value) VALUES ('bookings.archived', 1)
+                       ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+               END""",
+            """CREATE TRIGGER IF NOT EXISTS trg_counters_history_delete AFTER DELETE ON bookings_history
+               BEGIN
+                   UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings';
+                   UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.status.' || COALESCE(OLD.status, '');
+                   UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.type.' || COALESCE(OLD.booking_type, '');
+                   UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.archived';
+               END""",
+        ):
+            await db.execute(statement)
+
+    async def _migrate_drop_status_time_index(self, db: aiosqlite.Connection):
+        """حذف فهرس (status, scheduled_time)؛ الانتهاء يستخدم idx_bookings_status_end_ts والتذكيرات جدول الصادر"""
+        await db.execute("DROP INDEX IF EXISTS idx_bookings_status_time")
+
+    def _booking_epochs(self, scheduled_time, duration_days) -> Tuple[Optional[int], Optional[int]]:
+        """(scheduled_ts, scheduled_end_ts) لحجز، أو (None, None) إذا تعذر تحليل الوقت"""
+        start_ts = self._to_epoch(scheduled_time)
+        if start_ts is None:
+            return None, None
+        return self.slots.interval(start_ts, duration_days)
 
     async def _get_columns(self, db: aiosqlite.Connection, table: str) -> List[str]:
         rows = await db.execute_fetchall(f"PRAGMA table_info({table})")
         return [r[1] for r in rows]
 
+    def _to_epoch(self, value) -> Optional[int]:
+        """تحويل الوقت إلى ثوانٍ منذ epoch (الوقت بدون منطقة يُعتبر بتوقيت الإعدادات)"""
+        dt = value if isinstance(value, datetime) else self._parse_dt(value)
+        if dt is None:
+            return None
+        if dt.tzinfo is None:
+            dt = pytz.timezone(config.TIMEZONE).localize(dt)
+        return int(dt.timestamp())
+
     def _parse_dt(self, value):
         if value is None or isinstance(value, datetime):
             return value
@@ -85,31 +378,65 @@ class DatabaseManager:
 
     async def execute(self, query: str, params: tuple = ()) -> aiosqlite.Cursor:
         """تنفيذ استعلام"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(query, params)
-            await db.commit()
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(query, params)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
             return cursor
 
+    async def execute_in_transaction(self, statements: List[Tuple[str, tuple]]):
+        """تنفيذ عدة استعلامات في معاملة واحدة"""
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                for query, params in statements:
+                    await db.execute(query, params)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def execute_returning(self, query: str, params: tuple = ()) -> Optional[tuple]:
+        """تنفيذ استعلام كتابة مع RETURNING وإرجاع أول صف"""
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(query, params)
+                row = await cursor.fetchone()
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            return row
+
     async def fetchone(self, query: str, params: tuple = ()) -> Optional[tuple]:
         """جلب صف واحد"""
-        async with aiosqlite.connect(self.db_path) as db:
+        await self._ensure_pool()
+        async with self.pool.reader() as db:
             cursor = await db.execute(query, params)
             return await cursor.fetchone()
 
     async def fetchall(self, query: str, params: tuple = ()) -> List[tuple]:
         """جلب كل الصفوف"""
-        async with aiosqlite.connect(self.db_path) as db:
+        await self._ensure_pool()
+        async with self.pool.reader() as db:
             cursor = await db.execute(query, params)
             return await cursor.fetchall()
 
     async def _fetchone_row(self, query: str, params: tuple = ()):
-        async with aiosqlite.connect(self.db_path) as db:
+        await self._ensure_pool()
+        async with self.pool.reader() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(query, params)
             return await cursor.fetchone()
 
     async def _fetchall_rows(self, query: str, params: tuple = ()):
-        async with aiosqlite.connect(self.db_path) as db:
+        await self._ensure_pool()
+        async with self.pool.reader() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(query, params)
             return await cursor.fetchall()
@@ -156,7 +483,8 @@ class DatabaseManager:
             created_at=self._parse_dt(row['created_at']),
             updated_at=self._parse_dt(row['updated_at']),
             created_by=row['created_by'] or '',
-            duration_days=row['duration_days'] or 1
+            duration_days=row['duration_days'] or 1,
+            scheduled_ts=row['scheduled_ts']
         )
 
     def _row_to_alliance(self, row) -> Optional[Alliance]:
@@ -191,16 +519,27 @@ class DatabaseManager:
                VALUES (?, ?, ?, ?)""",
             (discord_id, username, player_id or discord_id, config.LANGUAGE)
         )
-        return await self.get_user_by_discord_id(discord_id)
+        self.user_cache.invalidate(discord_id)
+        self._sync_language_cache(discord_id, config.LANGUAGE)
+        user = await self.get_user_by_discord_id(discord_id)
+        if user:
+            self.leaderboard.update(user.user_id, user.points, user.completed_bookings)
+        return user
 
-    async def get_user_by_discord_id(self, discord_id: str) -> Optional[User]:
+    async def _load_user(self, discord_id: str) -> Optional[User]:
         row = await self._fetchone_row(
             "SELECT * FROM users WHERE discord_id = ?",
             (discord_id,)
         )
         return self._row_to_user(row)
 
+    async def get_user_by_discord_id(self, discord_id: str) -> Optional[User]:
+        return await self.user_cache.get(discord_id)
+
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        discord_id = self.user_cache.discord_id_for(user_id)
+        if discord_id is not None:
+            return await self.user_cache.get(discord_id)
         row = await self._fetchone_row("SELECT * FROM users WHERE user_id = ?", (user_id,))
         return self._row_to_user(row)
 
@@ -212,117 +551,373 @@ class DatabaseManager:
             "UPDATE users SET language = ?, updated_at = CURRENT_TIMESTAMP WHERE discord_id = ?",
             (lang, discord_id)
         )
+        self.user_cache.invalidate(discord_id)
+        self._sync_language_cache(discord_id, lang)
+
+    async def get_user_languages(self, limit: int) -> List[Tuple[str, str]]:
+        """لغات المستخدمين الأحدث نشاطاً لتدفئة ذاكرة المترجم"""
+        return await self.fetchall(
+            "SELECT discord_id, language FROM users ORDER BY updated_at DESC LIMIT ?",
+            (limit,)
+        )
+
+    def _sync_language_cache(self, discord_id: str, language: str):
+        # Lazy import: utils modules import database at load time
+        from utils.translator import translator
+        translator.cache_user_language(discord_id, language)
 
     async def update_user_points(self, user_id: int, points_delta: int):
-        await self.execute(
-            "UPDATE users SET points = points + ?, updated_at = ? WHERE user_id = ?",
+        row = await self.execute_returning(
+            """UPDATE users SET points = points + ?, updated_at = ? WHERE user_id = ?
+               RETURNING points, completed_bookings""",
             (points_delta, datetime.now().isoformat(), user_id)
         )
+        self.user_cache.invalidate_user_id(user_id)
+        if row:
+            self.leaderboard.update(user_id, row[0], row[1])
 
     async def update_user_stats(self, user_id: int, stat_type: str):
         if stat_type == 'completed':
-            await self.execute(
+            row = await self.execute_returning(
                 """UPDATE users SET completed_bookings = completed_bookings + 1,
-                   total_bookings = total_bookings + 1, updated_at = ? WHERE user_id = ?""",
+                   total_bookings = total_bookings + 1, updated_at = ? WHERE user_id = ?
+                   RETURNING points, completed_bookings""",
                 (datetime.now().isoformat(), user_id)
             )
+            if row:
+                self.leaderboard.update(user_id, row[0], row[1])
         elif stat_type == 'cancelled':
             await self.execute(
                 """UPDATE users SET cancelled_bookings = cancelled_bookings + 1,
                    updated_at = ? WHERE user_id = ?""",
                 (datetime.now().isoformat(), user_id)
             )
+        else:
+            return
+        self.user_cache.invalidate_user_id(user_id)
 
     # ====== Booking Methods ======
 
     async def create_booking(self, booking: Booking) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """INSERT INTO bookings
-                   (user_id, booking_type, player_name, player_id, alliance_name,
-                    scheduled_time, details, created_by, duration_days)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    booking.user_id,
-                    booking.booking_type,
-                    booking.player_name,
-                    booking.player_id,
-                    booking.alliance_name,
-                    booking.scheduled_time.isoformat() if isinstance(booking.scheduled_time, datetime) else booking.scheduled_time,
-                    booking.details,
-                    booking.created_by,
-                    booking.duration_days,
+        """
+        إنشاء حجز بعد حجز فترته ذرياً
+
+        الفحص والإدراج وتحديث محرك الفترات تتم كلها تحت قفل الكتابة،
+        فلا يمكن لطلبين متزامنين تجاوز سعة الفترة
+
+        Raises:
+            SlotConflictError: إذا كانت الفترة ممتلئة لهذا النوع
+        """
+        start_ts, end_ts = self._booking_epochs(booking.scheduled_time, booking.duration_days)
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            if start_ts is not None:
+                self.slots.check(booking.booking_type, start_ts, booking.duration_days)
+            try:
+                cursor = await db.execute(
+                    """INSERT INTO bookings
+                       (user_id, booking_type, player_name, player_id, alliance_name,
+                        scheduled_time, details, created_by, duration_days, scheduled_ts, scheduled_end_ts)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        booking.user_id,
+                        booking.booking_type,
+                        booking.player_name,
+                        booking.player_id,
+                        booking.alliance_name,
+                        booking.scheduled_time.isoformat() if isinstance(booking.scheduled_time, datetime) else booking.scheduled_time,
+                        booking.details,
+                        booking.created_by,
+                        booking.duration_days,
+                        start_ts,
+                        end_ts,
+                    )
                 )
-            )
-            await db.commit()
-            return cursor.lastrowid
+                booking_id = cursor.lastrowid
+                await self._insert_reminder_outbox(db, booking_id, booking.scheduled_time)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            if start_ts is not None:
+                self.slots.add(booking_id, booking.booking_type, start_ts, booking.duration_days)
+
+        booking.booking_id = booking_id
+        self._notify_booking_change('created', booking_id, booking)
+        return booking_id
+
+    @staticmethod
+    def _booking_source(status: Optional[str]) -> str:
+        """الجدول الساخن للحجوزات النشطة، وإلا الجدول مع الأرشيف كمصدر واحد"""
+        if status == 'active':
+            return "bookings"
+        columns = ', '.join(BOOKING_COLUMNS)
+        return f"(SELECT {columns} FROM bookings UNION ALL SELECT {columns} FROM bookings_history)"
 
     async def get_booking(self, booking_id: int) -> Optional[Booking]:
+        """حجز من الجدول الساخن أو من الأرشيف"""
         row = await self._fetchone_row("SELECT * FROM bookings WHERE booking_id = ?", (booking_id,))
+        if row is None:
+            row = await self._fetchone_row("SELECT * FROM bookings_history WHERE booking_id = ?", (booking_id,))
         return self._row_to_booking(row)
 
     async def get_user_bookings(self, user_id: int, status: str = None) -> List[Booking]:
+        """حجوزات المستخدم؛ غير النشطة تشمل الأرشيف"""
+        source = self._booking_source(status)
         if status:
             rows = await self._fetchall_rows(
-                "SELECT * FROM bookings WHERE user_id = ? AND status = ? ORDER BY scheduled_time ASC",
+                f"SELECT * FROM {source} WHERE user_id = ? AND status = ? ORDER BY scheduled_ts ASC",
                 (user_id, status)
             )
         else:
             rows = await self._fetchall_rows(
-                "SELECT * FROM bookings WHERE user_id = ? ORDER BY scheduled_time ASC",
+                f"SELECT * FROM {source} WHERE user_id = ? ORDER BY scheduled_ts ASC",
                 (user_id,)
             )
         return [self._row_to_booking(row) for row in rows]
 
     async def get_bookings_by_type(self, booking_type: str, status: str = 'active') -> List[Booking]:
         rows = await self._fetchall_rows(
-            "SELECT * FROM bookings WHERE booking_type = ? AND status = ? ORDER BY scheduled_time ASC",
+            f"SELECT * FROM {self._booking_source(status)} WHERE booking_type = ? AND status = ? ORDER BY scheduled_ts ASC",
             (booking_type, status)
         )
         return [self._row_to_booking(row) for row in rows]
 
+    @staticmethod
+    def _booking_filters(booking_type: str = None, user_id: int = None,
+                         status: str = 'active') -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, value in (('booking_type', booking_type), ('user_id', user_id), ('status', status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    async def get_bookings_page(self, booking_type: str = None, user_id: int = None, status: str = 'active',
+                                anchor: Tuple[int, int] = None, limit: int = 10, reverse: bool = False) -> List[Booking]:
+        """
+        صفحة حجوزات بترتيب (scheduled_ts, booking_id) عبر keyset
+
+        anchor هو مفتاح (scheduled_ts, booking_id) لحد الصفحة المجاورة: الصفحة تبدأ بعده، أو تنتهي قبله إذا كان reverse.
+        المفتاح قيم ثابتة، فيبقى صالحاً حتى لو أُلغي حجز الحد أو أُرشف بين الصفحتين.
+        بدون anchor تكون الصفحة الأولى، أو الأخيرة مع reverse. النتيجة دائماً بترتيب تصاعدي.
+        الحجوزات بوقت غير قابل للتحليل (scheduled_ts فارغ) لا تظهر، إذ لا يمكن ترتيبها.
+        الحالات غير النشطة تُقرأ من الجدول والأرشيف معاً
+        """
+        source = self._booking_source(status)
+        clauses, params = self._booking_filters(booking_type, user_id, status)
+        clauses.append("scheduled_ts IS NOT NULL")
+        if anchor is not None:
+            clauses.append(f"(scheduled_ts, booking_id) {'<' if reverse else '>'} (?, ?)")
+            params.extend(anchor)
+        order = "DESC" if reverse else "ASC"
+        rows = await self._fetchall_rows(
+            f"SELECT * FROM {source} WHERE {' AND '.join(clauses)} ORDER BY scheduled_ts {order}, booking_id {order} LIMIT ?",
+            (*params, limit)
+        )
+        if reverse:
+            rows.reverse()
+        return [self._row_to_booking(row) for row in rows]
+
+    async def count_bookings(self, booking_type: str = None, user_id: int = None, status: str = 'active') -> int:
+        """عدد الحجوزات المطابقة كما في get_bookings_page (النشطة لنوع معيّن من محرك الفترات دون استعلام)"""
+        if booking_type is not None and user_id is None and status == 'active' and self.slots.loaded:
+            return len(self.slots.timeline(booking_type))
+        clauses, params = self._booking_filters(booking_type, user_id, status)
+        clauses.append("scheduled_ts IS NOT NULL")
+        row = await self.fetchone(
+            f"SELECT COUNT(*) FROM {self._booking_source(status)} WHERE {' AND '.join(clauses)}", tuple(params)
+        )
+        return row[0] if row else 0
+
     async def get_all_active_bookings(self) -> List[Booking]:
         rows = await self._fetchall_rows(
-            "SELECT * FROM bookings WHERE status = 'active' ORDER BY scheduled_time ASC"
+            "SELECT * FROM bookings WHERE status = 'active' ORDER BY scheduled_ts ASC"
         )
         return [self._row_to_booking(row) for row in rows]
 
     async def update_booking_status(self, booking_id: int, status: str):
-        await self.execute(
-            "UPDATE bookings SET status = ?, updated_at = ? WHERE booking_id = ?",
-            (status, datetime.now().isoformat(), booking_id)
-        )
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(
+                    "UPDATE bookings SET status = ?, updated_at = ? WHERE booking_id = ? RETURNING scheduled_time",
+                    (status, datetime.now().isoformat(), booking_id)
+                )
+                row = await cursor.fetchone()
+                if status != 'active':
+                    await db.execute(*self._cancel_reminders_statement(booking_id))
+                elif row:
+                    # Reactivation brings back the reminders that are still ahead
+                    await self._insert_reminder_outbox(db, booking_id, row[0])
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        booking = None
+        if status == 'active':
+            # Manual reactivation bypasses capacity, but the slot is occupied again
+            booking = await self.get_booking(booking_id)
+            start_ts = self._to_epoch(booking.scheduled_time) if booking else None
+            if start_ts is not None:
+                self.slots.add(booking_id, booking.booking_type, start_ts, booking.duration_days)
+        self._notify_booking_change(status, booking_id, booking)
+
+    async def expire_finished_bookings(self, now: datetime = None) -> List[int]:
+        """
+        تعليم كل الحجوزات النشطة التي انتهت مدتها (scheduled_end_ts) كمنتهية
+        في استعلام نطاق مفهرس واحد ومعاملة واحدة
+
+        Returns:
+            معرفات الحجوزات التي انتهت
+        """
+        now = (now or datetime.now(timezone.utc))
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(
+                    """UPDATE bookings SET status = 'expired', updated_at = ?
+                       WHERE status = 'active' AND scheduled_end_ts <= ?
+                       RETURNING booking_id""",
+                    (datetime.now().isoformat(), int(now.timestamp()))
+                )
+                expired_ids = [row[0] for row in await cursor.fetchall()]
+                if expired_ids:
+                    await db.execute(
+                        """UPDATE reminder_outbox SET status = 'cancelled'
+                           WHERE status = 'pending' AND booking_id IN (SELECT value FROM json_each(?))""",
+                        (json.dumps(expired_ids),)
+                    )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        for booking_id in expired_ids:
+            self._notify_booking_change('expired', booking_id)
+        return expired_ids
+
+    async def archive_finished_bookings(self, older_than_days: int = None, batch_size: int = None,
+                                        now: datetime = None) -> int:
+        """
+        نقل الحجوزات المنتهية (مكتملة/ملغاة/منتهية) التي انتهت قبل older_than_days يوماً إلى bookings_history
+
+        على دفعات، كل دفعة في معاملة مستقلة فلا يُحجز قفل الكتابة طويلاً،
+        ليبقى جدول bookings وفهارسه بحجم الجدول الحي فقط
+
+        Returns:
+            عدد الحجوزات المؤرشفة
+        """
+        days = config.BOOKING_ARCHIVE_DAYS if older_than_days is None else older_than_days
+        batch_size = batch_size or config.BOOKING_ARCHIVE_BATCH
+        now_ts = int((now or datetime.now(timezone.utc)).timestamp())
+        cutoff = now_ts - days * 86400
+        columns = ', '.join(BOOKING_COLUMNS)
+        statuses = ', '.join(f"'{status}'" for status in FINISHED_STATUSES)
+
+        archived = 0
+        await self._ensure_pool()
+        while True:
+            async with self.pool.writer() as db:
+                try:
+                    await db.execute("BEGIN IMMEDIATE")
+                    # Rows without a parseable time can never be scheduled again, so they go too
+                    rows = await db.execute_fetchall(
+                        f"""SELECT booking_id FROM bookings
+                            WHERE status IN ({statuses}) AND scheduled_end_ts < ?
+                            UNION ALL
+                            SELECT booking_id FROM bookings
+                            WHERE status IN ({statuses}) AND scheduled_end_ts IS NULL
+                            LIMIT ?""",
+                        (cutoff, batch_size)
+                    )
+                    if not rows:
+                        await db.rollback()
+                        break
+                    ids = json.dumps([row[0] for row in rows])
+                    await db.execute(
+                        f"""INSERT INTO bookings_history ({columns}, archived_ts)
+                            SELECT {columns}, ? FROM bookings WHERE booking_id IN (SELECT value FROM json_each(?))""",
+                        (now_ts, ids)
+                    )
+                    await db.execute(
+                        "DELETE FROM reminder_outbox WHERE booking_id IN (SELECT value FROM json_each(?))", (ids,)
+                    )
+                    await db.execute(
+                        "DELETE FROM bookings WHERE booking_id IN (SELECT value FROM json_each(?))", (ids,)
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            archived += len(rows)
+            if len(rows) < batch_size:
+                break
+        return archived
 
     async def cancel_booking(self, booking_id: int, reason: str = None):
         now = datetime.now().isoformat()
-        await self.execute(
-            """UPDATE bookings SET status = 'cancelled', cancelled_at = ?,
-               cancellation_reason = ?, updated_at = ? WHERE booking_id = ?""",
-            (now, reason, now, booking_id)
-        )
+        await self.execute_in_transaction([
+            ("""UPDATE bookings SET status = 'cancelled', cancelled_at = ?,
+                cancellation_reason = ?, updated_at = ? WHERE booking_id = ?""",
+             (now, reason, now, booking_id)),
+            self._cancel_reminders_statement(booking_id),
+        ])
+        self._notify_booking_change('cancelled', booking_id)
 
     async def complete_booking(self, booking_id: int):
         now = datetime.now().isoformat()
-        await self.execute(
-            """UPDATE bookings SET status = 'completed', completed_at = ?,
-               updated_at = ? WHERE booking_id = ?""",
-            (now, now, booking_id)
-        )
+        await self.execute_in_transaction([
+            ("""UPDATE bookings SET status = 'completed', completed_at = ?,
+                updated_at = ? WHERE booking_id = ?""",
+             (now, now, booking_id)),
+            self._cancel_reminders_statement(booking_id),
+        ])
+        self._notify_booking_change('completed', booking_id)
 
     async def update_reminder_sent(self, booking_id: int, reminder_type: str):
-        field_map = {'24h': 'reminder_24h_sent', '1h': 'reminder_1h_sent', 'now': 'reminder_now_sent'}
+        field_map = {'24h': REMINDER_FLAGS[24], '1h': REMINDER_FLAGS[1], 'now': REMINDER_FLAGS[0]}
         field = field_map.get(reminder_type)
         if field:
             await self.execute(f"UPDATE bookings SET {field} = 1 WHERE booking_id = ?", (booking_id,))
 
-    async def check_booking_conflict(self, user_id: int, scheduled_time: datetime) -> bool:
-        value = scheduled_time.isoformat() if isinstance(scheduled_time, datetime) else scheduled_time
-        result = await self.fetchone(
-            """SELECT COUNT(*) FROM bookings
-               WHERE user_id = ? AND status = 'active' AND scheduled_time = ?""",
-            (user_id, value)
+    async def check_booking_conflict(self, user_id: int, scheduled_time: datetime,
+                                     duration_days: int = 1, booking_type: str = None) -> bool:
+        """هل للمستخدم حجز نشط يتداخل مع [scheduled_time, scheduled_time + duration_days)"""
+        start, end = self._booking_epochs(scheduled_time, duration_days)
+        if start is None:
+            return False
+        query = """SELECT 1 FROM bookings
+                   WHERE user_id = ? AND status = 'active' AND scheduled_ts < ? AND scheduled_end_ts > ?"""
+        params: tuple = (user_id, end, start)
+        if booking_type:
+            query += " AND booking_type = ?"
+            params += (booking_type,)
+        return await self.fetchone(query + " LIMIT 1", params) is not None
+
+    def find_free_slots(self, booking_type: str, duration_days: int = 1, after: datetime = None,
+                        limit: int = 5, horizon_days: int = 90) -> List[Tuple[datetime, datetime]]:
+        """النوافذ الحرة التالية (UTC) لنوع حجز ومدة معينة، من محرك الفترات دون استعلام"""
+        if after is None:
+            # Suggestions start on the next full hour
+            after = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        windows = self.slots.find_free(booking_type, self._to_epoch(after), duration_days, limit, horizon_days)
+        return [
+            (datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc))
+            for start, end in windows
+        ]
+
+    async def load_slots(self):
+        """تحميل فترات الحجوزات النشطة في محرك الفترات"""
+        rows = await self.fetchall(
+            "SELECT booking_id, booking_type, scheduled_ts, duration_days FROM bookings WHERE status = 'active'"
         )
-        return result[0] > 0 if result else False
+        self.slots.load(rows)
+        logger.info(f"✅ Slot engine loaded: {self.slots.stats()}")
 
     async def get_active_bookings_count(self, user_id: int) -> int:
         result = await self.fetchone(
@@ -331,6 +926,127 @@ class DatabaseManager:
         )
         return result[0] if result else 0
 
+    # ====== Reminder Outbox Methods ======
+
+    async def _insert_reminder_outbox(self, db: aiosqlite.Connection, booking_id: int, scheduled_time):
+        """إنشاء صفوف التذكيرات القادمة لحجز جديد أو مُعاد تفعيله (داخل معاملة الحجز)"""
+        event_ts = self._to_epoch(scheduled_time)
+        if event_ts is None:
+            return
+        now_ts = int(time.time())
+        rows = []
+        for hours in config.REMINDER_OFFSETS_HOURS:
+            due_at = event_ts - hours * 3600
+            if due_at >= now_ts:
+                rows.append((booking_id, hours, due_at, due_at))
+        if rows:
+            # Rows cancelled with an earlier status change are revived; sent ones stay sent
+            await db.executemany(
+                """INSERT INTO reminder_outbox (booking_id, offset_hours, due_at, next_attempt_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(booking_id, offset_hours) DO UPDATE SET
+                       status = 'pending', due_at = excluded.due_at, next_attempt_at = excluded.next_attempt_at,
+                       attempts = 0, claimed_at = NULL, last_error = NULL
+                   WHERE reminder_outbox.status = 'cancelled'""",
+                rows
+            )
+
+    def _cancel_reminders_statement(self, booking_id: int) -> Tuple[str, tuple]:
+        return (
+            "UPDATE reminder_outbox SET status = 'cancelled' WHERE booking_id = ? AND status = 'pending'",
+            (booking_id,)
+        )
+
+    async def get_pending_reminders(self) -> List[Tuple[int, int, int]]:
+        """التذكيرات المعلقة: (booking_id, offset_hours, next_attempt_at)"""
+        rows = await self.fetchall(
+            """SELECT booking_id, offset_hours, next_attempt_at FROM reminder_outbox
+               WHERE status = 'pending' ORDER BY next_attempt_at ASC"""
+        )
+        return [tuple(row) for row in rows]
+
+    async def claim_reminder(self, booking_id: int, offset_hours: int) -> Optional[Dict[str, int]]:
+        """حجز تذكير للإرسال بشكل ذري؛ يعيد None إذا أُرسل أو أُلغي أو حجزه عامل آخر"""
+        now_ts = int(time.time())
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(
+                    """UPDATE reminder_outbox
+                       SET status = 'claimed', claimed_at = ?, attempts = attempts + 1
+                       WHERE booking_id = ? AND offset_hours = ? AND status = 'pending' AND next_attempt_at <= ?
+                       RETURNING outbox_id, attempts""",
+                    (now_ts, booking_id, offset_hours, now_ts)
+                )
+                row = await cursor.fetchone()
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return {'outbox_id': row[0], 'attempts': row[1]} if row else None
+
+    async def complete_reminder(self, outbox_id: int, booking_id: int, offset_hours: int):
+        """تأكيد إرسال التذكير؛ التسليم مرة واحدة على الأقل، فالانهيار قبل التأكيد يعيد الإرسال"""
+        statements = [(
+            "UPDATE reminder_outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE outbox_id = ?",
+            (int(time.time()), outbox_id)
+        )]
+        field = REMINDER_FLAGS.get(offset_hours)
+        if field:
+            statements.append((f"UPDATE bookings SET {field} = 1 WHERE booking_id = ?", (booking_id,)))
+        await self.execute_in_transaction(statements)
+
+    async def fail_reminder(self, outbox_id: int, attempts: int, error: str, retryable: bool = True) -> Optional[int]:
+        """تسجيل فشل الإرسال وجدولة إعادة المحاولة بتراجع أسي؛ يعيد موعد المحاولة التالية أو None"""
+        if retryable and attempts < config.REMINDER_MAX_ATTEMPTS:
+            delay = min(config.REMINDER_RETRY_SECONDS * (2 ** (attempts - 1)), 3600)
+            next_attempt_at = int(time.time()) + delay
+            await self.execute(
+                """UPDATE reminder_outbox SET status = 'pending', next_attempt_at = ?, last_error = ?
+                   WHERE outbox_id = ?""",
+                (next_attempt_at, error[:500], outbox_id)
+            )
+            return next_attempt_at
+
+        await self.execute(
+            "UPDATE reminder_outbox SET status = 'failed', last_error = ? WHERE outbox_id = ?",
+            (error[:500], outbox_id)
+        )
+        return None
+
+    async def skip_reminder(self, outbox_id: int, reason: str):
+        await self.execute(
+            "UPDATE reminder_outbox SET status = 'skipped', last_error = ? WHERE outbox_id = ?",
+            (reason, outbox_id)
+        )
+
+    async def recover_reminder_outbox(self, grace_seconds: int) -> Dict[str, int]:
+        """
+        استعادة صندوق التذكيرات عند بدء التشغيل:
+        إعادة الحجوزات العالقة إلى الانتظار وتخطي ما تجاوز فترة السماح
+        """
+        now_ts = int(time.time())
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                requeued = await db.execute(
+                    "UPDATE reminder_outbox SET status = 'pending' WHERE status = 'claimed'"
+                )
+                skipped = await db.execute(
+                    """UPDATE reminder_outbox SET status = 'skipped', last_error = 'missed grace period'
+                       WHERE status = 'pending' AND next_attempt_at < ?""",
+                    (now_ts - grace_seconds,)
+                )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return {'requeued': requeued.rowcount, 'skipped': skipped.rowcount}
+
+    async def get_reminder_outbox_stats(self) -> Dict[str, int]:
+        rows = await self.fetchall("SELECT status, COUNT(*) FROM reminder_outbox GROUP BY status")
+        return {status: count for status, count in rows}
+
     # ====== Alliance Methods ======
 
     async def create_alliance(self, name: str, tag: str, leader_id: int | str, description: str = '') -> int:
@@ -346,19 +1062,25 @@ class DatabaseManager:
         else:
             leader_db_id = leader_id
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "INSERT INTO alliances (name, tag, leader_id, description, member_count) VALUES (?, ?, ?, ?, 1)",
-                (name, clean_tag, leader_db_id, description)
-            )
-            alliance_id = cursor.lastrowid
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                cursor = await db.execute(
+                    "INSERT INTO alliances (name, tag, leader_id, description, member_count) VALUES (?, ?, ?, ?, 1)",
+                    (name, clean_tag, leader_db_id, description)
+                )
+                alliance_id = cursor.lastrowid
 
-            await db.execute(
-                "UPDATE users SET alliance_id = ?, alliance_rank = 'R5', updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
-                (alliance_id, leader_db_id)
-            )
-            await db.commit()
-            return alliance_id
+                await db.execute(
+                    "UPDATE users SET alliance_id = ?, alliance_rank = 'R5', updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+                    (alliance_id, leader_db_id)
+                )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        self.user_cache.invalidate_user_id(leader_db_id)
+        return alliance_id
 
     async def get_alliance(self, alliance_id: int) -> Optional[Alliance]:
         row = await self._fetchone_row("SELECT * FROM alliances WHERE alliance_id = ?", (alliance_id,))
@@ -381,6 +1103,7 @@ class DatabaseManager:
             "UPDATE alliances SET member_count = member_count + 1 WHERE alliance_id = ?",
             (alliance_id,)
         )
+        self.user_cache.invalidate_user_id(user_id)
 
     async def leave_alliance(self, user_id: int, alliance_id: int):
         await self.execute(
@@ -391,6 +1114,7 @@ class DatabaseManager:
             "UPDATE alliances SET member_count = CASE WHEN member_count > 0 THEN member_count - 1 ELSE 0 END WHERE alliance_id = ?",
             (alliance_id,)
         )
+        self.user_cache.invalidate_user_id(user_id)
 
     # ====== Achievement Methods ======
 
@@ -415,44 +1139,163 @@ class DatabaseManager:
 
     async def log_action(self, action_type: str, description: str, user_id: str = None,
                         booking_id: int = None, details: str = None):
+        if self.audit_log.running:
+            await self.audit_log.enqueue(action_type, description, user_id, booking_id, details)
+            return
+
         await self.execute(
-            """INSERT INTO logs (action_type, user_id, booking_id, description, details)
-               VALUES (?, ?, ?, ?, ?)""",
-            (action_type, user_id, booking_id, description, details)
+            """INSERT INTO logs (action_type, user_id, booking_id, description, details, created_ts)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (action_type, user_id, booking_id, description, details, int(time.time()))
         )
 
+    def get_audit_log_stats(self) -> Dict[str, Any]:
+        """عدادات سجل التدقيق المؤجل"""
+        return self.audit_log.stats()
+
     async def get_logs(self, limit: int = 100) -> List[Log]:
+        await self.audit_log.flush()
         data = await self.fetchall(
-            "SELECT * FROM logs ORDER BY created_at DESC LIMIT ?",
+            """SELECT log_id, action_type, user_id, booking_id, description, details, created_at
+               FROM logs ORDER BY created_ts DESC, log_id DESC LIMIT ?""",
             (limit,)
         )
         return [Log(*row) for row in data]
 
+    async def delete_logs_before(self, cutoff: datetime) -> int:
+        """حذف السجلات الأقدم من cutoff (الوقت بدون منطقة بتوقيت الإعدادات) وإرجاع عددها"""
+        await self.audit_log.flush()
+        cursor = await self.execute("DELETE FROM logs WHERE created_ts < ?", (self._to_epoch(cutoff),))
+        return cursor.rowcount
+
     # ====== Statistics Methods ======
 
     async def get_stats(self) -> Dict[str, Any]:
-        total_bookings = await self.fetchone("SELECT COUNT(*) FROM bookings")
-        active_bookings = await self.fetchone("SELECT COUNT(*) FROM bookings WHERE status = 'active'")
-        completed_bookings = await self.fetchone("SELECT COUNT(*) FROM bookings WHERE status = 'completed'")
-        total_users = await self.fetchone("SELECT COUNT(*) FROM users")
-        total_alliances = await self.fetchone("SELECT COUNT(*) FROM alliances")
+        """الإحصائيات العامة من جدول العدادات (استعلام واحد مهما كبرت الجداول)"""
+        rows = await self.fetchall("SELECT counter_key, value FROM counters")
+        counters = dict(rows)
+
+        by_status = {k[len('bookings.status.'):]: v for k, v in counters.items() if k.startswith('bookings.status.')}
+        by_type = {k[len('bookings.type.'):]: v for k, v in counters.items() if k.startswith('bookings.type.')}
 
         return {
-            'total_bookings': total_bookings[0] if total_bookings else 0,
-            'active_bookings': active_bookings[0] if active_bookings else 0,
-            'completed_bookings': completed_bookings[0] if completed_bookings else 0,
-            'total_users': total_users[0] if total_users else 0,
-            'total_alliances': total_alliances[0] if total_alliances else 0
+            'total_bookings': counters.get('bookings', 0),
+            'active_bookings': by_status.get('active', 0),
+            'completed_bookings': by_status.get('completed', 0),
+            'total_users': counters.get('users', 0),
+            'total_alliances': counters.get('alliances', 0),
+            'archived_bookings': counters.get('bookings.archived', 0),
+            'bookings_by_status': by_status,
+            'bookings_by_type': by_type,
         }
 
+    async def _count_actual(self, db: aiosqlite.Connection) -> Dict[str, int]:
+        """العدّ الفعلي للقيم التي تحفظها المشغلات في جدول العدادات"""
+        # The archive only exists from migration 9 on, and seed_counters runs before it
+        has_history = bool(await db.execute_fetchall(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings_history'"
+        ))
+        bookings = (
+            "(SELECT status, booking_type FROM bookings UNION ALL SELECT status, booking_type FROM bookings_history)"
+            if has_history else "bookings"
+        )
+        archived = "SELECT 'bookings.archived', COUNT(*) FROM bookings_history UNION ALL" if has_history else ""
+        rows = await db.execute_fetchall(
+            f"""SELECT 'bookings', COUNT(*) FROM {bookings}
+               UNION ALL
+               SELECT 'bookings.status.' || COALESCE(status, ''), COUNT(*) FROM {bookings} GROUP BY status
+               UNION ALL
+               SELECT 'bookings.type.' || COALESCE(booking_type, ''), COUNT(*) FROM {bookings} GROUP BY booking_type
+               UNION ALL
+               {archived}
+               SELECT 'users', COUNT(*) FROM users
+               UNION ALL
+               SELECT 'alliances', COUNT(*) FROM alliances"""
+        )
+        return {key: count for key, count in rows}
+
+    async def _rebuild_counters(self, db: aiosqlite.Connection, actual: Dict[str, int]):
+        await db.execute("DELETE FROM counters")
+        await db.executemany(
+            "INSERT INTO counters (counter_key, value) VALUES (?, ?)",
+            list(actual.items())
+        )
+
+    async def reconcile_counters(self) -> Dict[str, Tuple[int, int]]:
+        """
+        مطابقة العدادات مع العدّ الفعلي وتصحيح أي انحراف
+
+        يعيد {counter_key: (stored, actual)} للعدادات التي كانت منحرفة
+        """
+        await self._ensure_pool()
+        async with self.pool.writer() as db:
+            try:
+                # Stored and actual counts are read in one snapshot
+                await db.execute("BEGIN IMMEDIATE")
+                stored = dict(await db.execute_fetchall("SELECT counter_key, value FROM counters"))
+                actual = await self._count_actual(db)
+
+                drift = {
+                    key: (stored.get(key, 0), actual.get(key, 0))
+                    for key in set(stored) | set(actual)
+                    if stored.get(key, 0) != actual.get(key, 0)
+                }
+                if drift:
+                    await self._rebuild_counters(db, actual)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return drift
+
+    async def load_leaderboard(self):
+        """تحميل لوحة الصدارة في الذاكرة مرة واحدة عند بدء التشغيل"""
+        rows = await self.fetchall("SELECT user_id, points, completed_bookings FROM users")
+        self.leaderboard.load(rows)
+        logger.info(f"✅ Leaderboard loaded: {len(self.leaderboard)} users")
+
+    async def _get_users_by_ids(self, user_ids: List[int]) -> List[User]:
+        """جلب مستخدمين بترتيب المعرفات المعطاة"""
+        if not user_ids:
+            return []
+        rows = await self._fetchall_rows(
+            "SELECT * FROM users WHERE user_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(user_ids),)
+        )
+        users = {row['user_id']: self._row_to_user(row) for row in rows}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
     async def get_leaderboard(self, limit: int = 10) -> List[User]:
+        if self.leaderboard.loaded:
+            return await self._get_users_by_ids(self.leaderboard.top(limit))
         rows = await self._fetchall_rows(
             "SELECT * FROM users ORDER BY points DESC, completed_bookings DESC LIMIT ?",
             (limit,)
         )
         return [self._row_to_user(row) for row in rows]
 
+    async def get_user_rank(self, user_id: int) -> Optional[int]:
+        """ترتيب المستخدم في لوحة الصدارة (1 = الأول)"""
+        if self.leaderboard.loaded:
+            return self.leaderboard.rank(user_id)
+        row = await self.fetchone(
+            """SELECT COUNT(*) + 1 FROM users u, users me
+               WHERE me.user_id = ? AND (u.points > me.points
+                 OR (u.points = me.points AND u.completed_bookings > me.completed_bookings)
+                 OR (u.points = me.points AND u.completed_bookings = me.completed_bookings AND u.user_id < me.user_id))""",
+            (user_id,)
+        )
+        return row[0] if row else None
+
+    async def get_leaderboard_around(self, user_id: int, radius: int = 2) -> List[Tuple[int, User]]:
+        """(rank, user) للمستخدم ومن حوله في لوحة الصدارة"""
+        around = self.leaderboard.around(user_id, radius)
+        users = await self._get_users_by_ids([uid for _, uid in around])
+        by_id = {user.user_id: user for user in users}
+        return [(rank, by_id[uid]) for rank, uid in around if uid in by_id]
+
     async def get_top_alliances(self, limit: int = 10) -> List[Alliance]:
+        """أعلى التحالفات؛ فهرس idx_alliances_leaderboard يجعلها قراءة limit صفاً دون ترتيب"""
         rows = await self._fetchall_rows(
             "SELECT * FROM alliances ORDER BY total_points DESC, total_bookings DESC LIMIT ?",
             (limit,)
@@ -0,0 +1,191 @@
+"""
+لوحة الصدارة - Leaderboard
+Indexable skip list ordered by (points DESC, completed_bookings DESC, user_id),
+giving O(log n) updates, rank lookups and rank-offset seeks
+"""
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# (-points, -completed_bookings, user_id): ascending order = leaderboard order
+Key = Tuple[int, int, int]
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key: Optional[Key], level: int):
+        self.key = key
+        self.next: List[Optional['_Node']] = [None] * level
+        # width[i]: number of level-0 steps from this node to next[i] (or to the end)
+        self.width: List[int] = [0] * level
+
+
+class Leaderboard:
+    """ترتيب المستخدمين في الذاكرة مع تحديث تدريجي"""
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._keys: Dict[int, Key] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._keys
+
+    @staticmethod
+    def _make_key(user_id: int, points: int, completed: int) -> Key:
+        return (-(points or 0), -(completed or 0), user_id)
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def load(self, rows: List[Tuple[int, int, int]]):
+        """إعادة بناء اللوحة من (user_id, points, completed_bookings) بترتيب واحد وبناء خطي"""
+        self.clear()
+        for user_id, points, completed in rows:
+            self._keys[user_id] = self._make_key(user_id, points, completed)
+
+        tails: List[_Node] = [self._head] * self.MAX_LEVEL
+        tail_ranks = [0] * self.MAX_LEVEL
+        for rank, key in enumerate(sorted(self._keys.values()), start=1):
+            level = self._random_level()
+            self._level = max(self._level, level)
+            node = _Node(key, level)
+            for i in range(level):
+                tails[i].next[i] = node
+                tails[i].width[i] = rank - tail_ranks[i]
+                tails[i] = node
+                tail_ranks[i] = rank
+        self._size = len(self._keys)
+        for i in range(self._level):
+            tails[i].width[i] = self._size - tail_ranks[i]
+        self.loaded = True
+
+    def clear(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._keys.clear()
+
+    def update(self, user_id: int, points: int, completed: int):
+        """إضافة مستخدم أو تحديث نقاطه"""
+        key = self._make_key(user_id, points, completed)
+        old = self._keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self._delete(old)
+        self._insert(key)
+        self._keys[user_id] = key
+
+    def remove(self, user_id: int):
+        key = self._keys.pop(user_id, None)
+        if key is not None:
+            self._delete(key)
+
+    def _insert(self, key: Key):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.width[i]
+                node = node.next[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.width[i] = self._size
+            self._level = level
+
+        new = _Node(key, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.width[i] = update[i].width[i] - (rank[0] - rank[i])
+            update[i].width[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def _delete(self, key: Key):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            return
+        for i in range(self._level):
+            if update[i].next[i] is target:
+                update[i].width[i] += target.width[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """ترتيب المستخدم (1 = الأول)، أو None إذا لم يكن في اللوحة"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        traversed = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                traversed += node.width[i]
+                node = node.next[i]
+            if node.key == key:
+                return traversed
+        return None
+
+    def _node_at(self, rank: int) -> Optional[_Node]:
+        traversed = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and traversed + node.width[i] <= rank:
+                traversed += node.width[i]
+                node = node.next[i]
+            if traversed == rank:
+                return node
+        return None
+
+    def _walk(self, start: int, count: int) -> Iterator[Tuple[int, int]]:
+        node = self._node_at(start) if start > 0 else None
+        position = start
+        while node is not None and count > 0:
+            yield position, node.key[2]
+            node = node.next[0]
+            position += 1
+            count -= 1
+
+    def top(self, limit: int) -> List[int]:
+        """أول limit مستخدمين"""
+        return [user_id for _, user_id in self._walk(1, limit)]
+
+    def around(self, user_id: int, radius: int = 2) -> List[Tuple[int, int]]:
+        """(rank, user_id) للمستخدم ومن حوله"""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(1, rank - radius)
+        return list(self._walk(start, rank + radius - start + 1))
@@ -0,0 +1,164 @@
+"""
+مشغّل الترقيات - Migration Runner
+Ordered, versioned schema migrations recorded in schema_version, with chunked
+and resumable backfills; a warm start costs a single query
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+
+from .pool import ConnectionPool
+
+logger = logging.getLogger('database')
+
+Apply = Callable[[aiosqlite.Connection], Awaitable[None]]
+# (db, after_id, chunk_size) -> (last id, rows scanned), or None when nothing is left
+Backfill = Callable[[aiosqlite.Connection, int, int], Awaitable[Optional[Tuple[int, int]]]]
+Total = Callable[[aiosqlite.Connection, int], Awaitable[int]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    """ترقية واحدة: apply لتغييرات المخطط، أو backfill لتعبئة البيانات على دفعات"""
+    version: int
+    name: str
+    apply: Optional[Apply] = None
+    backfill: Optional[Backfill] = None
+    total: Optional[Total] = None
+    # executescript يلتزم ضمنياً، فلا يمكن تغليفه بمعاملة
+    transactional: bool = True
+
+
+class MigrationRunner:
+    """تطبيق الترقيات المعلّقة بالترتيب"""
+
+    def __init__(self, pool: ConnectionPool, migrations: List[Migration], chunk_size: int = 5000):
+        versions = [m.version for m in migrations]
+        if versions != sorted(set(versions)):
+            raise ValueError('Migration versions must be unique and ascending')
+        self.pool = pool
+        self.migrations = migrations
+        self.chunk_size = max(1, chunk_size)
+
+    @property
+    def latest(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    async def _prepare(self, db: aiosqlite.Connection) -> int:
+        await db.execute(
+            """CREATE TABLE IF NOT EXISTS schema_version (
+                   version INTEGER PRIMARY KEY,
+                   name TEXT NOT NULL,
+                   applied_at TEXT NOT NULL,
+                   duration_ms INTEGER
+               )"""
+        )
+        await db.execute(
+            """CREATE TABLE IF NOT EXISTS migration_progress (
+                   version INTEGER PRIMARY KEY,
+                   cursor INTEGER NOT NULL,
+                   processed INTEGER NOT NULL DEFAULT 0,
+                   updated_at TEXT NOT NULL
+               )"""
+        )
+        await db.commit()
+        return await self.current_version(db)
+
+    @staticmethod
+    async def current_version(db: aiosqlite.Connection) -> int:
+        rows = await db.execute_fetchall("SELECT MAX(version) FROM schema_version")
+        return rows[0][0] or 0
+
+    async def run(self) -> List[int]:
+        """تطبيق الترقيات المعلّقة وإرجاع أرقامها"""
+        async with self.pool.writer() as db:
+            try:
+                current = await self.current_version(db)
+            except aiosqlite.OperationalError:
+                current = await self._prepare(db)
+            if current >= self.latest:
+                return []
+            current = await self._prepare(db)
+
+        applied = []
+        for migration in self.migrations:
+            if migration.version <= current:
+                continue
+            started = time.perf_counter()
+            if migration.backfill is not None:
+                await self._run_backfill(migration)
+            else:
+                await self._run_apply(migration)
+            duration = time.perf_counter() - started
+            logger.info(f"✅ Migration {migration.version:03d} {migration.name} applied in {duration:.2f}s")
+            applied.append(migration.version)
+        return applied
+
+    async def _record(self, db: aiosqlite.Connection, migration: Migration, duration: float):
+        await db.execute(
+            "INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+            (migration.version, migration.name, datetime.now(timezone.utc).isoformat(), int(duration * 1000))
+        )
+
+    async def _run_apply(self, migration: Migration):
+        started = time.perf_counter()
+        async with self.pool.writer() as db:
+            try:
+                if migration.transactional:
+                    await db.execute("BEGIN IMMEDIATE")
+                if migration.apply is not None:
+                    await migration.apply(db)
+                await self._record(db, migration, time.perf_counter() - started)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                logger.error(f"❌ Migration {migration.version:03d} {migration.name} failed")
+                raise
+
+    async def _run_backfill(self, migration: Migration):
+        """تعبئة على دفعات، كل دفعة في معاملة مع حفظ الموضع لاستئنافها بعد إعادة التشغيل"""
+        started = time.perf_counter()
+        async with self.pool.writer() as db:
+            rows = await db.execute_fetchall(
+                "SELECT cursor, processed FROM migration_progress WHERE version = ?",
+                (migration.version,)
+            )
+            cursor, processed = rows[0] if rows else (0, 0)
+            total = processed + await migration.total(db, cursor) if migration.total else None
+        if cursor:
+            logger.info(f"🔄 Resuming migration {migration.version:03d} {migration.name} after id {cursor}")
+
+        while True:
+            # The writer is released between chunks so other writes can interleave
+            async with self.pool.writer() as db:
+                try:
+                    await db.execute("BEGIN IMMEDIATE")
+                    chunk = await migration.backfill(db, cursor, self.chunk_size)
+                    if chunk is None:
+                        if migration.apply is not None:
+                            await migration.apply(db)
+                        await db.execute("DELETE FROM migration_progress WHERE version = ?", (migration.version,))
+                        await self._record(db, migration, time.perf_counter() - started)
+                        await db.commit()
+                        return
+                    last, rows = chunk
+                    processed += rows
+                    await db.execute(
+                        """INSERT INTO migration_progress (version, cursor, processed, updated_at) VALUES (?, ?, ?, ?)
+                           ON CONFLICT(version) DO UPDATE SET cursor = excluded.cursor,
+                               processed = excluded.processed, updated_at = excluded.updated_at""",
+                        (migration.version, last, processed, datetime.now(timezone.utc).isoformat())
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    logger.error(f"❌ Migration {migration.version:03d} {migration.name} failed after id {cursor}")
+                    raise
+            cursor = last
+            progress = f"{processed}/{total}" if total is not None else str(processed)
+            logger.info(f"🔄 Migration {migration.version:03d} {migration.name}: {progress} rows")
+
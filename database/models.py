@@ -45,6 +45,7 @@ class Booking:
     updated_at: Optional[datetime] = None
     created_by: str = ''
     duration_days: int = 1
+    scheduled_ts: Optional[int] = None  # UTC epoch seconds, set when read from the database
 
 @dataclass
 class Alliance:
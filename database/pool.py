@@ -0,0 +1,163 @@
+"""
+مجمع الاتصالات - Connection Pool
+One serialized writer connection and N reader connections in WAL mode
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Any, List, Optional
+
+import aiosqlite
+
+logger = logging.getLogger('database')
+
+# (seconds the connection was held, seconds spent waiting for it)
+TimingHook = Callable[[float, float], None]
+
+
+class ConnectionPool:
+    """مجمع اتصالات SQLite طويل العمر"""
+
+    def __init__(self, db_path: str, readers: int = 4, busy_timeout_ms: int = 5000,
+                 timing_hook: Optional[TimingHook] = None):
+        self.db_path = db_path
+        self.reader_count = max(1, readers)
+        self.busy_timeout_ms = busy_timeout_ms
+        # Called on every release; the bot points it at its request metrics
+        self.timing_hook = timing_hook
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        self._closed = True
+        self._open_lock = asyncio.Lock()
+
+        # Metrics
+        self._reader_acquisitions = 0
+        self._writer_acquisitions = 0
+        self._reader_wait_total = 0.0
+        self._writer_wait_total = 0.0
+        self._reader_wait_max = 0.0
+        self._writer_wait_max = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        await conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+        if read_only:
+            await conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    async def open(self):
+        """فتح اتصال الكتابة واتصالات القراءة"""
+        async with self._open_lock:
+            if not self._closed:
+                return
+            await self._open()
+
+    async def _open(self):
+        self._writer = await self._connect(read_only=False)
+        mode = await self._writer.execute_fetchall("PRAGMA journal_mode = WAL")
+        if mode and str(mode[0][0]).lower() != 'wal':
+            logger.warning(f"⚠️ WAL mode unavailable, journal_mode={mode[0][0]}")
+
+        self._idle_readers = asyncio.Queue()
+        for _ in range(self.reader_count):
+            conn = await self._connect(read_only=True)
+            self._readers.append(conn)
+            self._idle_readers.put_nowait(conn)
+
+        self._closed = False
+        logger.info(f"✅ Connection pool opened: 1 writer, {self.reader_count} readers ({self.db_path})")
+
+    async def close(self):
+        """إغلاق جميع الاتصالات"""
+        if self._closed:
+            return
+        self._closed = True
+
+        async with self._writer_lock:
+            if self._writer is not None:
+                try:
+                    await self._writer.commit()
+                    await self._writer.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                except Exception as e:
+                    logger.warning(f"⚠️ Error flushing writer on close: {e}")
+                await self._writer.close()
+                self._writer = None
+
+        for conn in self._readers:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Error closing reader: {e}")
+        self._readers.clear()
+        self._idle_readers = None
+        logger.info("✅ Connection pool closed")
+
+    @asynccontextmanager
+    async def reader(self):
+        """استعارة اتصال قراءة"""
+        if self._closed:
+            raise RuntimeError('Connection pool is not open')
+
+        started = time.perf_counter()
+        conn = await self._idle_readers.get()
+        acquired = time.perf_counter()
+        waited = acquired - started
+        self._reader_acquisitions += 1
+        self._reader_wait_total += waited
+        self._reader_wait_max = max(self._reader_wait_max, waited)
+
+        try:
+            yield conn
+        finally:
+            conn.row_factory = None
+            if self._idle_readers is not None:
+                self._idle_readers.put_nowait(conn)
+            if self.timing_hook is not None:
+                self.timing_hook(time.perf_counter() - acquired, waited)
+
+    @asynccontextmanager
+    async def writer(self):
+        """الحصول الحصري على اتصال الكتابة"""
+        if self._closed:
+            raise RuntimeError('Connection pool is not open')
+
+        started = time.perf_counter()
+        async with self._writer_lock:
+            acquired = time.perf_counter()
+            waited = acquired - started
+            self._writer_acquisitions += 1
+            self._writer_wait_total += waited
+            self._writer_wait_max = max(self._writer_wait_max, waited)
+
+            try:
+                yield self._writer
+            finally:
+                self._writer.row_factory = None
+                if self.timing_hook is not None:
+                    self.timing_hook(time.perf_counter() - acquired, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات المجمع"""
+        idle = self._idle_readers.qsize() if self._idle_readers is not None else 0
+        return {
+            'open': self.is_open,
+            'readers': len(self._readers),
+            'readers_idle': idle,
+            'readers_in_use': len(self._readers) - idle,
+            'writer_locked': self._writer_lock.locked(),
+            'reader_acquisitions': self._reader_acquisitions,
+            'writer_acquisitions': self._writer_acquisitions,
+            'reader_wait_avg_ms': (self._reader_wait_total / self._reader_acquisitions * 1000) if self._reader_acquisitions else 0.0,
+            'writer_wait_avg_ms': (self._writer_wait_total / self._writer_acquisitions * 1000) if self._writer_acquisitions else 0.0,
+            'reader_wait_max_ms': self._reader_wait_max * 1000,
+            'writer_wait_max_ms': self._writer_wait_max * 1000,
+        }
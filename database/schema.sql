@@ -41,6 +41,9 @@ CREATE TABLE IF NOT EXISTS bookings (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_by TEXT NOT NULL,
+    -- UTC epoch seconds of scheduled_time and scheduled_time + duration_days, for range queries
+    scheduled_ts INTEGER,
+    scheduled_end_ts INTEGER,
     FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
@@ -82,7 +85,8 @@ CREATE TABLE IF NOT EXISTS logs (
     booking_id INTEGER,
     description TEXT NOT NULL,
     details TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_ts INTEGER
 );
 
 -- جدول الصلاحيات
@@ -102,15 +106,92 @@ CREATE TABLE IF NOT EXISTS settings (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- صندوق صادر التذكيرات (صف لكل حجز وموعد تذكير)
+CREATE TABLE IF NOT EXISTS reminder_outbox (
+    outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    booking_id INTEGER NOT NULL,
+    offset_hours INTEGER NOT NULL,
+    due_at INTEGER NOT NULL,
+    next_attempt_at INTEGER NOT NULL,
+    status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'claimed', 'sent', 'failed', 'skipped', 'cancelled')),
+    attempts INTEGER DEFAULT 0,
+    claimed_at INTEGER,
+    sent_at INTEGER,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (booking_id) REFERENCES bookings(booking_id),
+    UNIQUE(booking_id, offset_hours)
+);
+
+-- عدادات مجمعة تحدّثها المشغلات (get_stats تقرأها باستعلام واحد)
+CREATE TABLE IF NOT EXISTS counters (
+    counter_key TEXT PRIMARY KEY NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_bookings_insert AFTER INSERT ON bookings
+BEGIN
+    INSERT INTO counters (counter_key, value) VALUES ('bookings', 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+    INSERT INTO counters (counter_key, value) VALUES ('bookings.status.' || COALESCE(NEW.status, ''), 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+    INSERT INTO counters (counter_key, value) VALUES ('bookings.type.' || COALESCE(NEW.booking_type, ''), 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_bookings_delete AFTER DELETE ON bookings
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings';
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.status.' || COALESCE(OLD.status, '');
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.type.' || COALESCE(OLD.booking_type, '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_bookings_update AFTER UPDATE OF status, booking_type ON bookings
+WHEN OLD.status IS NOT NEW.status OR OLD.booking_type IS NOT NEW.booking_type
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.status.' || COALESCE(OLD.status, '');
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'bookings.type.' || COALESCE(OLD.booking_type, '');
+    INSERT INTO counters (counter_key, value) VALUES ('bookings.status.' || COALESCE(NEW.status, ''), 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+    INSERT INTO counters (counter_key, value) VALUES ('bookings.type.' || COALESCE(NEW.booking_type, ''), 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_users_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO counters (counter_key, value) VALUES ('users', 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_users_delete AFTER DELETE ON users
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_alliances_insert AFTER INSERT ON alliances
+BEGIN
+    INSERT INTO counters (counter_key, value) VALUES ('alliances', 1)
+        ON CONFLICT(counter_key) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_alliances_delete AFTER DELETE ON alliances
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE counter_key = 'alliances';
+END;
+
 -- الفهارس لتحسين الأداء
+-- (فهارس أعمدة *_ts تنشئها الترقية 7، إذ قد لا تكون الأعمدة موجودة في القواعد القديمة بعد)
 CREATE INDEX IF NOT EXISTS idx_bookings_user_id ON bookings(user_id);
 CREATE INDEX IF NOT EXISTS idx_bookings_scheduled_time ON bookings(scheduled_time);
 CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status);
 CREATE INDEX IF NOT EXISTS idx_bookings_type ON bookings(booking_type);
+CREATE INDEX IF NOT EXISTS idx_outbox_status_next ON reminder_outbox(status, next_attempt_at);
 CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id);
 CREATE INDEX IF NOT EXISTS idx_users_alliance_id ON users(alliance_id);
 CREATE INDEX IF NOT EXISTS idx_users_language ON users(language);
+CREATE INDEX IF NOT EXISTS idx_users_leaderboard ON users(points DESC, completed_bookings DESC);
 CREATE INDEX IF NOT EXISTS idx_logs_action_type ON logs(action_type);
 CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs(created_at);
 CREATE INDEX IF NOT EXISTS idx_achievements_user_id ON achievements(user_id);
 CREATE INDEX IF NOT EXISTS idx_alliances_tag ON alliances(tag);
+CREATE INDEX IF NOT EXISTS idx_alliances_leaderboard ON alliances(total_points DESC, total_bookings DESC);
@@ -0,0 +1,248 @@
+"""
+محرك الفترات - Slot Engine
+Per booking_type capacity over time, kept as a step function on sorted interval
+endpoints: overlap/peak checks walk only the segments inside the requested window.
+Bookings occupy whole days (duration_days, at least one); capacity 0 means unlimited
+"""
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DAY_SECONDS = 86400
+
+# Runs per block in the free-gap index
+GAP_BLOCK = 64
+
+
+class SlotConflictError(ValueError):
+    """الفترة المطلوبة ممتلئة لهذا النوع من الحجوزات"""
+
+    def __init__(self, booking_type: str, start: float, end: float, capacity: int, peak: int):
+        self.booking_type = booking_type
+        self.start = start
+        self.end = end
+        self.capacity = capacity
+        self.peak = peak
+        super().__init__(f'{booking_type} slot full between {int(start)} and {int(end)} ({peak}/{capacity})')
+
+
+class SlotTimeline:
+    """
+    عدد الحجوزات المتزامنة لنوع واحد كدالة درجية
+
+    counts[i] هو عدد الحجوزات النشطة في [times[i], times[i+1])، والعدد قبل times[0] صفر
+    """
+
+    def __init__(self, capacity: int = 0):
+        # 0 = unlimited: the timeline still counts, but is never full
+        self.capacity = max(0, capacity)
+        self._times: List[float] = []
+        self._counts: List[int] = []
+        self._intervals: Dict[int, Tuple[float, float]] = {}
+        # Maximal disjoint runs where the timeline is at capacity, for free-window search
+        self._run_starts: List[float] = []
+        self._run_ends: List[float] = []
+        # Gaps between consecutive runs with per-block maxima, rebuilt lazily after changes
+        self._gaps: Optional[List[float]] = None
+        self._gap_block_max: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, booking_id: int) -> bool:
+        return booking_id in self._intervals
+
+    def _split(self, t: float) -> int:
+        """التأكد من وجود حد عند t وإرجاع موضعه"""
+        i = bisect.bisect_left(self._times, t)
+        if i < len(self._times) and self._times[i] == t:
+            return i
+        self._times.insert(i, t)
+        self._counts.insert(i, self._counts[i - 1] if i else 0)
+        return i
+
+    def _merge(self, i: int):
+        """حذف الحد i إذا لم يعد يغيّر العدد"""
+        if 0 <= i < len(self._times) and self._counts[i] == (self._counts[i - 1] if i else 0):
+            del self._times[i]
+            del self._counts[i]
+
+    def add(self, booking_id: int, start: float, end: float):
+        if booking_id in self._intervals or end <= start:
+            return
+        i = self._split(start)
+        j = self._split(end)
+        for k in range(i, j):
+            self._counts[k] += 1
+        self._intervals[booking_id] = (start, end)
+        self._refresh_runs(start, end)
+
+    def remove(self, booking_id: int):
+        interval = self._intervals.pop(booking_id, None)
+        if interval is None:
+            return
+        start, end = interval
+        # Either endpoint may have been merged away when a neighbouring interval was removed
+        i = self._split(start)
+        j = self._split(end)
+        for k in range(i, j):
+            self._counts[k] -= 1
+        # The end boundary first, so the start index stays valid
+        self._merge(j)
+        self._merge(i)
+        self._refresh_runs(start, end)
+
+    def _segments(self, start: float, end: float) -> Iterator[Tuple[float, float, int]]:
+        """(from, to, count) للمقاطع داخل [start, end)"""
+        i = bisect.bisect_right(self._times, start) - 1
+        cursor = start
+        while cursor < end:
+            count = self._counts[i] if i >= 0 else 0
+            boundary = min(self._times[i + 1], end) if i + 1 < len(self._times) else end
+            yield cursor, boundary, count
+            cursor = boundary
+            i += 1
+
+    def _refresh_runs(self, start: float, end: float):
+        """إعادة حساب فترات الامتلاء داخل [start, end) بعد تغيّر العدد فيها"""
+        # Runs overlapping or touching [start, end]
+        lo = bisect.bisect_left(self._run_ends, start)
+        hi = bisect.bisect_right(self._run_starts, end)
+
+        pieces: List[Tuple[float, float]] = []
+        right = None
+        if lo < hi:
+            if self._run_starts[lo] < start:
+                pieces.append((self._run_starts[lo], start))
+            if self._run_ends[hi - 1] > end:
+                right = (end, self._run_ends[hi - 1])
+        for seg_start, seg_end, count in self._segments(start, end):
+            if self.capacity and count >= self.capacity:
+                pieces.append((seg_start, seg_end))
+        if right is not None:
+            pieces.append(right)
+
+        merged: List[Tuple[float, float]] = []
+        for piece in pieces:
+            if merged and piece[0] <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], piece[1]))
+            else:
+                merged.append(piece)
+
+        self._run_starts[lo:hi] = [run[0] for run in merged]
+        self._run_ends[lo:hi] = [run[1] for run in merged]
+        self._gaps = None
+
+    def _build_gaps(self) -> List[float]:
+        if self._gaps is None:
+            starts, ends = self._run_starts, self._run_ends
+            self._gaps = [starts[k + 1] - ends[k] for k in range(len(starts) - 1)]
+            self._gap_block_max = [
+                max(self._gaps[b:b + GAP_BLOCK]) for b in range(0, len(self._gaps), GAP_BLOCK)
+            ]
+        return self._gaps
+
+    def _first_gap(self, k: int, duration: float) -> int:
+        """أول j >= k تتسع الفجوة بعد فترته لـ duration (j الأخير مفتوح النهاية)"""
+        gaps = self._build_gaps()
+        n = len(gaps)
+        j = k
+        while j < n:
+            if j % GAP_BLOCK == 0 and self._gap_block_max[j // GAP_BLOCK] < duration:
+                j += GAP_BLOCK
+                continue
+            if gaps[j] >= duration:
+                return j
+            j += 1
+        return n
+
+    def peak(self, start: float, end: float) -> int:
+        """أعلى عدد متزامن داخل [start, end)"""
+        i = bisect.bisect_right(self._times, start) - 1
+        peak = self._counts[i] if i >= 0 else 0
+        i += 1
+        while i < len(self._times) and self._times[i] < end:
+            peak = max(peak, self._counts[i])
+            i += 1
+        return peak
+
+    def fits(self, start: float, end: float) -> bool:
+        return not self.capacity or self.peak(start, end) < self.capacity
+
+    def free_windows(self, after: float, duration: float, limit: int, until: float) -> List[Tuple[float, float]]:
+        """
+        أول limit نوافذ حرة متتالية (غير متداخلة) بطول duration تبدأ من after
+
+        بحث ثنائي في فترات الامتلاء، ثم تخطّي الفجوات الأقصر من duration كتلةً كتلة
+        """
+        windows: List[Tuple[float, float]] = []
+        candidate = after
+        while len(windows) < limit and candidate + duration <= until:
+            k = bisect.bisect_right(self._run_ends, candidate)
+            if k < len(self._run_starts) and self._run_starts[k] < candidate + duration:
+                candidate = self._run_ends[self._first_gap(k, duration)]
+                continue
+            windows.append((candidate, candidate + duration))
+            candidate += duration
+        return windows
+
+
+class SlotEngine:
+    """فترات الحجز لكل نوع مع سعة قابلة للضبط"""
+
+    def __init__(self, capacities: Dict[str, int]):
+        self.capacities = dict(capacities)
+        self.timelines: Dict[str, SlotTimeline] = {}
+        self._types: Dict[int, str] = {}
+        self.loaded = False
+
+    def timeline(self, booking_type: str) -> SlotTimeline:
+        timeline = self.timelines.get(booking_type)
+        if timeline is None:
+            timeline = self.timelines[booking_type] = SlotTimeline(self.capacities.get(booking_type, 0))
+        return timeline
+
+    @staticmethod
+    def interval(start_ts: float, duration_days: Optional[int]) -> Tuple[float, float]:
+        return start_ts, start_ts + max(1, duration_days or 1) * DAY_SECONDS
+
+    def load(self, rows: Iterable[Tuple[int, str, float, int]]):
+        """تحميل الحجوزات النشطة (booking_id, booking_type, start_ts, duration_days)"""
+        self.timelines.clear()
+        self._types.clear()
+        for booking_id, booking_type, start_ts, duration_days in rows:
+            if start_ts is not None:
+                self.add(booking_id, booking_type, start_ts, duration_days)
+        self.loaded = True
+
+    def check(self, booking_type: str, start_ts: float, duration_days: Optional[int]):
+        """رفع SlotConflictError إذا لم تتسع الفترة لحجز إضافي"""
+        start, end = self.interval(start_ts, duration_days)
+        timeline = self.timeline(booking_type)
+        if not timeline.capacity:
+            return
+        peak = timeline.peak(start, end)
+        if peak >= timeline.capacity:
+            raise SlotConflictError(booking_type, start, end, timeline.capacity, peak)
+
+    def find_free(self, booking_type: str, after_ts: float, duration_days: Optional[int],
+                  limit: int = 5, horizon_days: int = 90) -> List[Tuple[float, float]]:
+        """النوافذ الحرة التالية لنوع حجز ومدة معينة"""
+        start, end = self.interval(after_ts, duration_days)
+        until = after_ts + horizon_days * DAY_SECONDS
+        return self.timeline(booking_type).free_windows(start, end - start, limit, until)
+
+    def add(self, booking_id: int, booking_type: str, start_ts: float, duration_days: Optional[int]):
+        start, end = self.interval(start_ts, duration_days)
+        self.timeline(booking_type).add(booking_id, start, end)
+        self._types[booking_id] = booking_type
+
+    def release(self, booking_id: int):
+        booking_type = self._types.pop(booking_id, None)
+        if booking_type is not None:
+            self.timelines[booking_type].remove(booking_id)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            booking_type: {'capacity': timeline.capacity, 'active': len(timeline)}
+            for booking_type, timeline in self.timelines.items()
+        }
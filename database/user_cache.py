@@ -0,0 +1,135 @@
+"""
+ذاكرة المستخدمين المؤقتة - User Cache
+Read-through LRU + TTL cache of User rows keyed by discord_id,
+with single-flight loading and write invalidation
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .models import User
+
+
+class UserCache:
+    """ذاكرة LRU مع مدة صلاحية للمستخدمين"""
+
+    def __init__(self, loader: Callable[[str], Awaitable[Optional[User]]],
+                 max_size: int = 2048, ttl: float = 300.0):
+        self.loader = loader
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+
+        # discord_id -> (expires_at, user)
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._ids: Dict[int, str] = {}  # user_id -> discord_id
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def discord_id_for(self, user_id: int) -> Optional[str]:
+        return self._ids.get(user_id)
+
+    async def get(self, discord_id: str) -> Optional[User]:
+        """جلب نسخة من المستخدم من الذاكرة، أو تحميله مرة واحدة مهما تعدد الطالبون"""
+        key = str(discord_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return replace(entry[1])
+            self._evict(key)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+
+        # Shielded so a cancelled caller does not cancel the load the others wait on
+        user = await asyncio.shield(task)
+        # Callers may modify what they get, so the cached row is never handed out
+        return replace(user) if user is not None else None
+
+    async def _load(self, key: str) -> Optional[User]:
+        task = asyncio.current_task()
+        try:
+            user = await self.loader(key)
+        finally:
+            owned = self._inflight.get(key) is task
+            if owned:
+                del self._inflight[key]
+        # A write invalidated this key while we were loading: serve, but don't cache
+        if owned and user is not None:
+            self._store(key, user)
+        return user
+
+    def _store(self, key: str, user: User):
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(key)
+        if user.user_id is not None:
+            self._ids[user.user_id] = key
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+            self.evictions += 1
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._ids.get(entry[1].user_id) == key:
+            del self._ids[entry[1].user_id]
+
+    def invalidate(self, discord_id: str):
+        """إبطال مستخدم بعد تعديل صفه"""
+        key = str(discord_id)
+        self._evict(key)
+        self._inflight.pop(key, None)
+        self.invalidations += 1
+
+    def invalidate_user_id(self, user_id: int):
+        """إبطال مستخدم بمعرفه الداخلي"""
+        key = self._ids.get(user_id)
+        if key is not None:
+            self.invalidate(key)
+            return
+        # Unknown id: any in-flight load might be this user, so none of them may be cached
+        self._inflight.clear()
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._ids.clear()
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """عدادات الذاكرة المؤقتة"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+        }
+
+
+def _consume_exception(task: asyncio.Task):
+    # Every waiter may have been cancelled, so nobody else is guaranteed to read it
+    if not task.cancelled():
+        task.exception()
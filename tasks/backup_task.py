@@ -3,13 +3,15 @@
 """
 import discord
 from discord.ext import commands, tasks
+import asyncio
+import json
 import logging
-import shutil
 import os
 from datetime import datetime
 
 from config import config
 from database import db
+from database.backup import ChangeMonitor, apply_retention, create_backup
 
 logger = logging.getLogger('backup')
 
@@ -18,66 +20,94 @@ class BackupTask(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        self.monitor = ChangeMonitor(config.DATABASE_PATH)
         self.auto_backup.start()
     
     def cog_unload(self):
         """عند إلغاء تحميل الـ Cog"""
         self.auto_backup.cancel()
+        self.monitor.close()
     
     @tasks.loop(hours=config.AUTO_BACKUP_HOURS)
     async def auto_backup(self):
         """نسخ احتياطي تلقائي"""
         try:
-            logger.info("💾 بدء النسخ الاحتياطي التلقائي...")
+            if not os.path.exists(config.DATABASE_PATH):
+                logger.warning("⚠️ لم يتم العثور على قاعدة البيانات")
+                return
+            
+            # تخطي النسخ إذا لم تتغير قاعدة البيانات منذ آخر نسخة
+            version = await asyncio.to_thread(self.monitor.poll)
+            if not self.monitor.has_changed(version):
+                logger.info("💾 لا توجد تغييرات منذ آخر نسخة احتياطية، تم التخطي")
+                return
             
-            # إنشاء مجلد النسخ الاحتياطي
-            os.makedirs(config.BACKUP_DIR, exist_ok=True)
+            logger.info("💾 بدء النسخ الاحتياطي التلقائي...")
             
             # اسم ملف النسخة الاحتياطية
-            backup_name = f'auto_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
-            backup_path = os.path.join(config.BACKUP_DIR, backup_name)
+            backup_name = f'auto_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
             
-            # نسخ قاعدة البيانات
-            if os.path.exists(config.DATABASE_PATH):
-                shutil.copy2(config.DATABASE_PATH, backup_path)
-                
-                file_size = os.path.getsize(backup_path) / 1024  # بالكيلوبايت
-                
-                logger.info(f"✅ تم إنشاء نسخة احتياطية: {backup_name} ({file_size:.2f} KB)")
-                
-                await db.log_action(
-                    'auto_backup',
-                    f"تم إنشاء نسخة احتياطية تلقائية: {backup_name}",
-                    None,
-                    None,
-                    f"الحجم: {file_size:.2f} KB"
-                )
-                
-                # حذف النسخ القديمة (الاحتفاظ بآخر 10 نسخ فقط)
-                await self.cleanup_old_backups()
-            else:
-                logger.warning("⚠️ لم يتم العثور على قاعدة البيانات")
+            # نسخ قاعدة البيانات عبر Backup API في خيط منفصل دون حجب الحلقة
+            result = await asyncio.to_thread(
+                create_backup,
+                config.DATABASE_PATH,
+                config.BACKUP_DIR,
+                backup_name,
+                config.BACKUP_FULL_EVERY,
+                config.BACKUP_PAGES_PER_STEP,
+                compresslevel=config.BACKUP_COMPRESS_LEVEL
+            )
+            self.monitor.mark(version)
+            
+            if result is None:
+                logger.info("💾 لم تتغير أي صفحة منذ آخر نسخة احتياطية، تم التخطي")
+                return
+            
+            file_size = result.size_bytes / 1024  # بالكيلوبايت
+            db_size = result.db_bytes / 1024
+            
+            logger.info(
+                f"✅ تم إنشاء نسخة احتياطية ({result.kind}): {os.path.basename(result.path)} "
+                f"({file_size:.2f} KB من {db_size:.2f} KB، {result.changed_pages}/{result.pages} صفحة، "
+                f"{result.duration:.2f}s)"
+            )
+            
+            await db.log_action(
+                'auto_backup',
+                f"تم إنشاء نسخة احتياطية تلقائية: {os.path.basename(result.path)}",
+                None,
+                None,
+                json.dumps({
+                    'kind': result.kind,
+                    'parent': result.parent,
+                    'size_kb': round(file_size, 2),
+                    'db_size_kb': round(db_size, 2),
+                    'duration_s': round(result.duration, 3),
+                    'pages': result.pages,
+                    'changed_pages': result.changed_pages,
+                    'pages_per_sec': round(result.pages_per_sec, 1),
+                    'sha256': result.sha256,
+                })
+            )
+            
+            # حذف النسخ خارج سياسة الاحتفاظ
+            await self.cleanup_old_backups()
             
         except Exception as e:
             logger.error(f"❌ خطأ في النسخ الاحتياطي: {e}", exc_info=e)
     
     async def cleanup_old_backups(self):
-        """حذف النسخ الاحتياطية القديمة"""
+        """حذف النسخ الاحتياطية القديمة (احتفاظ متدرج ساعي/يومي/أسبوعي)"""
         try:
-            backups = []
-            for file in os.listdir(config.BACKUP_DIR):
-                if file.startswith('auto_backup_') and file.endswith('.db'):
-                    file_path = os.path.join(config.BACKUP_DIR, file)
-                    backups.append((file_path, os.path.getmtime(file_path)))
-            
-            # ترتيب حسب التاريخ
-            backups.sort(key=lambda x: x[1], reverse=True)
-            
-            # حذف ما يزيد عن 10 نسخ
-            if len(backups) > 10:
-                for backup_path, _ in backups[10:]:
-                    os.remove(backup_path)
-                    logger.info(f"🗑️ تم حذف نسخة احتياطية قديمة: {os.path.basename(backup_path)}")
+            removed = await asyncio.to_thread(
+                apply_retention,
+                config.BACKUP_DIR,
+                config.BACKUP_KEEP_HOURLY,
+                config.BACKUP_KEEP_DAILY,
+                config.BACKUP_KEEP_WEEKLY
+            )
+            for name in removed:
+                logger.info(f"🗑️ تم حذف نسخة احتياطية قديمة: {name}")
         
         except Exception as e:
             logger.error(f"خطأ في تنظيف النسخ الاحتياطية: {e}")
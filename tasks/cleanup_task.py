@@ -5,10 +5,10 @@ Auto-cleanup of expired bookings and old logs
 import discord
 from discord.ext import commands, tasks
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from database import db
-from utils import datetime_helper
+from config import config
 
 logger = logging.getLogger('cleanup')
 
@@ -19,46 +19,35 @@ class CleanupTask(commands.Cog):
         self.bot = bot
         self.cleanup_expired.start()
         self.cleanup_old_logs.start()
+        self.reconcile_counters.start()
+        self.archive_bookings.start()
     
     def cog_unload(self):
         """عند إلغاء تحميل الـ Cog"""
         self.cleanup_expired.cancel()
         self.cleanup_old_logs.cancel()
+        self.reconcile_counters.cancel()
+        self.archive_bookings.cancel()
     
-    @tasks.loop(hours=6)
+    @tasks.loop(minutes=1)
     async def cleanup_expired(self):
-        """تنظيف الحجوزات المنتهية كل 6 ساعات"""
+        """تعليم الحجوزات المنتهية كل دقيقة (استعلام واحد)"""
         try:
-            logger.info("🧹 بدء تنظيف الحجوزات المنتهية...")
+            expired_ids = await db.expire_finished_bookings()
             
-            # Get all active bookings
-            bookings = await db.get_all_active_bookings()
-            
-            expired_count = 0
-            now = datetime_helper.get_now()
-            
-            for booking in bookings:
-                # If the booking time + duration has passed
-                booking_end_time = booking.scheduled_time + timedelta(days=booking.duration_days)
-                
-                if datetime_helper.is_past(booking_end_time):
-                    # Mark as expired
-                    await db.update_booking_status(booking.booking_id, 'expired')
-                    expired_count += 1
-                    
-                    logger.info(f"Expired booking #{booking.booking_id} - ended at {booking_end_time}")
-            
-            if expired_count > 0:
-                logger.info(f"✅ Marked {expired_count} bookings as expired")
+            if expired_ids:
+                shown = ', '.join(f"#{booking_id}" for booking_id in expired_ids[:50])
+                if len(expired_ids) > 50:
+                    shown += f" (+{len(expired_ids) - 50})"
+                logger.info(f"✅ Marked {len(expired_ids)} bookings as expired: {shown}")
                 
                 await db.log_action(
                     'cleanup',
-                    f"Cleaned up {expired_count} expired bookings",
+                    f"Cleaned up {len(expired_ids)} expired bookings",
                     None,
-                    None
+                    None,
+                    shown
                 )
-            else:
-                logger.info("✅ No expired bookings to clean")
             
         except Exception as e:
             logger.error(f"❌ Error in cleanup: {e}", exc_info=e)
@@ -70,18 +59,9 @@ class CleanupTask(commands.Cog):
             logger.info("🧹 بدء تنظيف السجلات القديمة...")
             
             # Delete logs older than 90 days
-            cutoff_date = datetime.now() - timedelta(days=90)
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=90)
             
-            result = await db.execute(
-                "DELETE FROM logs WHERE created_at < ?",
-                (cutoff_date,)
-            )
-            
-            # Get count of deleted rows (approximate)
-            count_result = await db.fetchone(
-                "SELECT changes()"
-            )
-            deleted_count = count_result[0] if count_result else 0
+            deleted_count = await db.delete_logs_before(cutoff_date)
             
             if deleted_count > 0:
                 logger.info(f"✅ Deleted {deleted_count} old log entries")
@@ -98,6 +78,46 @@ class CleanupTask(commands.Cog):
         except Exception as e:
             logger.error(f"❌ Error cleaning old logs: {e}", exc_info=e)
     
+    @tasks.loop(hours=config.COUNTER_RECONCILE_HOURS)
+    async def reconcile_counters(self):
+        """مطابقة عدادات الإحصائيات مع العدّ الفعلي"""
+        try:
+            drift = await db.reconcile_counters()
+            
+            if drift:
+                shown = ', '.join(f"{key}: {stored}->{actual}" for key, (stored, actual) in sorted(drift.items()))
+                logger.warning(f"⚠️ Counter drift corrected: {shown}")
+                
+                await db.log_action(
+                    'counters_reconciled',
+                    f"Corrected {len(drift)} drifted counters",
+                    None,
+                    None,
+                    shown
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Error reconciling counters: {e}", exc_info=e)
+    
+    @tasks.loop(hours=24)
+    async def archive_bookings(self):
+        """نقل الحجوزات المنتهية القديمة إلى الأرشيف كل 24 ساعة"""
+        try:
+            archived = await db.archive_finished_bookings()
+            
+            if archived:
+                logger.info(f"✅ Archived {archived} finished bookings older than {config.BOOKING_ARCHIVE_DAYS} days")
+                
+                await db.log_action(
+                    'cleanup',
+                    f"Archived {archived} finished bookings",
+                    None,
+                    None
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Error archiving bookings: {e}", exc_info=e)
+    
     @cleanup_expired.before_loop
     async def before_cleanup(self):
         """الانتظار حتى يصبح البوت جاهزاً"""
@@ -109,6 +129,16 @@ class CleanupTask(commands.Cog):
         """الانتظار حتى يصبح البوت جاهزاً"""
         await self.bot.wait_until_ready()
         logger.info("✅ بدأت مهمة تنظيف السجلات")
+    
+    @reconcile_counters.before_loop
+    async def before_reconcile_counters(self):
+        """الانتظار حتى يصبح البوت جاهزاً"""
+        await self.bot.wait_until_ready()
+    
+    @archive_bookings.before_loop
+    async def before_archive_bookings(self):
+        """الانتظار حتى يصبح البوت جاهزاً"""
+        await self.bot.wait_until_ready()
 
 async def setup(bot):
     """إعداد الـ Cog"""
@@ -0,0 +1,135 @@
+"""
+موزع التذكيرات - Reminder Dispatcher
+Bounded worker pool that delivers reminder DMs in parallel
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+import discord
+
+from utils.rate_limiter import RouteRateLimiter
+
+logger = logging.getLogger('reminders')
+
+
+class ReminderDispatcher:
+    """طابور إرسال التذكيرات مع مجموعة عمال محدودة"""
+
+    THROUGHPUT_WINDOW = 60.0
+
+    def __init__(self, bot, handler: Callable[[int, int], Awaitable[bool]],
+                 workers: int = 8, max_queue: int = 10000, limiter: RouteRateLimiter = None):
+        self.bot = bot
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.max_queue = max_queue
+        self.limiter = limiter or RouteRateLimiter()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._recent = deque()
+
+        # Metrics
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.user_cache_hits = 0
+        self.user_fetches = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not w.done() for w in self._workers)
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f'reminder-dispatch-{i}')
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """إيقاف العمال بعد محاولة تفريغ الطابور"""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Reminder queue not drained on stop ({self._queue.qsize()} pending)")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, booking_id: int, hours: int):
+        """إضافة تذكير إلى طابور الإرسال"""
+        await self._queue.put((booking_id, hours))
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    async def _worker(self):
+        while True:
+            booking_id, hours = await self._queue.get()
+            self.in_flight += 1
+            try:
+                ok = await self.handler(booking_id, hours)
+                if ok:
+                    self.sent += 1
+                    self._recent.append(time.monotonic())
+                elif ok is False:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error dispatching {hours}h reminder for booking #{booking_id}: {e}", exc_info=e)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    async def resolve_user(self, discord_id: int) -> discord.User:
+        """جلب المستخدم من الذاكرة أولاً، ثم عبر HTTP عند الحاجة"""
+        user = self.bot.get_user(discord_id)
+        if user is not None:
+            self.user_cache_hits += 1
+            return user
+        self.user_fetches += 1
+        await self.limiter.acquire('fetch_user')
+        return await self.bot.fetch_user(discord_id)
+
+    async def send_dm(self, discord_id: int, **kwargs) -> discord.Message:
+        """إرسال رسالة خاصة مع احترام حدود كل مسار"""
+        user = await self.resolve_user(discord_id)
+        channel = user.dm_channel
+        if channel is None:
+            await self.limiter.acquire('create_dm')
+            channel = await user.create_dm()
+        await self.limiter.acquire('channel_message', channel.id)
+        return await channel.send(**kwargs)
+
+    def throughput(self) -> float:
+        """عدد التذكيرات المرسلة في الثانية خلال آخر دقيقة"""
+        cutoff = time.monotonic() - self.THROUGHPUT_WINDOW
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        return len(self._recent) / self.THROUGHPUT_WINDOW
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الموزع"""
+        return {
+            'workers': len(self._workers),
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'failed': self.failed,
+            'throughput_per_s': round(self.throughput(), 3),
+            'user_cache_hits': self.user_cache_hits,
+            'user_fetches': self.user_fetches,
+            'rate_limit_wait_s': round(self.limiter.total_wait, 3),
+        }
@@ -0,0 +1,139 @@
+"""
+مجدول التذكيرات - Reminder Scheduler
+Min-heap of reminder deadlines that sleeps until the next one is due
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database.models import Booking
+from utils.datetime_helper import to_timestamp
+
+logger = logging.getLogger('reminders')
+
+# (due_ts, seq, booking_id, hours, generation)
+HeapEntry = Tuple[float, int, int, int, int]
+
+
+class ReminderScheduler:
+    """مجدول تذكيرات يعتمد على كومة صغرى بدل الفحص الدوري"""
+
+    # أقصى مدة نوم متواصلة، للتعافي من تغيّر ساعة النظام
+    MAX_SLEEP = 60.0
+
+    def __init__(self, callback: Callable[[int, int], Awaitable[None]], offsets_hours: List[int]):
+        self.callback = callback
+        self.offsets_hours = sorted(set(offsets_hours), reverse=True)
+
+        self._heap: List[HeapEntry] = []
+        self._generations: Dict[int, int] = {}
+        self._entry_counts: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.fired = 0
+        self.max_lateness = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, booking_id: int, hours: int, due_ts: float):
+        """إضافة مدخل تذكير واحد إلى الكومة"""
+        generation = self._generations.setdefault(booking_id, 1)
+        heapq.heappush(self._heap, (due_ts, next(self._seq), booking_id, hours, generation))
+        self._entry_counts[booking_id] = self._entry_counts.get(booking_id, 0) + 1
+        self._wakeup.set()
+
+    def schedule_booking(self, booking: Booking, not_before: float = None):
+        """جدولة تذكيرات حجز جديد"""
+        if not booking.booking_id or not booking.scheduled_time or booking.status != 'active':
+            return
+
+        event_ts = to_timestamp(booking.scheduled_time)
+        not_before = time.time() if not_before is None else not_before
+
+        for hours in self.offsets_hours:
+            due_ts = event_ts - hours * 3600
+            if due_ts >= not_before:
+                self.schedule(booking.booking_id, hours, due_ts)
+
+    def cancel_booking(self, booking_id: int):
+        """إلغاء تذكيرات حجز (حذف كسول من الكومة)"""
+        if booking_id in self._entry_counts:
+            self._generations[booking_id] += 1
+
+    def on_booking_change(self, event: str, booking_id: int, booking: Optional[Booking]):
+        """مستمع تغييرات الحجوزات من DatabaseManager"""
+        if event in ('created', 'active') and booking is not None:
+            self.schedule_booking(booking)
+        elif event in ('cancelled', 'completed', 'expired'):
+            self.cancel_booking(booking_id)
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name='reminder-scheduler')
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _pop_due(self, now: float) -> List[Tuple[int, int, float]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_ts, _, booking_id, hours, generation = heapq.heappop(self._heap)
+            current = self._generations.get(booking_id)
+
+            # تنظيف جيل الحجز عند خروج آخر مدخل له من الكومة
+            self._entry_counts[booking_id] -= 1
+            if not self._entry_counts[booking_id]:
+                del self._entry_counts[booking_id]
+                self._generations.pop(booking_id, None)
+
+            if current == generation:
+                due.append((booking_id, hours, due_ts))
+        return due
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            for booking_id, hours, due_ts in self._pop_due(now):
+                self.max_lateness = max(self.max_lateness, now - due_ts)
+                self.fired += 1
+                try:
+                    await self.callback(booking_id, hours)
+                except Exception as e:
+                    logger.error(f"Error firing {hours}h reminder for booking #{booking_id}: {e}", exc_info=e)
+
+            self._wakeup.clear()
+            timeout = self.MAX_SLEEP
+            if self._heap:
+                timeout = min(max(self._heap[0][0] - time.time(), 0), self.MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        """إحصائيات المجدول"""
+        return {
+            'pending': len(self._heap),
+            'tracked_bookings': len(self._generations),
+            'next_due_in': max(self._heap[0][0] - time.time(), 0) if self._heap else -1,
+            'fired': self.fired,
+            'max_lateness_s': self.max_lateness,
+        }
@@ -3,15 +3,17 @@
 Enhanced with configurable reminder times and i18n support
 """
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Optional
 
 from database import db
-from utils import datetime_helper
 from utils.translator import translator, get_text
 from utils.ui_components import create_colored_embed
 from config import config
+from tasks.reminder_scheduler import ReminderScheduler
+from tasks.reminder_dispatcher import ReminderDispatcher
 
 logger = logging.getLogger('reminders')
 
@@ -20,100 +22,75 @@ class RemindersTask(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.check_reminders.start()
         
-        # Configurable reminder times (in hours before event)
-        self.reminder_times = [
-            24,  # 1 day before
-            6,   # 6 hours before
-            3,   # 3 hours before
-            1,   # 1 hour before
-        ]
+        # Reminder offsets (in hours before event, 0 = at event time)
+        self.reminder_times = list(config.REMINDER_OFFSETS_HOURS)
+        
+        # Overdue reminders within this grace period are still sent after a restart
+        self.catch_up_window = timedelta(minutes=config.REMINDER_CATCH_UP_MINUTES)
+        
+        self.dispatcher = ReminderDispatcher(bot, self._fire_reminder, workers=config.REMINDER_WORKERS)
+        self.scheduler = ReminderScheduler(self.dispatcher.submit, self.reminder_times)
+    
+    async def cog_load(self):
+        """استعادة صندوق التذكيرات وبدء المجدول"""
+        db.add_booking_listener(self.scheduler.on_booking_change)
+        self.dispatcher.start()
+        
+        recovered = await db.recover_reminder_outbox(int(self.catch_up_window.total_seconds()))
+        if recovered['skipped']:
+            logger.warning(f"⚠️ تم تخطي {recovered['skipped']} تذكير فات موعده")
+        
+        # One-time load; overdue rows inside the grace period fire immediately
+        for booking_id, hours, next_attempt_at in await db.get_pending_reminders():
+            self.scheduler.schedule(booking_id, hours, next_attempt_at)
+        
+        self.scheduler.start()
+        logger.info(f"✅ بدأت مهمة التذكيرات ({len(self.scheduler)} تذكير مجدول)")
     
-    def cog_unload(self):
+    async def cog_unload(self):
         """عند إلغاء تحميل الـ Cog"""
-        self.check_reminders.cancel()
+        db.remove_booking_listener(self.scheduler.on_booking_change)
+        await self.scheduler.stop()
+        await self.dispatcher.stop()
     
-    @tasks.loop(minutes=5)
-    async def check_reminders(self):
-        """فحص التذكيرات كل 5 دقائق"""
+    async def _fire_reminder(self, booking_id: int, hours: int) -> Optional[bool]:
+        """إرسال تذكير حان موعده (يُستدعى من عمال الموزع)"""
+        claim = await db.claim_reminder(booking_id, hours)
+        if not claim:
+            return None
+        
+        booking = await db.get_booking(booking_id)
+        if not booking or booking.status != 'active':
+            await db.skip_reminder(claim['outbox_id'], 'booking not active')
+            return None
+        
+        # Workers are long-lived tasks, so the language is scoped to this send only
+        user_id = str(booking.created_by)
+        lang = await translator.resolve_language(db, user_id)
         try:
-            logger.info("🔔 فحص التذكيرات...")
-            
-            # Get all active bookings
-            bookings = await db.get_all_active_bookings()
-            
-            sent_count = 0
-            now = datetime.now(datetime_helper.get_timezone())
-            
-            for booking in bookings:
-                # Check each reminder time
-                for hours in self.reminder_times:
-                    if self._should_send_reminder(booking, hours, now):
-                        await self.send_reminder(booking, hours)
-                        await self._mark_reminder_sent(booking.booking_id, hours)
-                        sent_count += 1
-                
-                # Check for immediate reminder (event time)
-                if self._should_send_now_reminder(booking, now):
+            with translator.use_language(user_id, lang):
+                if hours == 0:
                     await self.send_now_reminder(booking)
-                    await db.update_reminder_sent(booking.booking_id, 'now')
-                    sent_count += 1
-            
-            if sent_count > 0:
-                logger.info(f"✅ تم إرسال {sent_count} تذكير")
-            
+                else:
+                    await self.send_reminder(booking, hours)
+        except discord.Forbidden:
+            await db.fail_reminder(claim['outbox_id'], claim['attempts'], 'dm forbidden', retryable=False)
+            return False
         except Exception as e:
-            logger.error(f"❌ خطأ في فحص التذكيرات: {e}", exc_info=e)
-    
-    @check_reminders.before_loop
-    async def before_check_reminders(self):
-        """الانتظار حتى يصبح البوت جاهزاً"""
-        await self.bot.wait_until_ready()
-        logger.info("✅ بدأت مهمة التذكيرات")
-    
-    def _should_send_reminder(self, booking, hours: int, now: datetime) -> bool:
-        """Check if reminder should be sent"""
-        reminder_time = booking.scheduled_time - timedelta(hours=hours)
-        
-        # Check if it's time to send and not already sent
-        if now >= reminder_time:
-            # Check if already sent (use reminder flags based on hours)
-            if hours == 24 and booking.reminder_24h_sent:
-                return False
-            elif hours == 1 and booking.reminder_1h_sent:
-                return False
-            
-            # Check if we're within the reminder window (5 minutes after reminder time)
-            if now - reminder_time < timedelta(minutes=5):
-                return True
-        
-        return False
-    
-    def _should_send_now_reminder(self, booking, now: datetime) -> bool:
-        """Check if 'now' reminder should be sent"""
-        if booking.reminder_now_sent:
+            retry_at = await db.fail_reminder(claim['outbox_id'], claim['attempts'], str(e))
+            if retry_at:
+                self.scheduler.schedule(booking_id, hours, retry_at)
             return False
         
-        # Send if event time has arrived
-        return now >= booking.scheduled_time and now - booking.scheduled_time < timedelta(minutes=5)
+        await db.complete_reminder(claim['outbox_id'], booking_id, hours)
+        return True
     
-    async def _mark_reminder_sent(self, booking_id: int, hours: int):
-        """Mark reminder as sent in database"""
-        if hours == 24:
-            await db.update_reminder_sent(booking_id, '24h')
-        elif hours == 1:
-            await db.update_reminder_sent(booking_id, '1h')
-    
-    async def send_reminder(self, booking, hours: int):
+    async def send_reminder(self, booking, hours: int) -> bool:
         """إرسال تذكير مخصص"""
         try:
-            user = await self.bot.fetch_user(int(booking.created_by))
             user_id = str(booking.created_by)
             
-            # Load user language
-            await translator.load_user_language_from_db(db, user_id)
-            
             # Determine reminder message based on hours
             if hours >= 24:
                 title = get_text(user_id, 'reminders.before_1d')
@@ -181,7 +158,7 @@ class RemindersTask(commands.Cog):
                     inline=False
                 )
             
-            await user.send(embed=embed)
+            await self.dispatcher.send_dm(int(booking.created_by), embed=embed)
             
             await db.log_action(
                 f'reminder_{hours}h',
@@ -191,21 +168,20 @@ class RemindersTask(commands.Cog):
             )
             
             logger.info(f"Reminder {hours}h: booking #{booking.booking_id}")
+            return True
             
         except discord.Forbidden:
             logger.warning(f"Cannot send DM to user {booking.created_by}")
+            raise
         except Exception as e:
             logger.error(f"Error sending {hours}h reminder: {e}")
+            raise
     
-    async def send_now_reminder(self, booking):
+    async def send_now_reminder(self, booking) -> bool:
         """إرسال تذكير الآن"""
         try:
-            user = await self.bot.fetch_user(int(booking.created_by))
             user_id = str(booking.created_by)
             
-            # Load user language
-            await translator.load_user_language_from_db(db, user_id)
-            
             embed = create_colored_embed(
                 "🚨 " + get_text(user_id, 'reminders.title'),
                 get_text(user_id, 'reminders.upcoming'),
@@ -247,7 +223,7 @@ class RemindersTask(commands.Cog):
                     inline=False
                 )
             
-            await user.send(embed=embed)
+            await self.dispatcher.send_dm(int(booking.created_by), embed=embed)
             
             await db.log_action(
                 'reminder_now',
@@ -257,11 +233,14 @@ class RemindersTask(commands.Cog):
             )
             
             logger.info(f"Immediate reminder: booking #{booking.booking_id}")
+            return True
             
         except discord.Forbidden:
             logger.warning(f"Cannot send DM to user {booking.created_by}")
+            raise
         except Exception as e:
             logger.error(f"Error sending immediate reminder: {e}")
+            raise
 
 async def setup(bot):
     """إعداد الـ Cog"""
@@ -66,6 +66,8 @@ async def test_db():
     except Exception as e:
         print(f"  ❌ خطأ في قاعدة البيانات: {e}")
         return False
+    finally:
+        await db.close()
 
 try:
     result = asyncio.run(test_db())
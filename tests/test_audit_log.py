@@ -0,0 +1,90 @@
+"""
+اختبارات سجل التدقيق المؤجل - Audit Log Tests
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from database.audit_log import AuditLogWriter
+
+
+class FakeDB:
+    def __init__(self, written):
+        self.written = written
+
+    async def executemany(self, sql, rows):
+        # Yield like a real write so other tasks run mid-flush
+        await asyncio.sleep(0)
+        self.written.append([row[3] for row in rows])
+
+    async def commit(self):
+        await asyncio.sleep(0)
+
+    async def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.batches = []
+
+    @asynccontextmanager
+    async def writer(self):
+        yield FakeDB(self.batches)
+
+
+def test_flush_writes_every_row_in_order():
+    pool = FakePool()
+    writer = AuditLogWriter(pool, batch_size=4, flush_interval_ms=5)
+
+    async def scenario():
+        await writer.start()
+        for i in range(30):
+            await writer.enqueue('test', str(i))
+            if i % 3 == 0:
+                await asyncio.sleep(0)
+            if i == 17:
+                # An explicit flush racing the background task
+                await writer.flush()
+        await writer.stop()
+
+    asyncio.run(scenario())
+    flat = [description for batch in pool.batches for description in batch]
+    assert flat == [str(i) for i in range(30)]
+    assert all(len(batch) <= 4 for batch in pool.batches)
+    assert writer.stats()['pending'] == 0
+    assert (writer.queued, writer.flushed, writer.dropped) == (30, 30, 0)
+
+
+def test_stop_flushes_rows_not_yet_due():
+    pool = FakePool()
+    writer = AuditLogWriter(pool, batch_size=100, flush_interval_ms=60000)
+
+    async def scenario():
+        await writer.start()
+        for i in range(5):
+            await writer.enqueue('test', str(i))
+        await asyncio.sleep(0)
+        assert pool.batches == []
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert [d for batch in pool.batches for d in batch] == ['0', '1', '2', '3', '4']
+    assert not writer.running
+
+
+def test_failed_write_counts_rows_as_dropped():
+    class BrokenPool:
+        @asynccontextmanager
+        async def writer(self):
+            raise RuntimeError('disk full')
+            yield
+
+    writer = AuditLogWriter(BrokenPool(), batch_size=10, flush_interval_ms=60000)
+
+    async def scenario():
+        await writer.start()
+        await writer.enqueue('test', 'lost')
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert (writer.flushed, writer.dropped) == (0, 1)
@@ -0,0 +1,61 @@
+"""
+اختبارات العدادات - Counter Reconciliation Tests
+"""
+import asyncio
+
+import pytest
+
+from database.db_manager import DatabaseManager
+
+
+def with_manager(tmp_path, scenario):
+    async def run():
+        manager = DatabaseManager(str(tmp_path / 'bookings.db'))
+        await manager.initialize()
+        try:
+            for i in range(3):
+                await manager.get_or_create_user(str(100 + i), f'user{i}', f'p{i}')
+            return await scenario(manager)
+        finally:
+            await manager.close()
+    return asyncio.run(run())
+
+
+async def stored_counters(manager):
+    return dict(await manager.fetchall("SELECT counter_key, value FROM counters"))
+
+
+def test_reconcile_repairs_drift_and_reports_it(tmp_path):
+    async def scenario(manager):
+        assert await manager.reconcile_counters() == {}
+        await manager.execute("UPDATE counters SET value = value + 5 WHERE counter_key = 'users'")
+        # A missing counter reads as 0, which is right while there are no alliances
+        await manager.execute("DELETE FROM counters WHERE counter_key = 'alliances'")
+        await manager.execute("INSERT INTO counters (counter_key, value) VALUES ('bookings.status.lost', 2)")
+
+        drift = await manager.reconcile_counters()
+        return drift, await stored_counters(manager), await manager.reconcile_counters()
+
+    drift, counters, again = with_manager(tmp_path, scenario)
+    assert drift == {'users': (8, 3), 'bookings.status.lost': (2, 0)}
+    assert counters['users'] == 3
+    assert 'bookings.status.lost' not in counters
+    assert again == {}
+
+
+def test_failed_rebuild_rolls_back(tmp_path, monkeypatch):
+    async def broken_rebuild(self, db, actual):
+        await db.execute("DELETE FROM counters")
+        raise RuntimeError('rebuild failed')
+
+    async def scenario(manager):
+        await manager.execute("UPDATE counters SET value = 42 WHERE counter_key = 'users'")
+        before = await stored_counters(manager)
+        monkeypatch.setattr(DatabaseManager, '_rebuild_counters', broken_rebuild)
+        with pytest.raises(RuntimeError, match='rebuild failed'):
+            await manager.reconcile_counters()
+        return before, await stored_counters(manager)
+
+    before, after = with_manager(tmp_path, scenario)
+    assert before['users'] == 42
+    assert after == before
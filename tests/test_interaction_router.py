@@ -0,0 +1,141 @@
+"""
+اختبارات موجّه التفاعلات - Interaction Router Tests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils.interaction_router import InteractionRouter, safe_send
+
+
+async def handler(interaction, remainder=None):
+    pass
+
+
+def test_exact_route_wins_over_prefix():
+    router = InteractionRouter(None)
+    exact = router.add_route('booking_cancel', handler)
+    prefix = router.add_route('booking_', handler, prefix=True)
+
+    assert router.resolve('booking_cancel') == (exact, '')
+    assert router.resolve('booking_cancel_7') == (prefix, 'cancel_7')
+
+
+def test_longest_prefix_wins_and_remainder_is_the_rest():
+    router = InteractionRouter(None)
+    short = router.add_route('admin_', handler, prefix=True)
+    long = router.add_route('admin_perm_', handler, prefix=True)
+
+    assert router.resolve('admin_perm_grant_42') == (long, 'grant_42')
+    assert router.resolve('admin_per') == (short, 'per')
+    assert router.resolve('admin_') == (short, '')
+    assert router.resolve('adm') is None
+    assert router.resolve('') is None
+
+
+def test_remove_routes_drops_only_that_owner():
+    router = InteractionRouter(None)
+    first, second = object(), object()
+    router.add_route('a_', handler, prefix=True, owner=first)
+    router.add_route('a_b', handler, owner=first)
+    kept = router.add_route('a_b_', handler, prefix=True, owner=second)
+    kept_exact = router.add_route('x', handler, owner=second)
+
+    router.remove_routes(first)
+
+    assert router.resolve('a_b') is None
+    assert router.resolve('a_c') is None
+    assert router.resolve('a_b_1') == (kept, '1')
+    assert router.resolve('x') == (kept_exact, '')
+    assert set(router.routes()) == {kept, kept_exact}
+
+
+class FakeResponse:
+    """يرفض الرد الثاني كما يفعل Discord"""
+
+    def __init__(self, log):
+        self.log = log
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self, kind):
+        if self._done:
+            raise AssertionError(f'{kind} after the interaction was already answered')
+        # The HTTP round trip: the other side may run meanwhile
+        await asyncio.sleep(0)
+        self._done = True
+        self.log.append(kind)
+
+    async def defer(self, **kwargs):
+        await self._respond('defer')
+
+    async def send_message(self, **kwargs):
+        await self._respond('send')
+
+
+class FakeFollowup:
+    def __init__(self, log):
+        self.log = log
+
+    async def send(self, **kwargs):
+        self.log.append('followup')
+
+
+class FakeInteraction:
+    def __init__(self, custom_id):
+        self.log = []
+        self.type = discord.InteractionType.component
+        self.data = {'custom_id': custom_id}
+        self.user = SimpleNamespace(id=1)
+        self.extras = {}
+        self.response = FakeResponse(self.log)
+        self.followup = FakeFollowup(self.log)
+
+
+def test_auto_defer_racing_a_handler_that_responds_itself():
+    budget = 0.01
+    router = InteractionRouter(None, defer_budget=budget)
+
+    async def respond_late(interaction):
+        await asyncio.sleep(interaction.delay)
+        await safe_send(interaction, content='done')
+
+    route = router.add_route('race', respond_late, language=False)
+
+    async def scenario():
+        outcomes = []
+        # Delays straddling the budget so both orders happen
+        for i in range(40):
+            interaction = FakeInteraction('race')
+            interaction.delay = budget * (0.2 + 2.8 * i / 40)
+            assert await router.dispatch(interaction)
+            outcomes.append(interaction.log)
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert all(log in (['send'], ['defer', 'followup']) for log in outcomes)
+    deferred = sum(log[0] == 'defer' for log in outcomes)
+    assert route.defers == deferred
+    assert 0 < deferred < len(outcomes)
+
+
+def test_fast_handler_is_never_deferred():
+    router = InteractionRouter(None, defer_budget=0.01)
+
+    async def respond(interaction):
+        await safe_send(interaction, content='done')
+
+    route = router.add_route('fast', respond, language=False)
+    interaction = FakeInteraction('fast')
+
+    async def scenario():
+        await router.dispatch(interaction)
+        # Give a leaked watchdog the chance to fire
+        await asyncio.sleep(0.03)
+
+    asyncio.run(scenario())
+    assert interaction.log == ['send']
+    assert route.defers == 0
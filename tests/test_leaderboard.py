@@ -0,0 +1,55 @@
+"""
+اختبارات لوحة الصدارة - Leaderboard Tests
+"""
+import random
+
+from database.leaderboard import Leaderboard
+
+
+def expected_order(scores):
+    return sorted(scores, key=lambda user_id: (-scores[user_id][0], -scores[user_id][1], user_id))
+
+
+def assert_matches(board, scores):
+    order = expected_order(scores)
+    assert len(board) == len(order)
+    assert board.top(len(order) + 5) == order
+    for rank, user_id in enumerate(order, start=1):
+        assert board.rank(user_id) == rank
+    for user_id in random.sample(order, min(20, len(order))):
+        rank = order.index(user_id) + 1
+        start = max(1, rank - 2)
+        assert board.around(user_id, 2) == [(r, order[r - 1]) for r in range(start, min(len(order), rank + 2) + 1)]
+
+
+def test_load_matches_sorted():
+    random.seed(19)
+    scores = {user_id: (random.randint(0, 50), random.randint(0, 5)) for user_id in range(1, 301)}
+    board = Leaderboard()
+    board.load([(user_id, points, completed) for user_id, (points, completed) in scores.items()])
+    assert_matches(board, scores)
+    assert board.top(3) == expected_order(scores)[:3]
+
+
+def test_updates_and_removals_match_sorted():
+    random.seed(20)
+    board = Leaderboard()
+    scores = {}
+    for step in range(2000):
+        user_id = random.randint(1, 200)
+        if step % 7 == 0 and user_id in scores:
+            board.remove(user_id)
+            del scores[user_id]
+        else:
+            scores[user_id] = (random.randint(0, 30), random.randint(0, 3))
+            board.update(user_id, *scores[user_id])
+    assert_matches(board, scores)
+
+
+def test_unknown_user():
+    board = Leaderboard()
+    board.load([(1, 10, 0)])
+    assert board.rank(2) is None
+    assert board.around(2) == []
+    board.remove(2)
+    assert board.top(5) == [1]
@@ -0,0 +1,66 @@
+"""
+اختبارات المقاييس - Metrics Tests
+"""
+import math
+import random
+
+import pytest
+
+from utils.metrics import Histogram
+
+
+def micros(seconds):
+    return max(0, int(seconds * 1_000_000))
+
+
+def exact_percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_percentiles_are_within_bucket_error_of_exact(seed):
+    rng = random.Random(seed)
+    # Long-tailed latencies from microseconds to tens of seconds
+    samples = [rng.lognormvariate(-5, 2.5) for _ in range(rng.randint(1, 3000))]
+    histogram = Histogram()
+    for seconds in samples:
+        histogram.record(seconds)
+
+    values = [micros(s) for s in samples]
+    for p in (0, 1, 25, 50, 90, 95, 99, 99.9, 100):
+        exact = exact_percentile(values, p)
+        got = histogram.percentile(p) * 1000
+        # Never below the exact value, and at most one sub-bucket (1/32) above it
+        assert exact <= got <= exact * (1 + 1 / 32) + 1, (p, exact, got)
+
+    assert histogram.count == len(samples)
+    assert histogram.min == min(values)
+    assert histogram.max == max(values)
+    assert histogram.percentile(100) * 1000 == pytest.approx(max(values))
+
+
+def test_merge_matches_recording_everything_in_one():
+    rng = random.Random(7)
+    samples = [rng.expovariate(20) for _ in range(1000)]
+    left, right, whole = Histogram(), Histogram(), Histogram()
+    for i, seconds in enumerate(samples):
+        (left if i % 3 else right).record(seconds)
+        whole.record(seconds)
+
+    left.merge(right)
+    assert left.counts == whole.counts
+    assert (left.count, left.total, left.min, left.max) == (whole.count, whole.total, whole.min, whole.max)
+    assert left.summary() == whole.summary()
+
+
+def test_merge_into_empty_and_empty_summary():
+    empty = Histogram()
+    assert empty.percentile(50) == 0.0
+    assert empty.summary()['count'] == 0
+
+    other = Histogram()
+    other.record(0.25)
+    empty.merge(other)
+    assert (empty.min, empty.max, empty.count) == (250_000, 250_000, 1)
+    assert empty.percentile(50) == 250.0
@@ -0,0 +1,196 @@
+"""
+اختبارات الترقيات - Migration Tests
+"""
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from config import config
+from database.db_manager import DatabaseManager
+from database.migrator import Migration, MigrationRunner
+from database.pool import ConnectionPool
+
+# Tables as created by the bot before the migration runner existed
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    discord_id TEXT UNIQUE NOT NULL,
+    username TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    alliance_id INTEGER,
+    alliance_rank TEXT DEFAULT 'R1',
+    points INTEGER DEFAULT 0,
+    total_bookings INTEGER DEFAULT 0,
+    completed_bookings INTEGER DEFAULT 0,
+    cancelled_bookings INTEGER DEFAULT 0,
+    last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE bookings (
+    booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    booking_type TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    alliance_name TEXT NOT NULL,
+    scheduled_time TIMESTAMP NOT NULL,
+    duration_days INTEGER DEFAULT 1,
+    details TEXT,
+    status TEXT DEFAULT 'active',
+    reminder_24h_sent BOOLEAN DEFAULT 0,
+    reminder_1h_sent BOOLEAN DEFAULT 0,
+    reminder_now_sent BOOLEAN DEFAULT 0,
+    completed_at TIMESTAMP,
+    cancelled_at TIMESTAMP,
+    cancellation_reason TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_by TEXT NOT NULL
+);
+CREATE TABLE alliances (
+    alliance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    description TEXT,
+    leader_id INTEGER NOT NULL,
+    member_count INTEGER DEFAULT 1,
+    total_bookings INTEGER DEFAULT 0,
+    total_points INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE logs (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action_type TEXT NOT NULL,
+    user_id TEXT,
+    booking_id INTEGER,
+    description TEXT NOT NULL,
+    details TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_bookings_status_time ON bookings(status, scheduled_time);
+"""
+
+
+def local_time(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    path = tmp_path / 'bookings.db'
+    future = datetime.now(pytz.timezone(config.TIMEZONE)).replace(tzinfo=None, microsecond=0) + timedelta(days=3)
+    past = future - timedelta(days=30)
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany(
+            "INSERT INTO users (discord_id, username, player_id, points) VALUES (?, ?, ?, ?)",
+            [('100', 'first', 'p1', 10), ('200', 'second', 'p2', 30)]
+        )
+        conn.execute("INSERT INTO alliances (name, leader_id) VALUES ('Frost Wolves', 1)")
+        conn.executemany(
+            """INSERT INTO bookings (user_id, booking_type, player_name, player_id, alliance_name,
+                                     scheduled_time, status, reminder_24h_sent, created_by)
+               VALUES (?, ?, 'p', 'p', 'FW', ?, ?, ?, '100')""",
+            [(1, 'building', local_time(future), 'active', 1),
+             (1, 'research', local_time(past), 'completed', 0),
+             (2, 'training', local_time(past), 'cancelled', 0)]
+        )
+        conn.execute("INSERT INTO logs (action_type, description, created_at) VALUES ('x', 'y', '2024-01-02 03:04:05')")
+
+    manager = DatabaseManager(str(path))
+
+    async def upgrade():
+        try:
+            await manager.initialize()
+            # A second start finds nothing to do
+            runner = MigrationRunner(manager.pool, manager._migrations())
+            assert await runner.run() == []
+            return runner.latest, await manager.reconcile_counters()
+        finally:
+            await manager.close()
+
+    latest, drift = asyncio.run(upgrade())
+    assert drift == {}
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] == latest
+        assert conn.execute("SELECT COUNT(*) FROM migration_progress").fetchone()[0] == 0
+        assert [row[0] for row in conn.execute("SELECT language FROM users")] == ['en', 'en']
+        assert conn.execute("SELECT tag FROM alliances").fetchone()[0] == 'FRO'
+
+        expected_ts = int(pytz.timezone(config.TIMEZONE).localize(future).timestamp())
+        assert conn.execute(
+            "SELECT scheduled_ts, scheduled_end_ts FROM bookings WHERE booking_id = 1"
+        ).fetchone() == (expected_ts, expected_ts + 86400)
+        assert conn.execute("SELECT COUNT(*) FROM bookings WHERE scheduled_ts IS NULL").fetchone()[0] == 0
+        assert conn.execute("SELECT created_ts FROM logs").fetchone()[0] == 1704164645
+
+        # Only the active booking gets an outbox, and the flag it already sent is carried over
+        outbox = dict(conn.execute(
+            "SELECT offset_hours, status FROM reminder_outbox WHERE booking_id = 1"
+        ).fetchall())
+        assert outbox == {hours: 'sent' if hours == 24 else 'pending' for hours in config.REMINDER_OFFSETS_HOURS}
+        assert conn.execute("SELECT COUNT(*) FROM reminder_outbox WHERE booking_id != 1").fetchone()[0] == 0
+
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_bookings_type_status_ts' in indexes
+        assert 'idx_bookings_status_time' not in indexes
+
+
+def test_interrupted_backfill_resumes_from_its_cursor(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'resume.db'), readers=1)
+    seen = []
+    crash_after = [2]
+
+    async def create_items(db):
+        await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, done INTEGER DEFAULT 0)")
+        await db.executemany("INSERT INTO items (id) VALUES (?)", [(i,) for i in range(1, 11)])
+
+    async def mark_done(db, after_id, chunk_size):
+        if crash_after[0] == 0:
+            raise RuntimeError('interrupted')
+        crash_after[0] -= 1
+        rows = await db.execute_fetchall(
+            "SELECT id FROM items WHERE id > ? ORDER BY id LIMIT ?", (after_id, chunk_size)
+        )
+        if not rows:
+            return None
+        seen.append(after_id)
+        await db.execute("UPDATE items SET done = done + 1 WHERE id > ? AND id <= ?", (after_id, rows[-1][0]))
+        return rows[-1][0], len(rows)
+
+    async def count_after(db, after_id):
+        return (await db.execute_fetchall("SELECT COUNT(*) FROM items WHERE id > ?", (after_id,)))[0][0]
+
+    migrations = [
+        Migration(1, 'items', apply=create_items),
+        Migration(2, 'mark_done', backfill=mark_done, total=count_after),
+    ]
+
+    async def run():
+        await pool.open()
+        try:
+            runner = MigrationRunner(pool, migrations, chunk_size=3)
+            with pytest.raises(RuntimeError):
+                await runner.run()
+            async with pool.reader() as db:
+                progress = await db.execute_fetchall("SELECT version, cursor, processed FROM migration_progress")
+                version = await MigrationRunner.current_version(db)
+            assert (version, progress) == (1, [(2, 6, 6)])
+
+            crash_after[0] = 100
+            assert await runner.run() == [2]
+            async with pool.reader() as db:
+                done = await db.execute_fetchall("SELECT DISTINCT done FROM items")
+                progress = await db.execute_fetchall("SELECT * FROM migration_progress")
+                version = await MigrationRunner.current_version(db)
+            return done, progress, version
+        finally:
+            await pool.close()
+
+    done, progress, version = asyncio.run(run())
+    # The two committed chunks are not redone: every row is updated exactly once
+    assert seen == [0, 3, 6, 9]
+    assert (done, progress, version) == ([(1,)], [], 2)
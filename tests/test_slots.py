@@ -0,0 +1,128 @@
+"""
+اختبارات محرك الفترات - Slot Engine Tests
+"""
+import random
+
+import pytest
+
+from config import config
+from database.slots import DAY_SECONDS, SlotConflictError, SlotEngine, SlotTimeline
+
+T0 = 1_700_000_000
+
+
+def test_default_capacity_is_unlimited():
+    assert set(config.SLOT_CAPACITY) == {'building', 'research', 'training'}
+    engine = SlotEngine({})
+    for booking_id in range(1, 51):
+        engine.check('building', T0, 1)
+        engine.add(booking_id, 'building', T0, 1)
+    assert engine.timeline('building').peak(T0, T0 + DAY_SECONDS) == 50
+    assert engine.find_free('building', T0, 1, limit=1) == [(T0, T0 + DAY_SECONDS)]
+
+
+def test_capacity_limits_concurrent_bookings_per_type():
+    engine = SlotEngine({'building': 2})
+    engine.add(1, 'building', T0, 1)
+    engine.add(2, 'building', T0 + 3600, 1)
+    with pytest.raises(SlotConflictError) as conflict:
+        engine.check('building', T0 + 7200, 1)
+    assert (conflict.value.capacity, conflict.value.peak) == (2, 2)
+    # Other types have their own timeline
+    engine.check('research', T0, 1)
+
+    engine.release(1)
+    engine.check('building', T0 + 7200, 1)
+
+
+def test_duration_rounds_to_whole_days():
+    engine = SlotEngine({'training': 1})
+    engine.add(1, 'training', T0, 0)
+    with pytest.raises(SlotConflictError):
+        engine.check('training', T0 + DAY_SECONDS - 1, 1)
+    engine.check('training', T0 + DAY_SECONDS, 1)
+
+    engine.add(2, 'training', T0 + 2 * DAY_SECONDS, 3)
+    with pytest.raises(SlotConflictError):
+        engine.check('training', T0 + 4 * DAY_SECONDS, 1)
+    engine.check('training', T0 + 5 * DAY_SECONDS, 1)
+
+
+def test_unlimited_timeline_has_no_full_runs():
+    timeline = SlotTimeline(0)
+    timeline.add(1, T0, T0 + 10)
+    timeline.add(2, T0, T0 + 10)
+    assert timeline.fits(T0, T0 + 10)
+    assert timeline.free_windows(T0, 10, 2, T0 + 100) == [(T0, T0 + 10), (T0 + 10, T0 + 20)]
+
+
+def random_timeline(seed, capacity, bookings=40, horizon=200):
+    rng = random.Random(seed)
+    timeline = SlotTimeline(capacity)
+    intervals = {}
+    for booking_id in range(1, bookings + 1):
+        start = rng.randrange(horizon)
+        intervals[booking_id] = (start, start + rng.randint(1, 30))
+        timeline.add(booking_id, *intervals[booking_id])
+    # Removals merge boundaries away, which the queries must cope with
+    for booking_id in rng.sample(sorted(intervals), bookings // 3):
+        timeline.remove(booking_id)
+        del intervals[booking_id]
+    return timeline, intervals
+
+
+def brute_peak(intervals, start, end):
+    return max(sum(1 for s, e in intervals.values() if s <= t < e) for t in range(start, end))
+
+
+def test_peak_matches_brute_force():
+    for seed in range(20):
+        rng = random.Random(seed)
+        timeline, intervals = random_timeline(seed, capacity=2)
+        for _ in range(50):
+            start = rng.randrange(-10, 240)
+            end = start + rng.randint(1, 40)
+            assert timeline.peak(start, end) == brute_peak(intervals, start, end)
+            assert timeline.fits(start, end) == (brute_peak(intervals, start, end) < 2)
+
+
+def brute_free_windows(intervals, capacity, after, duration, limit, until):
+    windows = []
+    candidate = after
+    while len(windows) < limit:
+        start = next(
+            (s for s in range(candidate, until - duration + 1)
+             if brute_peak(intervals, s, s + duration) < capacity),
+            None
+        )
+        if start is None:
+            break
+        windows.append((start, start + duration))
+        candidate = start + duration
+    return windows
+
+
+def test_free_windows_match_brute_force():
+    for seed in range(20):
+        rng = random.Random(seed)
+        capacity = rng.randint(1, 3)
+        timeline, intervals = random_timeline(seed, capacity)
+        for _ in range(20):
+            after = rng.randrange(-10, 220)
+            duration = rng.randint(1, 25)
+            expected = brute_free_windows(intervals, capacity, after, duration, 4, 260)
+            assert timeline.free_windows(after, duration, 4, 260) == expected
+
+
+def test_free_windows_skip_blocks_of_short_gaps():
+    timeline = SlotTimeline(1)
+    intervals = {}
+    # 300 full runs with one-second gaps, then a gap long enough at 1000
+    for booking_id in range(300):
+        intervals[booking_id] = (booking_id * 3, booking_id * 3 + 2)
+        timeline.add(booking_id, *intervals[booking_id])
+    intervals[300] = (1000, 1001)
+    timeline.add(300, 1000, 1001)
+    expected = brute_free_windows(intervals, 1, 0, 5, 3, 1100)
+    assert expected[0] == (899, 904)
+    assert timeline.free_windows(0, 5, 3, 1100) == expected
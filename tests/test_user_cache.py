@@ -0,0 +1,133 @@
+"""
+اختبارات ذاكرة المستخدمين - User Cache Tests
+"""
+import asyncio
+
+import pytest
+
+from database import user_cache
+from database.models import User
+from database.user_cache import UserCache
+
+
+class Loader:
+    """يحمّل مستخدمين وهميين ويحصي الاستدعاءات"""
+
+    def __init__(self, gate: asyncio.Event = None):
+        self.calls = []
+        self.gate = gate
+
+    async def __call__(self, discord_id):
+        self.calls.append(discord_id)
+        if self.gate is not None:
+            await self.gate.wait()
+        return User(user_id=int(discord_id), discord_id=discord_id, username=f'u{discord_id}', player_id='p')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    loader = Loader()
+    cache = UserCache(loader, ttl=10)
+
+    async def scenario():
+        await cache.get('1')
+        clock[0] += 9
+        await cache.get('1')
+        clock[0] += 2
+        await cache.get('1')
+
+    asyncio.run(scenario())
+    assert loader.calls == ['1', '1']
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    loader = Loader()
+    cache = UserCache(loader, max_size=2)
+
+    async def scenario():
+        await cache.get('1')
+        await cache.get('2')
+        await cache.get('1')  # 2 is now the oldest
+        await cache.get('3')
+        await cache.get('1')
+        await cache.get('2')
+
+    asyncio.run(scenario())
+    assert loader.calls == ['1', '2', '3', '2']
+    assert cache.evictions == 2
+    assert len(cache) == 2
+    assert cache.discord_id_for(3) is None
+
+
+def test_concurrent_gets_share_one_load():
+    async def scenario():
+        loader = Loader(asyncio.Event())
+        cache = UserCache(loader)
+        waiters = [asyncio.create_task(cache.get('7')) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.gate.set()
+        users = await asyncio.gather(*waiters)
+        return loader, cache, users
+
+    loader, cache, users = asyncio.run(scenario())
+    assert loader.calls == ['7']
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    assert all(user.username == 'u7' for user in users)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        loader = Loader(asyncio.Event())
+        cache = UserCache(loader)
+        first = asyncio.create_task(cache.get('7'))
+        second = asyncio.create_task(cache.get('7'))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        loader.gate.set()
+        user = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return loader, cache, user
+
+    loader, cache, user = asyncio.run(scenario())
+    assert user.discord_id == '7'
+    assert loader.calls == ['7']
+    assert len(cache) == 1
+
+
+def test_returned_users_are_independent_copies():
+    cache = UserCache(Loader())
+
+    async def scenario():
+        first = await cache.get('1')
+        first.points = 999
+        return await cache.get('1'), await cache.get('1')
+
+    second, third = asyncio.run(scenario())
+    assert second.points == 0
+    assert second is not third
+
+
+def test_invalidation_during_load_is_not_cached():
+    async def scenario():
+        loader = Loader(asyncio.Event())
+        cache = UserCache(loader)
+        pending = asyncio.create_task(cache.get('5'))
+        await asyncio.sleep(0)
+        cache.invalidate('5')
+        loader.gate.set()
+        user = await pending
+        return cache, user
+
+    cache, user = asyncio.run(scenario())
+    assert user.discord_id == '5'
+    assert len(cache) == 0
+    assert cache.invalidations == 1
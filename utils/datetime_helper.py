@@ -74,6 +74,14 @@ class DateTimeHelper:
         # إرسال إذا كان الوقت المتبقي بين -5 و +5 دقائق
         return timedelta(minutes=-5) <= time_until <= timedelta(minutes=5)
     
+    @staticmethod
+    def to_timestamp(dt: datetime) -> float:
+        """تحويل الوقت إلى ثوانٍ منذ epoch (الوقت بدون منطقة يُعتبر بتوقيت الإعدادات)"""
+        if dt.tzinfo is None:
+            tz = pytz.timezone(config.TIMEZONE)
+            dt = tz.localize(dt)
+        return dt.timestamp()
+    
     @staticmethod
     def get_today_range() -> tuple:
         """الحصول على نطاق اليوم"""
@@ -109,3 +117,7 @@ def is_past(dt):
 def get_time_until(dt):
     """Get time remaining until datetime"""
     return DateTimeHelper.get_time_until(dt)
+
+def to_timestamp(dt):
+    """Convert datetime to epoch seconds"""
+    return DateTimeHelper.to_timestamp(dt)
@@ -0,0 +1,227 @@
+"""
+موجّه التفاعلات - Interaction Router
+Single on_interaction dispatcher: custom_id -> handler via exact dict
+lookup or longest-prefix trie, with per-route middleware, auto-defer and timing
+"""
+import asyncio
+import discord
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.translator import translator, get_text
+from utils.metrics import metrics, RequestTiming, current_request
+
+logger = logging.getLogger('router')
+
+Handler = Callable[..., Awaitable[Any]]
+Check = Callable[[discord.Interaction], Any]
+
+
+def response_lock(interaction: discord.Interaction) -> asyncio.Lock:
+    """قفل الرد الأول على التفاعل، مشترك بين المعالج والتأجيل التلقائي"""
+    lock = interaction.extras.get('response_lock')
+    if lock is None:
+        lock = interaction.extras['response_lock'] = asyncio.Lock()
+    return lock
+
+
+async def safe_send(interaction: discord.Interaction, **kwargs):
+    """إرسال رد، أو followup إذا تم الرد/التأجيل مسبقاً"""
+    async with response_lock(interaction):
+        if not interaction.response.is_done():
+            return await interaction.response.send_message(**kwargs)
+    return await interaction.followup.send(**kwargs)
+
+
+async def safe_edit(interaction: discord.Interaction, **kwargs):
+    """تعديل رسالة التفاعل، عبر edit_original_response إذا تم الرد/التأجيل مسبقاً"""
+    async with response_lock(interaction):
+        if not interaction.response.is_done():
+            return await interaction.response.edit_message(**kwargs)
+    return await interaction.edit_original_response(**kwargs)
+
+
+class Route:
+    """مسار زر واحد مع إعدادات الوسيط الخاصة به"""
+
+    __slots__ = ('pattern', 'handler', 'prefix', 'owner', 'check', 'deny_key', 'language', 'auto_defer',
+                 'denied', 'defers')
+
+    def __init__(self, pattern: str, handler: Handler, prefix: bool = False, owner: Any = None,
+                 check: Optional[Check] = None, deny_key: str = 'admin.no_permission',
+                 language: bool = True, auto_defer: bool = True):
+        self.pattern = pattern
+        self.handler = handler
+        self.prefix = prefix
+        self.owner = owner
+        self.check = check
+        self.deny_key = deny_key
+        self.language = language
+        self.auto_defer = auto_defer
+
+        # Middleware counters; calls, errors and latency live in metrics
+        self.denied = 0
+        self.defers = 0
+
+    @property
+    def name(self) -> str:
+        return f'{self.pattern}*' if self.prefix else self.pattern
+
+    def stats(self) -> Dict[str, Any]:
+        observed = metrics.routes.get(self.name)
+        data = observed.to_dict() if observed is not None else {'calls': 0, 'errors': 0}
+        data['denied'] = self.denied
+        data['defers'] = self.defers
+        return data
+
+
+class _TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.route: Optional[Route] = None
+
+
+class InteractionRouter:
+    """موجّه مركزي لأزرار المكونات"""
+
+    def __init__(self, db_manager, defer_budget: float = 1.5):
+        # Used by the language middleware
+        self.db = db_manager
+        # Seconds a handler may run before the router defers the response for it
+        self.defer_budget = defer_budget
+        self._exact: Dict[str, Route] = {}
+        self._prefixes: Dict[str, Route] = {}
+        self._trie = _TrieNode()
+
+        self.unrouted = 0
+
+    def add_route(self, pattern: str, handler: Handler, *, prefix: bool = False, owner: Any = None,
+                  check: Optional[Check] = None, deny_key: str = 'admin.no_permission',
+                  language: bool = True, auto_defer: bool = True) -> Route:
+        """
+        تسجيل مسار
+
+        المسار الدقيق يستدعي handler(interaction)،
+        ومسار البادئة يستدعي handler(interaction, remainder) حيث remainder ما بعد البادئة.
+        يجب تعطيل auto_defer للمسارات التي ترد بنافذة (modal)، إذ لا يمكن فتحها بعد التأجيل
+        """
+        route = Route(pattern, handler, prefix, owner, check, deny_key, language, auto_defer)
+        table = self._prefixes if prefix else self._exact
+        if pattern in table:
+            logger.warning(f"⚠️ Route {route.name} registered twice, replacing")
+        table[pattern] = route
+        if prefix:
+            self._insert(route)
+        return route
+
+    def remove_routes(self, owner: Any):
+        """إزالة كل مسارات مالك معيّن (عند إلغاء تحميل الـ Cog)"""
+        self._exact = {p: r for p, r in self._exact.items() if r.owner is not owner}
+        self._prefixes = {p: r for p, r in self._prefixes.items() if r.owner is not owner}
+        self._trie = _TrieNode()
+        for route in self._prefixes.values():
+            self._insert(route)
+
+    def _insert(self, route: Route):
+        node = self._trie
+        for char in route.pattern:
+            node = node.children.setdefault(char, _TrieNode())
+        node.route = route
+
+    def resolve(self, custom_id: str) -> Optional[Tuple[Route, str]]:
+        """إيجاد المسار: تطابق دقيق أولاً ثم أطول بادئة"""
+        route = self._exact.get(custom_id)
+        if route is not None:
+            return route, ''
+
+        node = self._trie
+        match: Optional[Route] = None
+        for char in custom_id:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                match = node.route
+        if match is None:
+            return None
+        return match, custom_id[len(match.pattern):]
+
+    async def dispatch(self, interaction: discord.Interaction) -> bool:
+        """توجيه تفاعل مكوّن إلى معالجه، وإرجاع True إذا وُجد مسار"""
+        if interaction.type != discord.InteractionType.component:
+            return False
+
+        custom_id = (interaction.data or {}).get('custom_id', '')
+        resolved = self.resolve(custom_id)
+        if resolved is None:
+            self.unrouted += 1
+            return False
+
+        route, remainder = resolved
+        # Set before the watchdog starts so its defer counts as this request's HTTP time
+        timing = RequestTiming()
+        token = current_request.set(timing)
+        watchdog = None
+        if route.auto_defer and self.defer_budget > 0:
+            watchdog = asyncio.create_task(self._defer_after(route, interaction))
+        failed = False
+        try:
+            await self._run(route, interaction, remainder)
+        except Exception as e:
+            failed = True
+            logger.error(f"❌ Error handling {custom_id} ({route.name}): {e}", exc_info=e)
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            metrics.observe(route.name, timing, failed)
+            current_request.reset(token)
+        return True
+
+    async def _defer_after(self, route: Route, interaction: discord.Interaction):
+        """تأجيل الرد إذا لم يرد المعالج خلال الميزانية المحددة"""
+        await asyncio.sleep(self.defer_budget)
+        async with response_lock(interaction):
+            if interaction.response.is_done():
+                return
+            try:
+                await interaction.response.defer()
+            except discord.HTTPException as e:
+                logger.warning(f"⚠️ Auto-defer failed for {route.name}: {e}")
+                return
+        route.defers += 1
+        logger.debug(f"Auto-deferred {route.name} after {self.defer_budget:.2f}s")
+
+    async def _run(self, route: Route, interaction: discord.Interaction, remainder: str):
+        user_id = str(interaction.user.id)
+
+        # Middleware: request language
+        if route.language:
+            await translator.load_user_language_from_db(self.db, user_id)
+
+        # Middleware: permission check
+        if route.check is not None:
+            allowed = route.check(interaction)
+            if hasattr(allowed, '__await__'):
+                allowed = await allowed
+            if not allowed:
+                route.denied += 1
+                await self._deny(interaction, get_text(user_id, route.deny_key))
+                return
+
+        if route.prefix:
+            await route.handler(interaction, remainder)
+        else:
+            await route.handler(interaction)
+
+    @staticmethod
+    async def _deny(interaction: discord.Interaction, content: str):
+        await safe_send(interaction, content=content, ephemeral=True)
+
+    def routes(self) -> List[Route]:
+        return list(self._exact.values()) + list(self._prefixes.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """توقيت كل مسار من metrics مع عدادات الوسيط"""
+        return {route.name: route.stats() for route in self.routes()}
@@ -0,0 +1,275 @@
+"""
+مقاييس الأداء - Performance Metrics
+HDR-style latency histograms per button route and slash command:
+handler latency, time to first response, DB time and wait, Discord HTTP time and errors
+"""
+import json
+import logging
+import math
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import discord
+from discord import app_commands
+
+logger = logging.getLogger('metrics')
+
+# Interaction callback endpoint: the first response to an interaction goes here
+CALLBACK_SUFFIX = '/callback'
+
+
+class Histogram:
+    """
+    مدرج تكراري لوغاريتمي-خطي على نمط HDR
+
+    القيم بالميكروثانية، وكل قوة للعدد 2 مقسّمة إلى 32 دلواً فرعياً،
+    فالخطأ النسبي لأي نسبة مئوية لا يتجاوز ~3% مع ذاكرة ثابتة تقريباً
+    """
+
+    SUB_BUCKET_BITS = 6
+    SUB_BUCKET_MASK = (1 << SUB_BUCKET_BITS) - 1
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        shift = max(0, value.bit_length() - cls.SUB_BUCKET_BITS)
+        return (shift << cls.SUB_BUCKET_BITS) + (value >> shift)
+
+    @classmethod
+    def _upper(cls, index: int) -> int:
+        shift = index >> cls.SUB_BUCKET_BITS
+        sub = index & cls.SUB_BUCKET_MASK
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        self.max = max(self.max, value)
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        if other.count and (not self.count or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, p: float) -> float:
+        """النسبة المئوية بالمللي ثانية"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper(index), self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'min_ms': round(self.min / 1000, 3),
+            'mean_ms': round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max / 1000, 3),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.summary()
+        data['buckets'] = {str(self._upper(i)): c for i, c in sorted(self.counts.items())}
+        return data
+
+
+class RequestTiming:
+    """توقيت طلب واحد، تملؤه المقاييس الفرعية عبر current_request"""
+
+    __slots__ = ('started', 'db_time', 'db_wait', 'db_calls', 'http_time', 'http_calls', 'first_response')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_wait = 0.0
+        self.db_calls = 0
+        self.http_time = 0.0
+        self.http_calls = 0
+        self.first_response: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+current_request: ContextVar[Optional[RequestTiming]] = ContextVar('current_request', default=None)
+
+
+def record_db_time(seconds: float, waited: float = 0.0):
+    """إضافة زمن استخدام اتصال قاعدة البيانات وزمن انتظاره إلى الطلب الحالي (خطاف مجمع الاتصالات)"""
+    timing = current_request.get()
+    if timing is not None:
+        timing.db_time += seconds
+        timing.db_wait += waited
+        timing.db_calls += 1
+
+
+def record_http_time(seconds: float, first_response: bool = False):
+    """إضافة زمن طلب HTTP إلى الطلب الحالي"""
+    timing = current_request.get()
+    if timing is None:
+        return
+    timing.http_time += seconds
+    timing.http_calls += 1
+    if first_response and timing.first_response is None:
+        timing.first_response = time.perf_counter() - timing.started
+
+
+class RouteMetrics:
+    """مقاييس مسار واحد"""
+
+    __slots__ = ('latency', 'first_response', 'db', 'db_wait', 'http', 'calls', 'errors')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.first_response = Histogram()
+        self.db = Histogram()
+        self.db_wait = Histogram()
+        self.http = Histogram()
+        self.calls = 0
+        self.errors = 0
+
+    def observe(self, timing: RequestTiming, elapsed: float, error: bool):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.latency.record(elapsed)
+        if timing.first_response is not None:
+            self.first_response.record(timing.first_response)
+        self.db.record(timing.db_time)
+        self.db_wait.record(timing.db_wait)
+        self.http.record(timing.http_time)
+
+    def to_dict(self, buckets: bool = False) -> Dict[str, Any]:
+        view = Histogram.to_dict if buckets else Histogram.summary
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'latency': view(self.latency),
+            'first_response': view(self.first_response),
+            'db': view(self.db),
+            'db_wait': view(self.db_wait),
+            'http': view(self.http),
+        }
+
+
+class MetricsRegistry:
+    """سجل المقاييس لكل مسار أزرار وأمر سلاش"""
+
+    def __init__(self):
+        self.routes: Dict[str, RouteMetrics] = {}
+        self.since = datetime.now(timezone.utc)
+
+    def observe(self, name: str, timing: RequestTiming, error: bool = False):
+        """تسجيل طلب منتهٍ"""
+        route = self.routes.get(name)
+        if route is None:
+            route = self.routes[name] = RouteMetrics()
+        route.observe(timing, timing.elapsed, error)
+
+    def top(self, limit: int = 5, metric: str = 'latency', percentile: float = 95) -> List[tuple]:
+        """أبطأ المسارات حسب نسبة مئوية"""
+        ranked = sorted(
+            self.routes.items(),
+            key=lambda item: getattr(item[1], metric).percentile(percentile),
+            reverse=True
+        )
+        return ranked[:limit]
+
+    def snapshot(self, buckets: bool = False) -> Dict[str, Any]:
+        return {
+            'since': self.since.isoformat(),
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'routes': {name: route.to_dict(buckets) for name, route in sorted(self.routes.items())},
+        }
+
+    def dump(self, path: str) -> str:
+        """كتابة المقاييس كاملة (مع الدلاء) إلى ملف JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(buckets=True), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"📈 Metrics dumped to {path} ({len(self.routes)} routes)")
+        return path
+
+    def reset(self):
+        self.routes.clear()
+        self.since = datetime.now(timezone.utc)
+
+
+metrics = MetricsRegistry()
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """تتبع طلبات HTTP الخاصة بـ discord.py ونسبتها إلى الطلب الحالي"""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        is_callback = params.url.path.endswith(CALLBACK_SUFFIX)
+        record_http_time(time.perf_counter() - context.started, first_response=is_callback)
+
+    async def on_request_exception(session, context, params):
+        record_http_time(time.perf_counter() - context.started)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """شجرة أوامر تبدأ توقيت كل أمر سلاش قبل تنفيذه"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type == discord.InteractionType.application_command:
+            timing = RequestTiming()
+            interaction.extras['timing'] = timing
+            current_request.set(timing)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        observe_command(interaction, error=True)
+        await super().on_error(interaction, error)
+
+
+def observe_command(interaction: discord.Interaction, error: bool = False):
+    """تسجيل أمر سلاش منتهٍ (من on_app_command_completion أو on_error)"""
+    timing = interaction.extras.pop('timing', None)
+    command = interaction.command
+    if timing is None or command is None:
+        return
+    metrics.observe(f'/{command.qualified_name}', timing, error)
@@ -1,43 +1,224 @@
 """
 نظام Pagination - Pagination System
-For handling long lists with navigation buttons
+For handling long lists with navigation buttons; pages come from an async
+PageSource, are fetched on demand, prefetched ahead and cached briefly
 """
+import asyncio
 import discord
+from abc import ABC, abstractmethod
 from discord import ui
-from typing import List, Callable, Any
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import logging
 import math
+import time
+
+logger = logging.getLogger('pagination')
+
+# Seconds a rendered page stays cached, and how many pages are kept at once
+PAGE_CACHE_TTL = 30
+PAGE_CACHE_SIZE = 3
+
+
+class PageSource(ABC):
+    """مصدر صفحات غير متزامن: العدد الكلي وعناصر صفحة واحدة عند الطلب"""
+    
+    def __init__(self, per_page: int = 10):
+        self.per_page = per_page
+        self.total = 0
+    
+    @abstractmethod
+    async def count(self) -> int:
+        """حساب total وإرجاعه"""
+    
+    @abstractmethod
+    async def get_page(self, page: int) -> List[Any]:
+        """عناصر الصفحة page (تبدأ من 0)"""
+    
+    @property
+    def max_page(self) -> int:
+        return max(0, math.ceil(self.total / self.per_page) - 1)
+
+
+class ListPageSource(PageSource):
+    """صفحات من قائمة في الذاكرة"""
+    
+    def __init__(self, items: List[Any], per_page: int = 10):
+        super().__init__(per_page)
+        self.items = items
+    
+    async def count(self) -> int:
+        self.total = len(self.items)
+        return self.total
+    
+    async def get_page(self, page: int) -> List[Any]:
+        start = page * self.per_page
+        return self.items[start:start + self.per_page]
+
+
+class KeysetPageSource(PageSource):
+    """
+    صفحات عبر استعلامات keyset بدلاً من OFFSET
+    
+    fetch(anchor, limit, reverse) يعيد limit عنصراً بعد anchor (أو قبله إذا كان reverse) بترتيب تصاعدي،
+    وanchor=None يعني البداية (أو النهاية مع reverse). key(item) يعيد مفتاح ترتيب العنصر كقيم ثابتة.
+    تُحفظ حدود كل صفحة محمّلة فقط، فتُجلب أي صفحة مجاورة باستعلام واحد
+    """
+    
+    def __init__(self,
+                 fetch: Callable[[Any, int, bool], Awaitable[List[Any]]],
+                 count: Callable[[], Awaitable[int]],
+                 key: Callable[[Any], Any],
+                 per_page: int = 10):
+        super().__init__(per_page)
+        self._fetch = fetch
+        self._count = count
+        self._key = key
+        # page -> (first key, last key)
+        self._bounds: Dict[int, Tuple[Any, Any]] = {}
+    
+    async def count(self) -> int:
+        self.total = await self._count()
+        self._bounds.clear()
+        return self.total
+    
+    async def get_page(self, page: int) -> List[Any]:
+        if page == 0:
+            items = await self._fetch(None, self.per_page, False)
+        elif page - 1 in self._bounds:
+            items = await self._fetch(self._bounds[page - 1][1], self.per_page, False)
+        elif page + 1 in self._bounds:
+            items = await self._fetch(self._bounds[page + 1][0], self.per_page, True)
+        elif page == self.max_page:
+            items = await self._fetch(None, self.total - page * self.per_page, True)
+        else:
+            # No known neighbour: seek forward from the nearest loaded page before it
+            known = max((p for p in self._bounds if p < page), default=None)
+            anchor = self._bounds[known][1] if known is not None else None
+            skipped = page - (known + 1 if known is not None else 0)
+            if skipped:
+                seek = await self._fetch(anchor, skipped * self.per_page, False)
+                anchor = self._key(seek[-1]) if seek else anchor
+            items = await self._fetch(anchor, self.per_page, False)
+        
+        if items:
+            self._bounds[page] = (self._key(items[0]), self._key(items[-1]))
+        return items
 
 
 class PaginationView(ui.View):
     """View with pagination buttons"""
     
     def __init__(self, 
-                 items: List[Any],
+                 items: List[Any] = None,
                  per_page: int = 10,
                  user_id: str = None,
                  embed_generator: Callable = None,
-                 timeout: int = 180):
+                 timeout: int = 180,
+                 source: PageSource = None,
+                 extra_items: List[ui.Item] = None,
+                 cache_ttl: float = PAGE_CACHE_TTL):
         """
-        Initialize pagination view
+        Initialize pagination view; use ``await PaginationView.create(...)``
         
         Args:
-            items: List of items to paginate
+            items: List of items to paginate (wrapped in a ListPageSource)
             per_page: Number of items per page
             user_id: User ID for permission check
             embed_generator: Function to generate embed for current page
             timeout: View timeout in seconds
+            source: Async page source, used instead of items
+            extra_items: Components kept below the navigation row (e.g. a back button)
+            cache_ttl: Seconds a rendered page is reused
         """
         super().__init__(timeout=timeout)
-        self.items = items
-        self.per_page = per_page
+        self.source = source or ListPageSource(items or [], per_page)
+        self.per_page = self.source.per_page
         self.user_id = user_id
         self.embed_generator = embed_generator
+        self.extra_items = extra_items or []
+        self.cache_ttl = cache_ttl
         self.current_page = 0
-        self.max_page = math.ceil(len(items) / per_page) - 1
+        self.max_page = 0
+        
+        # page -> (expires at, embed)
+        self._cache: Dict[int, Tuple[float, discord.Embed]] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
         
         # Update button states
         self._update_buttons()
     
+    @classmethod
+    async def create(cls, *args, **kwargs) -> Tuple['PaginationView', discord.Embed]:
+        """إنشاء العرض وتحميل صفحته الأولى: (view, embed) جاهزان للإرسال"""
+        view = cls(*args, **kwargs)
+        embed = await view._start()
+        return view, embed
+    
+    async def _start(self) -> discord.Embed:
+        """عدّ العناصر وتحميل الصفحة الأولى وجلب التالية مسبقاً"""
+        await self.source.count()
+        self.max_page = self.source.max_page
+        self.current_page = 0
+        self._cache.clear()
+        self._update_buttons()
+        embed = await self._render(0)
+        self._prefetch(1)
+        return embed
+    
+    async def _load(self, page: int) -> discord.Embed:
+        try:
+            items = await self.source.get_page(page)
+            embed = self._build_embed(items, page)
+            self._cache[page] = (time.monotonic() + self.cache_ttl, embed)
+            while len(self._cache) > PAGE_CACHE_SIZE:
+                # Evict the cached page furthest from the one being viewed
+                del self._cache[max(self._cache, key=lambda p: abs(p - self.current_page))]
+            return embed
+        finally:
+            self._loading.pop(page, None)
+    
+    async def _render(self, page: int) -> discord.Embed:
+        """الصفحة من الذاكرة المؤقتة، أو انتظار جلبها (المسبق إن كان جارياً)"""
+        cached = self._cache.get(page)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        task = self._loading.get(page) or self._spawn(page)
+        # Shielded so a cancelled interaction does not abort a load others may be waiting on
+        return await asyncio.shield(task)
+    
+    def _spawn(self, page: int) -> asyncio.Task:
+        task = self._loading[page] = asyncio.create_task(self._load(page))
+        task.add_done_callback(self._load_done)
+        return task
+    
+    @staticmethod
+    def _load_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ Page load failed: {task.exception()}")
+    
+    def _prefetch(self, page: int):
+        if not 0 <= page <= self.max_page or page in self._loading:
+            return
+        cached = self._cache.get(page)
+        if cached is None or cached[0] <= time.monotonic():
+            self._spawn(page)
+    
+    def _build_embed(self, items: List[Any], page: int) -> discord.Embed:
+        # Generate embed if generator provided
+        if self.embed_generator:
+            return self.embed_generator(items, page, self.max_page)
+        # Default embed
+        return discord.Embed(
+            title=f"Page {page + 1}/{self.max_page + 1}",
+            description=f"Showing {len(items)} items",
+            color=discord.Color.blue()
+        )
+    
+    async def on_timeout(self):
+        for task in list(self._loading.values()):
+            task.cancel()
+        self._cache.clear()
+    
     def _update_buttons(self):
         """Update button states based on current page"""
         # Clear existing items
@@ -86,51 +267,46 @@ class PaginationView(ui.View):
         )
         last_button.callback = self._last_page
         self.add_item(last_button)
+        
+        for item in self.extra_items:
+            item.row = 1
+            self.add_item(item)
     
     async def _first_page(self, interaction: discord.Interaction):
         """Go to first page"""
         self.current_page = 0
-        await self._update_page(interaction)
+        await self._update_page(interaction, 1)
     
     async def _previous_page(self, interaction: discord.Interaction):
         """Go to previous page"""
         if self.current_page > 0:
             self.current_page -= 1
-        await self._update_page(interaction)
+        await self._update_page(interaction, -1)
     
     async def _next_page(self, interaction: discord.Interaction):
         """Go to next page"""
         if self.current_page < self.max_page:
             self.current_page += 1
-        await self._update_page(interaction)
+        await self._update_page(interaction, 1)
     
     async def _last_page(self, interaction: discord.Interaction):
         """Go to last page"""
         self.current_page = self.max_page
-        await self._update_page(interaction)
+        await self._update_page(interaction, -1)
     
-    async def _update_page(self, interaction: discord.Interaction):
+    async def _update_page(self, interaction: discord.Interaction, direction: int = 1):
         """Update the page display"""
+        # Acknowledge first: a page that is not cached may take a query to load
+        await interaction.response.defer()
+        
         # Update button states
         self._update_buttons()
         
-        # Get current page items
-        start_idx = self.current_page * self.per_page
-        end_idx = start_idx + self.per_page
-        current_items = self.items[start_idx:end_idx]
-        
-        # Generate embed if generator provided
-        if self.embed_generator:
-            embed = self.embed_generator(current_items, self.current_page, self.max_page)
-        else:
-            # Default embed
-            embed = discord.Embed(
-                title=f"Page {self.current_page + 1}/{self.max_page + 1}",
-                description=f"Showing {len(current_items)} items",
-                color=discord.Color.blue()
-            )
+        embed = await self._render(self.current_page)
+        await interaction.edit_original_response(embed=embed, view=self)
         
-        await interaction.response.edit_message(embed=embed, view=self)
+        # Fetch the page the user is heading to while they read this one
+        self._prefetch(self.current_page + direction)
     
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         """Check if user owns this menu"""
@@ -3,13 +3,99 @@
 Enhanced with owner and database-backed permissions
 """
 import discord
-from typing import List
+import asyncio
+from typing import Dict, Iterable, List, Optional
 from config import config
 import logging
 
 logger = logging.getLogger('permissions')
 
 
+# Permission types
+PERMISSION_TYPES = [
+    'alliance_management',
+    'reservations_management',
+    'user_management',
+    'system_management'
+]
+
+
+class PermissionIndex:
+    """فهرس الصلاحيات في الذاكرة: discord_id -> قناع بتات لأنواع الصلاحيات"""
+    
+    def __init__(self, permission_types: List[str]):
+        self.bits: Dict[str, int] = {name: 1 << i for i, name in enumerate(permission_types)}
+        self._masks: Dict[str, int] = {}
+        self._load_lock = asyncio.Lock()
+        self.loaded = False
+    
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self.bits)) - 1
+    
+    def bit(self, permission_type: str) -> int:
+        """بت الصلاحية؛ الأنواع غير المعرّفة في PERMISSION_TYPES خطأ"""
+        bit = self.bits.get(permission_type)
+        if bit is None:
+            raise ValueError(f"Unknown permission type: {permission_type}")
+        return bit
+    
+    async def load(self, db_manager):
+        """تحميل جدول الصلاحيات كاملاً (تُتجاهل الأنواع غير المعرّفة)"""
+        rows = await db_manager.fetchall("SELECT discord_id, permission_type FROM permissions")
+        masks: Dict[str, int] = {}
+        unknown = set()
+        for discord_id, permission_type in rows:
+            bit = self.bits.get(permission_type)
+            if bit is None:
+                unknown.add(permission_type)
+                continue
+            masks[discord_id] = masks.get(discord_id, 0) | bit
+        if unknown:
+            logger.warning(f"⚠️ Ignoring grants of unknown permission types: {', '.join(sorted(unknown))}")
+        self._masks = masks
+        self.loaded = True
+        logger.info(f"✅ Loaded permission index ({len(rows)} grants, {len(masks)} users)")
+    
+    async def ensure_loaded(self, db_manager):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if not self.loaded:
+                await self.load(db_manager)
+    
+    def mask(self, discord_id: str) -> int:
+        return self._masks.get(discord_id, 0)
+    
+    def has(self, discord_id: str, permission_type: str) -> bool:
+        return bool(self._masks.get(discord_id, 0) & self.bit(permission_type))
+    
+    def names(self, mask: int) -> List[str]:
+        return [name for name, bit in self.bits.items() if mask & bit]
+    
+    def grant(self, discord_id: str, permission_type: str):
+        self._masks[discord_id] = self._masks.get(discord_id, 0) | self.bit(permission_type)
+    
+    def revoke(self, discord_id: str, permission_type: str):
+        bit = self.bits.get(permission_type)
+        if bit is None or discord_id not in self._masks:
+            return
+        remaining = self._masks[discord_id] & ~bit
+        if remaining:
+            self._masks[discord_id] = remaining
+        else:
+            del self._masks[discord_id]
+
+
+permission_index = PermissionIndex(PERMISSION_TYPES)
+
+
+async def load_permission_index():
+    """تحميل فهرس الصلاحيات عند بدء التشغيل"""
+    from database import db
+    await permission_index.load(db)
+
+
 def is_owner(user: discord.User | discord.Member) -> bool:
     """Check if user is the owner"""
     return user.id == config.OWNER_ID
@@ -34,6 +120,8 @@ def is_admin(member: discord.Member) -> bool:
 
 async def has_permission(user: discord.User | discord.Member, permission_type: str) -> bool:
     """Check if user has a specific permission"""
+    permission_index.bit(permission_type)  # unknown types raise ValueError
+    
     # Owner has all permissions
     if is_owner(user):
         return True
@@ -42,27 +130,49 @@ async def has_permission(user: discord.User | discord.Member, permission_type: s
     if isinstance(user, discord.Member) and is_admin(user):
         return True
     
-    # Check database for specific permissions
+    # Check the in-memory permission index
     try:
-        from database import db
-        result = await db.fetchone(
-            "SELECT COUNT(*) FROM permissions WHERE discord_id = ? AND permission_type = ?",
-            (str(user.id), permission_type)
-        )
-        return result[0] > 0 if result else False
+        if not permission_index.loaded:
+            from database import db
+            await permission_index.ensure_loaded(db)
+        return permission_index.has(str(user.id), permission_type)
     except Exception as e:
         logger.error(f"Error checking permission: {e}")
         return False
 
 
+async def get_permission_mask(user: discord.User | discord.Member) -> int:
+    """All of a user's permissions as one bitmask (owner and admins get every bit)"""
+    if is_owner(user) or (isinstance(user, discord.Member) and is_admin(user)):
+        return permission_index.all_mask
+    try:
+        if not permission_index.loaded:
+            from database import db
+            await permission_index.ensure_loaded(db)
+        return permission_index.mask(str(user.id))
+    except Exception as e:
+        logger.error(f"Error checking permissions: {e}")
+        return 0
+
+
+async def check_permissions(user: discord.User | discord.Member,
+                            permission_types: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+    """Check several permissions in one call: {permission_type: allowed}"""
+    bits = {name: permission_index.bit(name) for name in (permission_types or PERMISSION_TYPES)}
+    mask = await get_permission_mask(user)
+    return {name: bool(mask & bit) for name, bit in bits.items()}
+
+
 async def grant_permission(user_id: str, permission_type: str, granted_by: str) -> bool:
     """Grant a permission to a user"""
+    permission_index.bit(permission_type)  # unknown types raise ValueError
     try:
         from database import db
         await db.execute(
             "INSERT OR IGNORE INTO permissions (discord_id, permission_type, granted_by) VALUES (?, ?, ?)",
             (user_id, permission_type, granted_by)
         )
+        permission_index.grant(user_id, permission_type)
         logger.info(f"Granted {permission_type} to {user_id} by {granted_by}")
         return True
     except Exception as e:
@@ -78,6 +188,7 @@ async def revoke_permission(user_id: str, permission_type: str) -> bool:
             "DELETE FROM permissions WHERE discord_id = ? AND permission_type = ?",
             (user_id, permission_type)
         )
+        permission_index.revoke(user_id, permission_type)
         logger.info(f"Revoked {permission_type} from {user_id}")
         return True
     except Exception as e:
@@ -88,21 +199,10 @@ async def revoke_permission(user_id: str, permission_type: str) -> bool:
 async def get_user_permissions(user_id: str) -> List[str]:
     """Get all permissions for a user"""
     try:
-        from database import db
-        results = await db.fetchall(
-            "SELECT permission_type FROM permissions WHERE discord_id = ?",
-            (user_id,)
-        )
-        return [row[0] for row in results]
+        if not permission_index.loaded:
+            from database import db
+            await permission_index.ensure_loaded(db)
+        return permission_index.names(permission_index.mask(user_id))
     except Exception as e:
         logger.error(f"Error getting user permissions: {e}")
         return []
-
-
-# Permission types
-PERMISSION_TYPES = [
-    'alliance_management',
-    'reservations_management',
-    'user_management',
-    'system_management'
-]
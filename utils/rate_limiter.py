@@ -0,0 +1,81 @@
+"""
+محدد المعدل - Rate Limiter
+Token buckets keyed by Discord route, plus a global bucket
+"""
+import asyncio
+import time
+from typing import Dict, Hashable, Tuple
+
+
+class TokenBucket:
+    """دلو رموز بسيط"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        """الدلو ممتلئ ولا أحد ينتظره"""
+        self._refill()
+        return self.tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self) -> float:
+        """انتظار رمز متاح، وإرجاع مدة الانتظار بالثواني"""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class RouteRateLimiter:
+    """تحديد معدل الطلبات لكل مسار Discord مع حد عام"""
+
+    # (rate per second, burst) per route name
+    DEFAULT_ROUTES: Dict[str, Tuple[float, float]] = {
+        'fetch_user': (5.0, 10),        # GET /users/{user_id}
+        'create_dm': (1.0, 5),          # POST /users/@me/channels
+        'channel_message': (1.0, 5),    # POST /channels/{channel_id}/messages
+    }
+
+    def __init__(self, global_rate: float = 50.0, routes: Dict[str, Tuple[float, float]] = None,
+                 max_buckets: int = 1024):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.routes = dict(self.DEFAULT_ROUTES, **(routes or {}))
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Tuple[str, Hashable], TokenBucket] = {}
+        self.total_wait = 0.0
+
+    def _bucket(self, route: str, major: Hashable) -> TokenBucket:
+        key = (route, major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune()
+            rate, burst = self.routes.get(route, (5.0, 5))
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def _prune(self):
+        for key in [k for k, b in self._buckets.items() if b.idle]:
+            del self._buckets[key]
+
+    async def acquire(self, route: str, major: Hashable = None):
+        """انتظار السماح بطلب على المسار المحدد"""
+        waited = await self._bucket(route, major).acquire()
+        waited += await self.global_bucket.acquire()
+        self.total_wait += waited
@@ -4,17 +4,90 @@ Supports Arabic and English with easy language switching
 """
 import json
 import os
-from typing import Dict, Any, Optional
+import string
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 import logging
 
+from config import config
+
 logger = logging.getLogger('translator')
 
+_formatter = string.Formatter()
+
+# لغة الطلب الحالي (تفاعل أو رسالة خاصة): (user_id, language)
+# تُضبط مرة واحدة لكل طلب، وكل مهمة asyncio ترى نسختها الخاصة
+request_language: ContextVar[Optional[Tuple[str, str]]] = ContextVar('request_language', default=None)
+
+
+class CompiledTemplate:
+    """قالب نص مُحلل مسبقاً لتجنب إعادة تحليل {المتغيرات} عند كل تنسيق"""
+    
+    __slots__ = ('text', 'parts', 'simple')
+    
+    _CONVERSIONS = {'r': repr, 's': str, 'a': ascii}
+    
+    def __init__(self, text: str, parts: List[Tuple[str, Optional[str], str, Optional[str]]]):
+        self.text = text
+        self.parts = parts
+        # Plain {name} fields can be filled directly; anything fancier goes through str.format
+        self.simple = all(
+            field is None or (field.isidentifier() and '{' not in spec)
+            for _, field, spec, _ in parts
+        )
+    
+    def format(self, kwargs: Dict[str, Any]) -> str:
+        if not self.simple:
+            return self.text.format(**kwargs)
+        out = []
+        for literal, field, spec, conversion in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = kwargs[field]
+                if conversion:
+                    value = self._CONVERSIONS[conversion](value)
+                out.append(format(value, spec))
+        return ''.join(out)
+
+
+def compile_template(text: str) -> Union[str, CompiledTemplate]:
+    """تحويل النص إلى قالب مُحلل، أو إبقاؤه كما هو إذا لم يحتوِ متغيرات"""
+    try:
+        parts = list(_formatter.parse(text))
+    except ValueError:
+        return text  # أقواس غير متوازنة: يُعامل كنص ثابت
+    if all(field is None for _, field, _, _ in parts) and ''.join(p[0] for p in parts) == text:
+        return text
+    return CompiledTemplate(text, parts)
+
+
+def flatten_messages(data: Dict[str, Any], prefix: str = '') -> Dict[str, Union[str, CompiledTemplate]]:
+    """تسطيح قاموس اللغة المتداخل إلى {مفتاح.بالنقاط: قالب}"""
+    flat = {}
+    for key, value in data.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_messages(value, path + '.'))
+        else:
+            flat[path] = compile_template(str(value))
+    return flat
+
+
 class Translator:
     """نظام الترجمة للبوت"""
     
-    def __init__(self):
+    def __init__(self, max_cached_users: int = None):
         self.languages: Dict[str, Dict[str, Any]] = {}
-        self.user_languages: Dict[str, str] = {}  # {user_id: language_code}
+        # {lang: {dotted_key: str | CompiledTemplate}}, built by load_languages
+        self.index: Dict[str, Dict[str, Union[str, CompiledTemplate]]] = {}
+        self._reported_missing: Set[Tuple[str, str]] = set()
+        # {user_id: language_code}, LRU-bounded; users missing from the DB hold the default
+        self.user_languages: "OrderedDict[str, str]" = OrderedDict()
+        self.max_cached_users = max_cached_users or config.LANGUAGE_CACHE_SIZE
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.default_language = 'en'
         self.available_languages = ['ar', 'en']
         self.load_languages()
@@ -44,6 +117,35 @@ class Translator:
                 logger.error(f"❌ لم يتم العثور على ملف اللغة: {lang_code}")
             except json.JSONDecodeError as e:
                 logger.error(f"❌ خطأ في تحليل ملف اللغة {lang_code}: {e}")
+        
+        self.compile_languages()
+    
+    def compile_languages(self):
+        """بناء الفهرس المسطح والإبلاغ مرة واحدة عن المفاتيح الناقصة بين اللغات"""
+        self.index = {lang: flatten_messages(data) for lang, data in self.languages.items()}
+        self._reported_missing.clear()
+        
+        all_keys = set().union(*self.index.values()) if self.index else set()
+        for lang, table in self.index.items():
+            missing = sorted(all_keys - table.keys())
+            if missing:
+                self._reported_missing.update((lang, key) for key in missing)
+                preview = ', '.join(missing[:10]) + (' ...' if len(missing) > 10 else '')
+                logger.warning(f"⚠️ {len(missing)} مفتاح ترجمة ناقص في {lang}: {preview}")
+    
+    def _lookup(self, lang: str, key: str) -> Union[str, CompiledTemplate]:
+        table = self.index.get(lang) or self.index.get(self.default_language, {})
+        template = table.get(key)
+        if template is not None:
+            return template
+        
+        if (lang, key) not in self._reported_missing:
+            self._reported_missing.add((lang, key))
+            logger.warning(f"⚠️ مفتاح ترجمة غير موجود: {key} ({lang})")
+        
+        # الرجوع إلى اللغة الافتراضية، ثم إلى المفتاح نفسه
+        fallback = self.index.get(self.default_language, {}).get(key)
+        return fallback if fallback is not None else key
     
     def _get_from_dict(self, data: Dict[str, Any], key_path: str) -> str:
         """
@@ -73,24 +175,25 @@ class Translator:
         Returns:
             النص المترجم
         """
-        lang = self.get_user_language(user_id)
-        
-        if lang not in self.languages:
-            lang = self.default_language
+        template = self._lookup(self.get_user_language(user_id), key)
         
-        text = self._get_from_dict(self.languages[lang], key)
+        if isinstance(template, str):
+            return template
+        if not kwargs:
+            return template.text
         
         # استبدال المتغيرات
         try:
-            if kwargs:
-                text = text.format(**kwargs)
+            return template.format(kwargs)
         except KeyError as e:
             logger.warning(f"متغير غير موجود في النص: {e}")
-        
-        return text
+            return template.text
     
     def get_user_language(self, user_id: str) -> str:
-        """الحصول على لغة المستخدم"""
+        """الحصول على لغة المستخدم (من سياق الطلب أولاً)"""
+        scoped = request_language.get()
+        if scoped is not None and scoped[0] == user_id:
+            return scoped[1]
         return self.user_languages.get(user_id, self.default_language)
     
     def set_user_language(self, user_id: str, lang_code: str):
@@ -102,19 +205,70 @@ class Translator:
             lang_code: رمز اللغة ('ar' أو 'en')
         """
         if lang_code in self.available_languages:
-            self.user_languages[user_id] = lang_code
+            self.cache_user_language(user_id, lang_code)
+            scoped = request_language.get()
+            if scoped is not None and scoped[0] == user_id:
+                request_language.set((user_id, lang_code))
             logger.info(f"تم تعيين لغة المستخدم {user_id} إلى {lang_code}")
         else:
             logger.warning(f"رمز لغة غير صالح: {lang_code}")
     
-    async def load_user_language_from_db(self, db_manager, user_id: str):
-        """تحميل لغة المستخدم من قاعدة البيانات"""
+    def cache_user_language(self, user_id: str, lang_code: str):
+        """تخزين لغة المستخدم في الذاكرة المحدودة دون تسجيل"""
+        if lang_code not in self.available_languages:
+            lang_code = self.default_language
+        self.user_languages[user_id] = lang_code
+        self.user_languages.move_to_end(user_id)
+        while len(self.user_languages) > self.max_cached_users:
+            self.user_languages.popitem(last=False)
+    
+    async def resolve_language(self, db_manager, user_id: str) -> str:
+        """معرفة لغة المستخدم (من الذاكرة، أو من قاعدة البيانات مرة واحدة)"""
+        lang = self.user_languages.get(user_id)
+        if lang is not None:
+            self.user_languages.move_to_end(user_id)
+            self.cache_hits += 1
+            return lang
+        
+        self.cache_misses += 1
         try:
             user = await db_manager.get_user_by_discord_id(user_id)
-            if user and hasattr(user, 'language'):
-                self.set_user_language(user_id, user.language)
+            # المستخدم غير المسجل يُخزن باللغة الافتراضية حتى يسجل أو يغير لغته
+            self.cache_user_language(user_id, user.language if user else self.default_language)
         except Exception as e:
             logger.error(f"خطأ في تحميل لغة المستخدم من قاعدة البيانات: {e}")
+        return self.user_languages.get(user_id, self.default_language)
+    
+    async def load_user_language_from_db(self, db_manager, user_id: str):
+        """ضبط لغة الطلب الحالي لمستخدم التفاعل (يبقى سارياً حتى نهاية مهمة المعالج)"""
+        request_language.set((user_id, await self.resolve_language(db_manager, user_id)))
+    
+    @contextmanager
+    def use_language(self, user_id: str, lang_code: str):
+        """سياق لغة مؤقت لمهام طويلة العمر (مثل عمال التذكيرات)"""
+        token = request_language.set((user_id, lang_code))
+        try:
+            yield
+        finally:
+            request_language.reset(token)
+    
+    async def warm_language_cache(self, db_manager) -> int:
+        """تحميل لغات المستخدمين دفعة واحدة عند بدء التشغيل"""
+        rows = await db_manager.get_user_languages(self.max_cached_users)
+        # الأقل نشاطاً أولاً ليبقى الأحدث في آخر ترتيب LRU
+        for discord_id, language in reversed(rows):
+            self.cache_user_language(discord_id, language)
+        logger.info(f"✅ تم تحميل لغات {len(rows)} مستخدم في الذاكرة")
+        return len(rows)
+    
+    def language_cache_stats(self) -> Dict[str, int]:
+        """إحصائيات ذاكرة اللغات"""
+        return {
+            'size': len(self.user_languages),
+            'max_size': self.max_cached_users,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+        }
     
     def get_all_texts(self, user_id: str, section: str) -> Dict[str, str]:
         """